@@ -1,15 +1,128 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
 
-from app.schemas.fittings import Fitting
-from app.services.fittings_store import get_fitting, add_fitting
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.schemas.fittings import Fitting, FittingMatch, FittingsImportSummary, FittingsPage, FittingsSearchPage
+from app.services.fittings_import import CatalogImport, CsvRecords, LineSplitter, decode_line, parse_ndjson_line
+from app.services.fittings_search import search_fittings
+from app.services.fittings_store import get_fitting, add_fitting, fittings_db
 
 router = APIRouter(prefix="/fittings", tags=["fittings"])
 
 
+@router.post("/bulk", response_model=FittingsImportSummary)
+async def import_fittings(request: Request) -> FittingsImportSummary:
+    """Import a vendor catalog streamed as CSV or NDJSON.
+
+    ``Content-Type: text/csv`` selects CSV with a header row naming the
+    ``Fitting`` fields; anything else is read as one JSON object per line.
+    The body is parsed while it arrives, rows are validated in chunks and
+    each chunk is upserted in a single transaction. Invalid rows do not
+    stop the import; they are counted and the first ones are reported with
+    their line numbers. Lines that are not valid UTF-8 are rejected the
+    same way.
+    """
+    csv_records = CsvRecords() if request.headers.get("content-type", "").startswith("text/csv") else None
+    catalog = CatalogImport(fittings_db)
+    splitter = LineSplitter()
+    line_no = 0
+    record_line = 1
+
+    def parse(raw: bytes) -> None:
+        nonlocal line_no, record_line
+        line_no += 1
+        try:
+            line = decode_line(raw)
+            record = csv_records.feed(line) if csv_records is not None else parse_ndjson_line(line)
+        except ValueError as exc:  # json.JSONDecodeError is a ValueError
+            catalog.reject(record_line, str(exc))
+        else:
+            if record is not None:
+                catalog.add(record_line, record)
+        if csv_records is None or not csv_records.pending:
+            record_line = line_no + 1
+
+    async for chunk in request.stream():
+        for line in splitter.feed(chunk):
+            parse(line)
+        if catalog.ready:
+            # validation and the sqlite write would otherwise block the event loop
+            await asyncio.to_thread(catalog.flush)
+    for line in splitter.close():
+        parse(line)
+    if csv_records is not None:
+        try:
+            csv_records.close()
+        except ValueError as exc:
+            catalog.reject(record_line, str(exc))
+    await asyncio.to_thread(catalog.flush)
+    return FittingsImportSummary(**catalog.summary())
+
+
+@router.get("/search", response_model=FittingsSearchPage)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    offset: int = Query(0, ge=0, le=10_000),
+    limit: int = Query(20, ge=1, le=100),
+    fuzzy: bool = True,
+) -> FittingsSearchPage:
+    """Search fitting codes and descriptions.
+
+    Codes starting with ``q`` come first, then codes or descriptions
+    containing it and, unless ``fuzzy`` is off, near misses such as codes
+    with a typo. Pass ``next_offset`` back as ``offset`` for the next page.
+    """
+    hits, more = await asyncio.to_thread(search_fittings, fittings_db, q, offset, limit, fuzzy)
+    return FittingsSearchPage(
+        query=q,
+        offset=offset,
+        limit=limit,
+        next_offset=offset + limit if more else None,
+        items=[FittingMatch(fitting=hit.fitting, match=hit.match, score=hit.score) for hit in hits],
+    )
+
+
+@router.get("/", response_model=FittingsPage)
+async def list_fittings(
+    series: str | None = None,
+    configuration: str | None = None,
+    material: str | None = None,
+    size: str | None = None,
+    min_pressure: float | None = None,
+    max_pressure: float | None = None,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+) -> FittingsPage:
+    """List fittings by attribute, tube size and cracking pressure, ordered by code.
+
+    Filters are combined with AND; text attributes are matched
+    case-insensitively, ``size`` accepts any spelling such as ``1/4"`` or
+    ``6.35mm`` and the pressure bounds are in psi. ``total`` counts every
+    match; pass ``next_cursor`` back as ``cursor`` for the next page.
+    """
+    try:
+        items, total = await asyncio.to_thread(
+            fittings_db.filter,
+            after=cursor,
+            limit=limit + 1,
+            min_pressure=min_pressure,
+            max_pressure=max_pressure,
+            size=size,
+            series=series,
+            configuration=configuration,
+            material=material,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # the extra row only tells whether another page follows
+    next_cursor = items[limit - 1].code if len(items) > limit else None
+    return FittingsPage(total=total, items=items[:limit], next_cursor=next_cursor)
+
+
 @router.get("/{code}", response_model=Fitting)
 async def read_fitting(code: str) -> Fitting:
     """Retrieve information about a fitting by its code."""
-    fitting = get_fitting(code)
+    fitting = await asyncio.to_thread(get_fitting, code)
     if not fitting:
         raise HTTPException(status_code=404, detail="Fitting not found")
     return fitting
@@ -18,5 +131,6 @@ async def read_fitting(code: str) -> Fitting:
 @router.post("/", status_code=201, response_model=Fitting)
 async def create_fitting(fitting: Fitting) -> Fitting:
     """Add a new fitting to the store."""
-    add_fitting(fitting)
+    # the write may wait on ``busy_timeout`` while an import holds the lock
+    await asyncio.to_thread(add_fitting, fitting)
     return fitting
@@ -1,24 +1,200 @@
-from fastapi import APIRouter, HTTPException, Body
+import asyncio
+import json
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import APIRouter, HTTPException, Body, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.datastructures import UploadFile
+from starlette.types import Receive, Scope, Send
 from pathlib import Path
 
-from app.services.pdf_reader import read_pdf_text, read_pdf_bytes
+from app.schemas.pdf import PdfBatchRequest
+from app.services.extraction_pool import PoolError, extraction_pool
+from app.services.pdf_cache import extraction_cache
+from app.services.pdf_reader import (
+    read_pdf_text,
+    read_pdf_bytes,
+    read_pdf_pages,
+    parse_page_ranges,
+    extraction_key,
+    StreamingTextExtractor,
+)
 
 router = APIRouter(prefix="/pdf", tags=["pdf"])
 
+RETRY_AFTER_SECONDS = 1
+
+# The routes consult the cache themselves, keeping its disk tier off the
+# event loop; the workers only extract.
+_extract_text = partial(read_pdf_text, cache=None)
+_extract_bytes = partial(read_pdf_bytes, cache=None)
+_extract_pages = partial(read_pdf_pages, cache=None)
+
+
+async def _extract_cached(key: str, fn: Callable[..., str], *args: Any) -> str:
+    """Return cached text for ``key`` or run the extraction on the worker pool."""
+    text = await extraction_cache.get_async(key)
+    if text is None:
+        text = await extraction_pool.run(fn, *args)
+        await extraction_cache.put_async(key, text)
+    return text
+
+
+async def _run_extraction(key: str, fn: Callable[..., str], *args: Any) -> str:
+    """Like :func:`_extract_cached` but answer 503 when the pool is saturated or a worker crashed."""
+    try:
+        return await _extract_cached(key, fn, *args)
+    except PoolError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        ) from exc
+
 
 @router.get("/read")
-async def read_pdf(path: str) -> dict[str, str]:
-    """Return extracted text from the given PDF file path."""
+async def read_pdf(path: str, pages: str | None = None) -> dict[str, str]:
+    """Return extracted text from the given PDF file path.
+
+    ``pages`` selects 1-based pages such as ``"3-5"`` or ``"1,4-6"``; only
+    the content streams of those pages are decoded, and a range running
+    past the last page stops there.
+    """
     pdf_path = Path(path)
     if not pdf_path.is_file():
         raise HTTPException(status_code=404, detail="File not found")
 
-    text = read_pdf_text(pdf_path)
+    if pages is None:
+        text = await _run_extraction(extraction_key(pdf_path), _extract_text, pdf_path)
+    else:
+        try:
+            ranges = parse_page_ranges(pages)
+            text = await _run_extraction(extraction_key(pdf_path, ranges), _extract_pages, pdf_path, ranges)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
     return {"text": text}
 
 
 @router.post("/extract")
 async def extract_pdf(data: bytes = Body(...)) -> dict[str, str]:
     """Extract and return text from uploaded PDF bytes."""
-    text = read_pdf_bytes(data)
+    # hashing a large upload would otherwise block the event loop
+    key = await asyncio.to_thread(extraction_key, data)
+    text = await _run_extraction(key, _extract_bytes, data)
     return {"text": text}
+
+
+async def _batch_records(jobs: list[tuple[str, Callable[[], Any]]]) -> AsyncIterator[str]:
+    # run no more jobs at once than there are workers, so a large batch
+    # does not fill the shared queue and starve other requests
+    limit = asyncio.Semaphore(extraction_pool.max_workers)
+
+    async def run(index: int, name: str, load: Callable[[], Any]) -> dict[str, Any]:
+        async with limit:
+            started = time.perf_counter()
+            record: dict[str, Any] = {"index": index, "name": name}
+            try:
+                key, fn, arg = await load()
+                record["text"] = await _extract_cached(key, fn, arg)
+            except Exception as exc:
+                # a malformed PDF can fail in many ways (zlib.error, KeyError,
+                # ...); it must cost only its own record, not the stream
+                record["error"] = str(exc) or type(exc).__name__
+            record["seconds"] = round(time.perf_counter() - started, 6)
+            return record
+
+    tasks = [asyncio.ensure_future(run(index, name, load)) for index, (name, load) in enumerate(jobs)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield json.dumps(await task) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _path_job(path: str) -> Callable[[], Any]:
+    async def load() -> tuple[str, Callable[..., str], Path]:
+        pdf_path = Path(path)
+        if not pdf_path.is_file():
+            raise FileNotFoundError(f"File not found: {path}")
+        return extraction_key(pdf_path), _extract_text, pdf_path
+
+    return load
+
+
+def _upload_job(upload: UploadFile) -> Callable[[], Any]:
+    async def load() -> tuple[str, Callable[..., str], bytes]:
+        data = await upload.read()
+        return await asyncio.to_thread(extraction_key, data), _extract_bytes, data
+
+    return load
+
+
+@router.post("/extract/batch")
+async def extract_pdf_batch(request: Request) -> StreamingResponse:
+    """Extract many PDFs in parallel and stream one NDJSON record per document.
+
+    Accepts either a multipart upload with one or more files, or a JSON body
+    ``{"paths": [...]}`` of server-side paths. Records arrive in completion
+    order with ``index``, ``name``, ``seconds`` and either ``text`` or
+    ``error``.
+    """
+    content_type = request.headers.get("content-type", "")
+    jobs: list[tuple[str, Callable[[], Any]]] = []
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        for _, value in form.multi_items():
+            if isinstance(value, UploadFile):
+                jobs.append((value.filename or "", _upload_job(value)))
+    else:
+        try:
+            batch = PdfBatchRequest.model_validate_json(await request.body())
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors()) from exc
+        jobs = [(path, _path_job(path)) for path in batch.paths]
+    if not jobs:
+        raise HTTPException(status_code=400, detail="No documents supplied")
+    return StreamingResponse(_batch_records(jobs), media_type="application/x-ndjson")
+
+
+@router.get("/metrics")
+async def pdf_metrics() -> dict[str, dict[str, float | int]]:
+    """Return extraction pool and cache metrics."""
+    return {"pool": extraction_pool.metrics(), "cache": extraction_cache.stats()}
+
+
+class _UploadStreamingResponse(StreamingResponse):
+    """Streaming response produced while the request body is still being read.
+
+    ``StreamingResponse`` normally listens for disconnects on ``receive``,
+    which would compete with ``request.stream()`` for the upload chunks. A
+    disconnect still ends the response because ``request.stream()`` raises.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _stream_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    extractor = StreamingTextExtractor()
+    async for chunk in chunks:
+        # one chunk may inflate to MAX_STREAM_OUTPUT bytes, far too much
+        # work to do on the event loop
+        for stream, text in await asyncio.to_thread(extractor.feed, chunk):
+            yield json.dumps({"stream": stream, "text": text}) + "\n"
+    extractor.close()
+
+
+@router.post("/extract/stream")
+async def extract_pdf_stream(request: Request) -> StreamingResponse:
+    """Extract text from an uploaded PDF while the body is still arriving.
+
+    The response is NDJSON with one ``{"stream": n, "text": ...}`` record per
+    piece of text found; concatenating the ``text`` fields gives the full text.
+    """
+    return _UploadStreamingResponse(_stream_records(request.stream()), media_type="application/x-ndjson")
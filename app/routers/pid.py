@@ -1,13 +1,369 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas.pid import PipingSystem, HandlelisteResponse
-from app.services.generator import generate_handleliste
+import asyncio
+import csv
+import io
+import json
+import math
+from typing import Annotated, Any, AsyncIterator, Callable, Iterator
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from app.schemas.pid import (
+    PipingSystem,
+    ColumnarSystem,
+    HandlelisteResponse,
+    BomResponse,
+    BomRow,
+    PartsResponse,
+    SessionCreate,
+    SessionPatch,
+    SessionResponse,
+    SessionDelta,
+    GraphAnalysis,
+)
+from app.services.columnar import SystemColumns, columns_from_json, decode_binary
+from app.services.extraction_pool import ExtractionPool, PoolError
+from app.services.handleliste_cache import etag_for, etag_matches, handleliste_cache, payload_key, system_key
+from app.services.handleliste_session import (
+    HandlelisteSession,
+    create_session,
+    delete_session,
+    get_session,
+    patch_session,
+)
+from app.services.fittings_store import catalog_version
+from app.services.generator import (
+    generate_handleliste,
+    generate_bom,
+    generate_parts,
+    iter_handleliste,
+    run_handleliste_jobs,
+)
+from app.services.piping_graph import PipingGraph
 
 router = APIRouter(prefix="/pid", tags=["pid"])
 
-@router.post("/handleliste", response_model=HandlelisteResponse)
-async def handleliste(system: PipingSystem, brand: str = "parker") -> HandlelisteResponse:
-    """Generate a handleliste for the provided piping system."""
+# Batch jobs are CPU-bound like PDF extraction but get their own pool so a
+# large estimate run cannot starve document uploads (and vice versa).
+batch_pool = ExtractionPool.from_env("PID_BATCH", name="Handleliste batch")
+MAX_JOBS_PER_CHUNK = 256
+# Items written per response chunk when streaming a handleliste.
+STREAM_ITEMS_PER_CHUNK = 1000
+
+MODES = ("list", "bom", "parts")
+
+
+@router.post("/handleliste", response_model=HandlelisteResponse | BomResponse | PartsResponse)
+async def handleliste(
+    system: PipingSystem,
+    brand: str = "parker",
+    mode: str = "list",
+    include_items: bool = False,
+    material: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Generate a handleliste for the provided piping system.
+
+    ``mode=bom`` returns quantities per item instead of one entry per item;
+    ``include_items`` adds the ordered list to the aggregated response.
+    ``mode=parts`` resolves fittings to catalog part numbers by brand,
+    fitting type, line size and the optional ``material``.
+
+    Responses carry an ``ETag`` derived from the system, brand and mode, so
+    a client sending it back in ``If-None-Match`` gets ``304 Not Modified``.
+    Serialized responses are kept in an LRU cache, so repeated requests for
+    the same system skip generation and serialization.
+    """
+    variant = _response_variant(mode, include_items, material)
+    key = system_key(system, brand, *variant)
+    return _cached_handleliste(key, lambda: system, brand, mode, include_items, material, if_none_match)
+
+
+def _response_variant(mode: str, include_items: bool, material: str | None) -> tuple[Any, ...]:
+    if mode == "list":
+        return (mode,)
+    if mode == "bom":
+        return (mode, include_items)
+    if mode == "parts":
+        # part numbers change with the catalog, so its version is part of the key
+        return (mode, (material or "").lower(), catalog_version())
+    raise HTTPException(status_code=400, detail=f"Unknown mode: {mode}")
+
+
+def _cached_handleliste(
+    key: str,
+    load: Callable[[], PipingSystem | SystemColumns],
+    brand: str,
+    mode: str,
+    include_items: bool,
+    material: str | None,
+    if_none_match: str | None,
+) -> Response:
+    etag = etag_for(key)
+    if etag_matches(if_none_match, etag):
+        handleliste_cache.record_not_modified()
+        return Response(status_code=304, headers={"ETag": etag})
+
+    body = handleliste_cache.get(key)
+    if body is None:
+        system = None
+        try:
+            system = load()
+            if mode == "list":
+                result = generate_handleliste(system, brand=brand)
+            elif mode == "bom":
+                result = generate_bom(system, brand=brand, include_items=include_items)
+            else:
+                result = generate_parts(system, brand=brand, material=material)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=_error_detail(system, exc)) from exc
+        body = result.model_dump_json().encode()
+        handleliste_cache.put(key, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+def _error_detail(system: PipingSystem | SystemColumns | None, exc: ValueError) -> str:
+    # the generator stops at the first bad line; the graph lists all of
+    # them, and is only built once generation has already failed
+    if system is not None:
+        graph = PipingGraph.from_columns(system) if isinstance(system, SystemColumns) else PipingGraph.from_system(system)
+        try:
+            graph.validate()
+        except ValueError as lines_exc:
+            return str(lines_exc)
+    return str(exc)
+
+
+@router.post("/handleliste/columnar", response_model=HandlelisteResponse | BomResponse | PartsResponse)
+async def handleliste_columnar(
+    request: Request,
+    brand: str = "parker",
+    mode: str = "list",
+    include_items: bool = False,
+    material: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Generate a handleliste from a columnar system without per-line models.
+
+    The body is either JSON (:class:`ColumnarSystem`: parallel ``start``,
+    ``end`` and ``size`` arrays plus base64 bitsets for ``tee`` and
+    ``bulkhead``) or, with ``Content-Type: application/octet-stream``, the
+    little-endian layout described in :mod:`app.services.columnar`. The
+    modes, caching and ``ETag`` handling match ``/pid/handleliste``.
+    """
+    variant = _response_variant(mode, include_items, material)
+    payload = await request.body()
+    binary = request.headers.get("content-type", "").startswith("application/octet-stream")
+
+    def load() -> SystemColumns:
+        if binary:
+            return decode_binary(payload)
+        try:
+            return columns_from_json(ColumnarSystem.model_validate_json(payload))
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors(include_input=False)) from exc
+
+    key = payload_key(payload, brand, "columnar", binary, *variant)
+    return _cached_handleliste(key, load, brand, mode, include_items, material, if_none_match)
+
+
+@router.get("/metrics")
+async def pid_metrics() -> dict[str, dict[str, float | int]]:
+    """Return handleliste cache metrics."""
+    return {"cache": handleliste_cache.stats()}
+
+
+@router.post("/analyze", response_model=GraphAnalysis)
+async def analyze(system: PipingSystem) -> GraphAnalysis:
+    """Report invalid lines, size changes and connectivity of a piping system.
+
+    Invalid lines are listed rather than rejected; the remaining checks
+    ignore them.
+    """
+    graph = PipingGraph.from_system(system)
+    return GraphAnalysis(
+        invalid_lines=graph.invalid_lines().tolist(),
+        size_change_lines=graph.size_change_lines().tolist(),
+        **graph.connectivity(),
+    )
+
+
+def _ndjson_chunks(items: Iterator[str]) -> Iterator[str]:
+    batch: list[str] = []
+    for item in items:
+        batch.append(json.dumps({"item": item}))
+        if len(batch) >= STREAM_ITEMS_PER_CHUNK:
+            yield "\n".join(batch) + "\n"
+            batch.clear()
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def _csv_chunks(items: Iterator[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(["item"])
+    rows = 0
+    for item in items:
+        writer.writerow([item])
+        rows += 1
+        if rows >= STREAM_ITEMS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
+
+
+@router.post("/handleliste/stream")
+async def handleliste_stream(system: PipingSystem, brand: str = "parker", format: str = "ndjson") -> StreamingResponse:
+    """Stream the handleliste as it is generated.
+
+    ``format=ndjson`` (default) writes one ``{"item": ...}`` record per
+    line, ``format=csv`` a single ``item`` column. The system is validated
+    before the first byte is sent, so errors still produce a 400.
+    """
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
     try:
-        return generate_handleliste(system, brand=brand)
+        items = iter_handleliste(system, brand=brand)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=_error_detail(system, exc)) from exc
+    if format == "csv":
+        return StreamingResponse(_csv_chunks(items), media_type="text/csv")
+    return StreamingResponse(_ndjson_chunks(items), media_type="application/x-ndjson")
+
+
+def _chunk_jobs(jobs: list[Any]) -> list[tuple[int, list[Any]]]:
+    # several chunks per worker keeps every core busy while amortising the
+    # cost of shipping jobs to the worker processes
+    size = max(1, min(MAX_JOBS_PER_CHUNK, math.ceil(len(jobs) / (batch_pool.max_workers * 4))))
+    return [(start, jobs[start : start + size]) for start in range(0, len(jobs), size)]
+
+
+async def _run_chunk(start: int, chunk: list[Any], mode: str) -> tuple[int, list[dict[str, Any]]]:
+    try:
+        return start, await batch_pool.run(run_handleliste_jobs, chunk, mode)
+    except PoolError as exc:
+        return start, [{"error": str(exc)} for _ in chunk]
+
+
+def _chunk_tasks(jobs: list[Any], mode: str) -> list[asyncio.Future[tuple[int, list[dict[str, Any]]]]]:
+    # at most one chunk per worker in flight: the pool only queues
+    # max_queue more calls, so submitting every chunk at once would make a
+    # large batch reject its own chunks
+    limit = asyncio.Semaphore(batch_pool.max_workers)
+
+    async def run(start: int, chunk: list[Any]) -> tuple[int, list[dict[str, Any]]]:
+        async with limit:
+            return await _run_chunk(start, chunk, mode)
+
+    return [asyncio.ensure_future(run(start, chunk)) for start, chunk in _chunk_jobs(jobs)]
+
+
+async def _batch_records(jobs: list[Any], mode: str) -> AsyncIterator[str]:
+    tasks = _chunk_tasks(jobs, mode)
+    try:
+        for task in asyncio.as_completed(tasks):
+            start, results = await task
+            for offset, result in enumerate(results):
+                yield json.dumps({"index": start + offset, **result}) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/handleliste/batch", response_model=None)
+async def handleliste_batch(
+    request: Request,
+    mode: str = "list",
+    merge: bool = False,
+) -> StreamingResponse | dict[str, Any]:
+    """Generate handlelister for many ``{system, brand}`` jobs in parallel.
+
+    The body is ``{"jobs": [{"system": ..., "brand": ...}, ...]}``. Jobs are
+    validated and generated on worker processes. By default one NDJSON
+    record per job is streamed as chunks finish, with ``index`` and either
+    ``items`` (or ``rows`` for ``mode=bom``) or ``error``. With ``merge``
+    the quantities of all successful jobs are summed into one BOM and
+    failed jobs are listed under ``errors``.
+    """
+    if mode not in ("list", "bom"):
+        raise HTTPException(status_code=400, detail=f"Unknown mode: {mode}")
+    try:
+        body = json.loads(await request.body())
+        jobs = body["jobs"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Body must be {\"jobs\": [...]}") from exc
+    if not isinstance(jobs, list):
+        raise HTTPException(status_code=400, detail="jobs must be a list")
+
+    if not merge:
+        return StreamingResponse(_batch_records(jobs, mode), media_type="application/x-ndjson")
+
+    chunks = await asyncio.gather(*_chunk_tasks(jobs, "bom"))
+    totals: dict[str, int] = {}
+    errors: list[dict[str, Any]] = []
+    for start, results in sorted(chunks, key=lambda chunk: chunk[0]):
+        for offset, result in enumerate(results):
+            if "error" in result:
+                errors.append({"index": start + offset, "error": result["error"]})
+                continue
+            for row in result["rows"]:
+                totals[row["item"]] = totals.get(row["item"], 0) + row["qty"]
+    return {"rows": [{"item": item, "qty": qty} for item, qty in totals.items()], "errors": errors}
+
+
+def _session_response(session_id: str, session: HandlelisteSession) -> SessionResponse:
+    return SessionResponse(
+        session_id=session_id,
+        version=session.version,
+        rows=[BomRow(item=item, qty=qty) for item, qty in session.rows()],
+        line_ids=list(session.lines),
+    )
+
+
+def _lookup_session(session_id: str) -> HandlelisteSession:
+    session = get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+@router.post("/sessions", status_code=201, response_model=SessionResponse)
+async def create_handleliste_session(body: SessionCreate) -> SessionResponse:
+    """Store a piping system server-side and return its quantities."""
+    try:
+        session_id, session = create_session(body.system, brand=body.brand)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return _session_response(session_id, session)
+
+
+@router.get("/sessions/{session_id}", response_model=SessionResponse)
+async def read_handleliste_session(session_id: str) -> SessionResponse:
+    """Return the current quantities of a session."""
+    return _session_response(session_id, _lookup_session(session_id))
+
+
+@router.patch("/sessions/{session_id}", response_model=SessionDelta)
+async def patch_handleliste_session(session_id: str, patch: SessionPatch) -> SessionDelta:
+    """Edit lines and components and return the change in quantities."""
+    session = _lookup_session(session_id)
+    try:
+        delta, added = patch_session(session_id, session, patch)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return SessionDelta(
+        session_id=session_id,
+        version=session.version,
+        delta=[BomRow(item=item, qty=qty) for item, qty in delta.items()],
+        added_line_ids=added,
+    )
+
+
+@router.delete("/sessions/{session_id}", status_code=204)
+async def delete_handleliste_session(session_id: str) -> None:
+    """Discard a session."""
+    if not delete_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import BaseModel
 
 
@@ -10,3 +12,49 @@ class Fitting(BaseModel):
     configuration: str
     cracking_pressure: str | None = None
     material: str | None = None
+    brand: str | None = None
+    fitting_type: str | None = None
+    size: str | None = None
+
+
+class RejectedRow(BaseModel):
+    """A catalog row that could not be imported."""
+
+    line: int
+    error: str
+
+
+class FittingsImportSummary(BaseModel):
+    """Outcome of a bulk catalog import."""
+
+    received: int
+    created: int
+    updated: int
+    rejected: int
+    errors: List[RejectedRow]
+
+
+class FittingMatch(BaseModel):
+    """A search result and how it matched the query."""
+
+    fitting: Fitting
+    match: str
+    score: float
+
+
+class FittingsSearchPage(BaseModel):
+    """One page of ``/fittings/search`` results."""
+
+    query: str
+    offset: int
+    limit: int
+    next_offset: int | None = None
+    items: List[FittingMatch]
+
+
+class FittingsPage(BaseModel):
+    """One page of fittings filtered by attribute."""
+
+    total: int
+    items: List[Fitting]
+    next_cursor: str | None = None
@@ -0,0 +1,9 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class PdfBatchRequest(BaseModel):
+    """Server-side PDF paths to extract in one batch."""
+
+    paths: List[str]
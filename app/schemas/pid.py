@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import List
-from pydantic import BaseModel
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Base64Bytes
 
 
 class Component(str, Enum):
@@ -31,7 +31,108 @@ class PipingSystem(BaseModel):
     components: List[Component]
     lines: List[Line] = []
 
+class ColumnarSystem(BaseModel):
+    """Piping system with its lines given as parallel arrays.
+
+    ``tee`` and ``bulkhead`` are base64 encoded bitsets with bit ``i``
+    (least significant bit first) set when line ``i`` has the feature.
+    """
+
+    components: List[Component]
+    start: List[int] = []
+    end: List[int] = []
+    size: List[str] = []
+    tee: Base64Bytes = b""
+    bulkhead: Base64Bytes = b""
+
+
 class HandlelisteResponse(BaseModel):
     """Response model for handleliste generation."""
 
     items: List[str]
+
+
+class BomRow(BaseModel):
+    """Quantity of one item in an aggregated handleliste."""
+
+    item: str
+    qty: int
+
+
+class BomResponse(BaseModel):
+    """Aggregated (bill of materials) handleliste."""
+
+    rows: List[BomRow]
+    items: Optional[List[str]] = None
+
+
+class PartRow(BaseModel):
+    """Quantity of one orderable part in a handleliste.
+
+    Fittings carry the line ``size`` and the catalog ``part_number`` when
+    one is found; components and unresolved fittings have ``None``.
+    """
+
+    item: str
+    size: Optional[str] = None
+    part_number: Optional[str] = None
+    qty: int
+
+
+class PartsResponse(BaseModel):
+    """Handleliste resolved to catalog part numbers."""
+
+    rows: List[PartRow]
+    unresolved: int
+
+
+class SessionCreate(BaseModel):
+    """Request body for creating a handleliste session."""
+
+    system: PipingSystem
+    brand: str = "parker"
+
+
+class SessionPatch(BaseModel):
+    """Edits applied to a handleliste session.
+
+    Components are addressed by index and lines by the ids returned when
+    they were created. Operations are applied in field order.
+    """
+
+    add_components: List[Component] = []
+    update_components: Dict[int, Component] = {}
+    update_lines: Dict[int, Line] = {}
+    remove_lines: List[int] = []
+    add_lines: List[Line] = []
+    remove_components: List[int] = []
+
+
+class SessionResponse(BaseModel):
+    """Current state of a handleliste session."""
+
+    session_id: str
+    version: int
+    rows: List[BomRow]
+    line_ids: List[int]
+
+
+class SessionDelta(BaseModel):
+    """Change in item quantities caused by a session patch."""
+
+    session_id: str
+    version: int
+    delta: List[BomRow]
+    added_line_ids: List[int]
+
+
+class GraphAnalysis(BaseModel):
+    """Validation and connectivity report for a piping system."""
+
+    invalid_lines: List[int]
+    size_change_lines: List[int]
+    isolated_components: List[int]
+    subsystems: int
+    subsystem_sizes: List[int]
+    cyclic_subsystems: int
+    independent_cycles: int
@@ -1,7 +1,7 @@
 from .agent_tools import DocumentMonitor, ChatAgent
 from .fittings_store import get_fitting, add_fitting
 from .generator import generate_handleliste
-from .pdf_reader import read_pdf_text
+from .pdf_reader import read_pdf_text, iter_pdf_text
 
 __all__ = [
     "DocumentMonitor",
@@ -10,4 +10,5 @@ __all__ = [
     "add_fitting",
     "generate_handleliste",
     "read_pdf_text",
+    "iter_pdf_text",
 ]
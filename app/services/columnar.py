@@ -0,0 +1,191 @@
+"""Column-oriented piping systems decoded without per-line models.
+
+Large systems spend most of their request time building one ``Line`` model
+per line. The columnar payloads below carry the same data as parallel
+arrays, and the generator consumes them directly.
+
+Binary layout (all integers little-endian)::
+
+    magic       4s   b"PIDC"
+    version     u8   1
+    components  u32  number of components
+    lines       u32  number of lines
+    sizes       u32  number of distinct sizes
+    component   u8   x components   code in ``Component`` declaration order
+    size table       x sizes        u16 byte length + UTF-8 label
+    start       i32  x lines
+    end         i32  x lines
+    size        u32  x lines        index into the size table
+    tee         ceil(lines / 8) bytes, bit i (LSB first) set for line i
+    bulkhead    ceil(lines / 8) bytes
+"""
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass, field
+from typing import Hashable, Iterator, Sequence
+
+import numpy as np
+
+from app.schemas.pid import ColumnarSystem, Component, Line, PipingSystem
+from app.services.sizes import SizeRegistry
+
+MAGIC = b"PIDC"
+VERSION = 1
+_HEADER = struct.Struct("<4sBIII")
+_LABEL_LENGTH = struct.Struct("<H")
+_COMPONENTS = list(Component)
+
+
+@dataclass
+class SystemColumns:
+    """A piping system as parallel line columns.
+
+    ``size`` holds either the size label of each line or, when ``sizes``
+    is given, an index into that table of labels.
+    """
+
+    components: list[Component]
+    start: Sequence[int]
+    end: Sequence[int]
+    size: Sequence[Hashable]
+    tee: Sequence[bool]
+    bulkhead: Sequence[bool]
+    sizes: list[str] | None = field(default=None)
+
+    def __post_init__(self) -> None:
+        count = len(self.start)
+        if any(len(column) != count for column in (self.end, self.size, self.tee, self.bulkhead)):
+            raise ValueError("Line columns must have the same length")
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def rows(self) -> Iterator[tuple[int, int, Hashable, bool, bool]]:
+        """Yield ``(start, end, size, tee, bulkhead)`` per line."""
+        return zip(self.start, self.end, self.size, self.tee, self.bulkhead)
+
+    def size_label(self, token: Hashable) -> str:
+        return self.sizes[token] if self.sizes is not None else token
+
+    def size_codes(self, registry: SizeRegistry) -> list[int]:
+        """Return the size column as codes interned in ``registry``."""
+        if self.sizes is not None:
+            table = [registry.code(label) for label in self.sizes]
+            return [table[token] for token in self.size]
+        code = registry.code
+        return [code(label) for label in self.size]
+
+    def to_system(self) -> PipingSystem:
+        """Build the equivalent ``PipingSystem`` (one ``Line`` per line)."""
+        return PipingSystem(
+            components=self.components,
+            lines=[
+                Line(start=start, end=end, size=self.size_label(size), tee=tee, bulkhead=bulkhead)
+                for start, end, size, tee, bulkhead in self.rows()
+            ],
+        )
+
+
+def unpack_bits(data: bytes, count: int) -> list[bool]:
+    """Decode an LSB-first bitset into ``count`` flags; missing bytes are zero."""
+    if not data:
+        return [False] * count
+    if len(data) > (count + 7) // 8:
+        raise ValueError("Bitset is longer than the number of lines")
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=count, bitorder="little")
+    return bits.astype(bool).tolist()
+
+
+def pack_bits(flags: Sequence[bool]) -> bytes:
+    """Encode flags as an LSB-first bitset."""
+    return np.packbits(np.asarray(flags, dtype=bool), bitorder="little").tobytes()
+
+
+def columns_from_system(system: PipingSystem) -> SystemColumns:
+    """Convert a ``PipingSystem`` into columns."""
+    lines = system.lines
+    return SystemColumns(
+        components=list(system.components),
+        start=[line.start for line in lines],
+        end=[line.end for line in lines],
+        size=[line.size for line in lines],
+        tee=[line.tee for line in lines],
+        bulkhead=[line.bulkhead for line in lines],
+    )
+
+
+def columns_from_json(payload: ColumnarSystem) -> SystemColumns:
+    """Convert a validated JSON columnar payload into columns."""
+    count = len(payload.start)
+    return SystemColumns(
+        components=payload.components,
+        start=payload.start,
+        end=payload.end,
+        size=payload.size,
+        tee=unpack_bits(payload.tee, count),
+        bulkhead=unpack_bits(payload.bulkhead, count),
+    )
+
+
+def decode_binary(data: bytes) -> SystemColumns:
+    """Decode the binary columnar layout described in the module docstring."""
+    view = memoryview(data)
+    try:
+        magic, version, n_components, n_lines, n_sizes = _HEADER.unpack_from(view)
+    except struct.error as exc:
+        raise ValueError("Truncated columnar header") from exc
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a columnar piping system (bad magic or version)")
+    offset = _HEADER.size
+
+    def take(nbytes: int) -> memoryview:
+        nonlocal offset
+        if offset + nbytes > len(view):
+            raise ValueError("Truncated columnar payload")
+        chunk = view[offset : offset + nbytes]
+        offset += nbytes
+        return chunk
+
+    codes = take(n_components).tolist()
+    if codes and max(codes) >= len(_COMPONENTS):
+        raise ValueError("Unknown component code")
+    components = [_COMPONENTS[code] for code in codes]
+
+    sizes = []
+    for _ in range(n_sizes):
+        (length,) = _LABEL_LENGTH.unpack(take(_LABEL_LENGTH.size))
+        sizes.append(str(take(length), "utf-8"))
+
+    start = np.frombuffer(take(4 * n_lines), dtype="<i4").tolist()
+    end = np.frombuffer(take(4 * n_lines), dtype="<i4").tolist()
+    size_codes = np.frombuffer(take(4 * n_lines), dtype="<u4")
+    if n_lines and int(size_codes.max()) >= n_sizes:
+        raise ValueError("Size index outside the size table")
+    flag_bytes = (n_lines + 7) // 8
+    tee = unpack_bits(bytes(take(flag_bytes)), n_lines)
+    bulkhead = unpack_bits(bytes(take(flag_bytes)), n_lines)
+    if offset != len(view):
+        raise ValueError("Trailing bytes after columnar payload")
+    return SystemColumns(components, start, end, size_codes.tolist(), tee, bulkhead, sizes=sizes)
+
+
+def encode_binary(columns: SystemColumns) -> bytes:
+    """Encode columns in the binary layout, e.g. for clients and benchmarks."""
+    table: dict[str, int] = {}
+    size_codes = [table.setdefault(columns.size_label(size), len(table)) for size in columns.size]
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, len(columns.components), len(columns), len(table)),
+        bytes(_COMPONENTS.index(comp) for comp in columns.components),
+    ]
+    for label in table:
+        encoded = label.encode()
+        parts += [_LABEL_LENGTH.pack(len(encoded)), encoded]
+    parts += [
+        np.asarray(columns.start, dtype="<i4").tobytes(),
+        np.asarray(columns.end, dtype="<i4").tobytes(),
+        np.asarray(size_codes, dtype="<u4").tobytes(),
+        pack_bits(columns.tee),
+        pack_bits(columns.bulkhead),
+    ]
+    return b"".join(parts)
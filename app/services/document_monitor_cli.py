@@ -2,15 +2,21 @@ from pathlib import Path
 import sys
 
 from .agent_tools import DocumentMonitor
+from .pdf_reader import read_pdf_text
 
 
 def process_file(path: Path) -> None:
     try:
-        text = path.read_text()
+        if path.suffix.lower() == ".pdf":
+            # through the shared extraction cache, so an unchanged file or
+            # one already read through the API is not extracted again
+            characters = len(read_pdf_text(path))
+        else:
+            characters = len(path.read_text())
     except Exception as exc:
         print(f"Could not read {path}: {exc}")
         return
-    print(f"\nAgent processed {path} -> {len(text)} characters\n")
+    print(f"\nAgent processed {path} -> {characters} characters\n")
 
 
 def main() -> None:
@@ -0,0 +1,121 @@
+"""Process pool for running CPU-bound PDF extraction off the event loop."""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class PoolError(RuntimeError):
+    """Raised when the pool cannot run a job right now; worth a retry."""
+
+
+class PoolBusyError(PoolError):
+    """Raised when the extraction queue is full."""
+
+
+class WorkerCrashedError(PoolError):
+    """Raised when a worker process died while the job was pending."""
+
+
+def _timed_call(fn: Callable[..., T], *args: Any) -> tuple[float, T]:
+    # ``time.monotonic`` is system-wide, so the start time is comparable with
+    # the submit time recorded in the parent process
+    started = time.monotonic()
+    return started, fn(*args)
+
+
+class ExtractionPool:
+    """Run extraction jobs on a process pool with a bounded queue.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more
+    wait for a free worker. Further submissions raise :class:`PoolBusyError`
+    immediately instead of piling up behind a slow document. ``name``
+    labels the pool in error messages.
+
+    If a worker process dies (for example killed for using too much memory)
+    the executor is unusable; the jobs it held fail with
+    :class:`WorkerCrashedError` and the next call starts a fresh executor.
+    """
+
+    def __init__(self, max_workers: int | None = None, max_queue: int = 32, name: str = "Extraction") -> None:
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.name = name
+        self._executor: Executor | None = None
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._crashed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @classmethod
+    def from_env(cls, prefix: str = "PDF", name: str = "Extraction") -> "ExtractionPool":
+        """Create a pool configured by ``<prefix>_WORKERS`` and ``<prefix>_QUEUE_SIZE``."""
+        workers = os.environ.get(f"{prefix}_WORKERS")
+        queue = os.environ.get(f"{prefix}_QUEUE_SIZE")
+        return cls(
+            max_workers=int(workers) if workers else None,
+            max_queue=int(queue) if queue else 32,
+            name=name,
+        )
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` in a worker process and return its result."""
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise PoolBusyError(f"{self.name} queue is full")
+        self._in_flight += 1
+        submitted = time.monotonic()
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            started, result = await loop.run_in_executor(executor, _timed_call, fn, *args)
+        except BrokenProcessPool as exc:
+            self._crashed += 1
+            # every job of the broken executor lands here; only the first resets it
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise WorkerCrashedError(f"{self.name} worker crashed") from exc
+        finally:
+            self._in_flight -= 1
+        wait = max(started - submitted, 0.0)
+        self._completed += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        return result
+
+    def metrics(self) -> dict[str, float | int]:
+        """Return queue depth and wait-time statistics."""
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": max(self._in_flight - self.max_workers, 0),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "crashed": self._crashed,
+            "wait_seconds_avg": self._total_wait / self._completed if self._completed else 0.0,
+            "wait_seconds_max": self._max_wait,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+extraction_pool = ExtractionPool.from_env()
@@ -0,0 +1,104 @@
+"""Numeric attributes parsed from fitting codes and pressure ratings.
+
+Catalog rows carry sizes and cracking pressures as text (``25 psi``,
+``0.7 bar``, ``1/4"``) and part codes such as ``4A-C4L-25-SS`` encode them
+again: the leading digits are the tube size in sixteenths of an inch and,
+for check valves (configurations such as ``C4L``: ``C``, the size, the end
+connection), the third segment is the cracking pressure in psi. Other
+fittings use that segment for something else, so their codes only give a
+size. :func:`numeric_attributes` runs once when a fitting is written and
+turns both into numbers (psi and millimetres), so the store can keep them
+in sorted range indexes.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from app.schemas.fittings import Fitting
+from app.services.sizes import parse_size
+
+PSI_PER_UNIT = {
+    "psi": 1.0,
+    "psig": 1.0,
+    "bar": 14.503774,
+    "mbar": 0.014503774,
+    "kpa": 0.14503774,
+    "mpa": 145.03774,
+}
+MM_PER_SIXTEENTH = 25.4 / 16
+# bumped whenever the numbers derived from a fitting change, so stored
+# catalogs are recomputed once
+PARSER_VERSION = 2
+
+_NUMBER = r"\d+(?:\.\d+)?|\.\d+|\d+/\d+"
+_PRESSURE_RE = re.compile(rf"^(?P<value>{_NUMBER})\s*(?P<unit>psig|psi|mbar|bar|kpa|mpa)?$")
+_CODE_RE = re.compile(
+    r"^(?P<size>\d{1,2})[a-z]*-(?P<configuration>[a-z0-9]+)-(?P<pressure>\d+(?:\.\d+)?|\d+/\d+)(?:-[a-z0-9]+)?$"
+)
+_CHECK_VALVE_RE = re.compile(r"^c\d{1,2}[a-z]*$")
+
+
+@dataclass(frozen=True)
+class CodeParts:
+    """Numbers encoded in a fitting code."""
+
+    size_mm: float
+    pressure_psi: float | None
+    """``None`` unless the code is a check valve's."""
+
+
+def _number(text: str) -> float | None:
+    if "/" in text:
+        num, den = text.split("/")
+        return int(num) / int(den) if int(den) else None
+    return float(text)
+
+
+@lru_cache(maxsize=4096)
+def parse_pressure(text: str) -> float | None:
+    """Return a pressure in psi; a bare number is taken as psi.
+
+    ``None`` when the text is not a single value with a known unit.
+    """
+    match = _PRESSURE_RE.match(text.strip().lower())
+    if match is None:
+        return None
+    value = _number(match["value"])
+    if value is None:
+        return None
+    return value * PSI_PER_UNIT[match["unit"] or "psi"]
+
+
+def parse_code(code: str) -> CodeParts | None:
+    """Return the size and, for check valves, the cracking pressure encoded in ``code``."""
+    match = _CODE_RE.match(code.strip().lower())
+    if match is None:
+        return None
+    pressure = _number(match["pressure"]) if _CHECK_VALVE_RE.match(match["configuration"]) else None
+    return CodeParts(size_mm=int(match["size"]) * MM_PER_SIXTEENTH, pressure_psi=pressure)
+
+
+def size_mm(label: str) -> float | None:
+    """Return a size in millimetres rounded like :func:`~app.services.sizes.size_key`."""
+    mm = parse_size(label)
+    return round(mm, 3) if mm is not None else None
+
+
+def numeric_attributes(fitting: Fitting) -> tuple[float | None, float | None]:
+    """Return ``(pressure_psi, size_mm)`` for a fitting.
+
+    The ``cracking_pressure`` and ``size`` fields win; the code fills in
+    whichever of them is missing or cannot be parsed.
+    """
+    pressure = parse_pressure(fitting.cracking_pressure) if fitting.cracking_pressure else None
+    size = size_mm(fitting.size) if fitting.size else None
+    if pressure is None or size is None:
+        parts = parse_code(fitting.code)
+        if parts is not None:
+            if pressure is None:
+                pressure = parts.pressure_psi
+            if size is None:
+                size = round(parts.size_mm, 3)
+    return pressure, size
@@ -0,0 +1,199 @@
+"""Bulk import of vendor fitting catalogs from CSV or NDJSON."""
+from __future__ import annotations
+
+import csv
+import json
+from collections import deque
+from typing import Any
+
+from pydantic import ValidationError
+
+from app.schemas.fittings import Fitting
+from app.services.fittings_store import FittingsStore
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+# physical lines a single quoted CSV record may span
+MAX_RECORD_LINES = 1000
+OPTIONAL_FIELDS = {name for name, field in Fitting.model_fields.items() if not field.is_required()}
+
+
+class _NeedMore(Exception):
+    """Raised inside ``csv.reader`` when a record continues on the next line."""
+
+
+class _Feed:
+    """Line iterator for ``csv.reader`` that signals when it runs dry."""
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> "_Feed":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise _NeedMore
+        return self.lines.popleft()
+
+
+class CsvRecords:
+    """Incremental CSV parser fed one physical line at a time.
+
+    A quoted field may contain newlines; when a record is incomplete the
+    reader gives up and the record is parsed again from its first line once
+    the next line arrives. The first record is the header; empty values of
+    optional fields become ``None``.
+    """
+
+    def __init__(self) -> None:
+        self._feed = _Feed()
+        self._reader = csv.reader(self._feed)
+        self._pending: list[str] = []
+        self.header: list[str] | None = None
+
+    @property
+    def pending(self) -> bool:
+        """Whether a quoted field spans the lines fed so far."""
+        return bool(self._pending)
+
+    def feed(self, line: str) -> dict[str, Any] | None:
+        """Add a line and return the finished record, if it completed one."""
+        self._pending.append(line)
+        self._feed.lines.extend(self._pending)
+        try:
+            values = next(self._reader)
+        except _NeedMore:
+            if len(self._pending) < MAX_RECORD_LINES:
+                return None
+            self._pending = []
+            raise ValueError(f"Quoted field spans more than {MAX_RECORD_LINES} lines") from None
+        except csv.Error as exc:
+            self._pending = []
+            self._feed.lines.clear()
+            raise ValueError(str(exc)) from exc
+        self._pending = []
+        return self._record(values)
+
+    def _record(self, values: list[str]) -> dict[str, Any] | None:
+        if not values:
+            return None
+        if self.header is None:
+            self.header = [name.strip().lstrip("\ufeff") for name in values]
+            return None
+        if len(values) != len(self.header):
+            raise ValueError(f"Expected {len(self.header)} columns, got {len(values)}")
+        return {
+            name: value
+            for name, value in zip(self.header, values)
+            if value != "" or name not in OPTIONAL_FIELDS
+        }
+
+    def close(self) -> None:
+        """Reject an unterminated quoted field at the end of the input."""
+        if self._pending:
+            raise ValueError("Unterminated quoted field at end of input")
+
+
+def parse_ndjson_line(line: str) -> dict[str, Any] | None:
+    """Parse one NDJSON line; blank lines give ``None``."""
+    if not line.strip():
+        return None
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("Each line must be a JSON object")
+    return record
+
+
+class CatalogImport:
+    """Validates raw rows in chunks and upserts them in batched transactions.
+
+    Rows are collected with :meth:`add`; once :attr:`ready` is set the
+    caller runs :meth:`flush` (possibly on a worker thread), which
+    validates the chunk and writes the valid rows in one transaction.
+    Invalid rows are counted and the first ``MAX_REPORTED_ERRORS`` are kept
+    with their line numbers.
+    """
+
+    def __init__(self, store: FittingsStore, batch_size: int = BATCH_SIZE) -> None:
+        self.store = store
+        self.batch_size = batch_size
+        self.received = 0
+        self.created = 0
+        self.updated = 0
+        self.rejected = 0
+        self.errors: list[dict[str, Any]] = []
+        self._pending: list[tuple[int, dict[str, Any]]] = []
+
+    @property
+    def ready(self) -> bool:
+        return len(self._pending) >= self.batch_size
+
+    def add(self, line: int, record: dict[str, Any]) -> None:
+        self.received += 1
+        self._pending.append((line, record))
+
+    def reject(self, line: int, error: str) -> None:
+        self.received += 1
+        self._reject(line, error)
+
+    def _reject(self, line: int, error: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def flush(self) -> None:
+        """Validate the pending rows and upsert the valid ones."""
+        pending, self._pending = self._pending, []
+        fittings: list[Fitting] = []
+        for line, record in pending:
+            try:
+                fittings.append(Fitting.model_validate(record))
+            except ValidationError as exc:
+                messages = (f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors())
+                self._reject(line, "; ".join(messages))
+        if fittings:
+            created = self.store.add_many(fittings)
+            self.created += created
+            self.updated += len(fittings) - created
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "received": self.received,
+            "created": self.created,
+            "updated": self.updated,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+class LineSplitter:
+    """Split a byte stream into lines, keeping their line endings.
+
+    Lines stay bytes so each one is decoded on its own: a byte that is not
+    valid UTF-8 spoils only its line. Splitting before decoding is safe
+    because a newline byte never occurs inside a multi-byte UTF-8 character.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        *lines, self._buffer = (self._buffer + chunk).split(b"\n")
+        return [line + b"\n" for line in lines]
+
+    def close(self) -> list[bytes]:
+        rest, self._buffer = self._buffer, b""
+        return [rest] if rest else []
+
+
+def decode_line(line: bytes) -> str:
+    """Decode one line of an import as UTF-8.
+
+    Raises ``ValueError`` naming the first offending byte, so the line is
+    rejected like any other malformed row.
+    """
+    try:
+        return line.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        raise ValueError(f"Line is not valid UTF-8 (byte {exc.start + 1}: {exc.reason})") from None
@@ -0,0 +1,141 @@
+"""Prefix, substring and typo-tolerant search over fitting codes and descriptions.
+
+Results come in three tiers: codes starting with the query (a range scan on
+the case-insensitive code index), codes or descriptions containing it (the
+FTS5 trigram index) and, if those do not fill the page, fuzzy matches.
+
+One typo changes at most three of the query's trigrams, so a row within
+``MAX_EDITS`` typos contains at least one of any ``3 * MAX_EDITS + 1`` of
+them. The fuzzy tier takes the rarest ones as anchors, lets FTS5 rank the
+rows containing an anchor by bm25 over all of the query's trigrams, and
+re-scores the best ``FUZZY_CANDIDATES`` by trigram similarity.
+
+Without the trigram tokenizer (sqlite before 3.34) only the prefix tier
+runs.
+"""
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+
+from app.schemas.fittings import Fitting
+from app.services.fittings_store import FittingsStore
+
+MAX_EDITS = 1
+# best-ranked rows re-scored for the fuzzy tier
+FUZZY_CANDIDATES = 1000
+MIN_SIMILARITY = 0.3
+# sorts after every character, so ``q + _MAX_CHAR`` bounds the codes starting with ``q``
+_MAX_CHAR = "\U0010ffff"
+
+_PREFIX_SQL = (
+    "SELECT code FROM fittings WHERE code >= ? COLLATE NOCASE AND code < ? COLLATE NOCASE "
+    "ORDER BY code COLLATE NOCASE LIMIT ?"
+)
+_MATCH_SQL = (
+    "SELECT fittings.code, fittings.description FROM fittings_search "
+    "JOIN fittings ON fittings.rowid = fittings_search.rowid "
+    "WHERE fittings_search MATCH ? ORDER BY fittings_search.rowid LIMIT ?"
+)
+_RANKED_MATCH_SQL = (
+    "SELECT fittings.code, fittings.description FROM fittings_search "
+    "JOIN fittings ON fittings.rowid = fittings_search.rowid "
+    "WHERE fittings_search MATCH ? ORDER BY fittings_search.rank LIMIT ?"
+)
+_DOC_COUNT_SQL = "SELECT doc FROM fittings_search_vocab WHERE term = ?"
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """A fitting found by :func:`search_fittings` and how it matched."""
+
+    fitting: Fitting
+    match: str
+    """``prefix``, ``substring`` or ``fuzzy``."""
+    score: float
+
+
+def trigrams(text: str) -> set[str]:
+    """Return the lower-cased three-character substrings of ``text``."""
+    text = text.lower()
+    return {text[idx : idx + 3] for idx in range(len(text) - 2)}
+
+
+def similarity(query_grams: set[str], fitting_code: str, description: str) -> float:
+    """Score a candidate between 0 and 1.
+
+    The code is compared as a whole (Jaccard index of the trigram sets);
+    the description only has to contain the query's trigrams, since it is
+    usually much longer than the query.
+    """
+    code_grams = trigrams(fitting_code)
+    shared = len(query_grams & code_grams)
+    code_score = shared / len(query_grams | code_grams)
+    description_score = len(query_grams & trigrams(description)) / len(query_grams)
+    return max(code_score, 0.9 * description_score)
+
+
+def _phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _fuzzy_query(db: sqlite3.Connection, grams: set[str]) -> str | None:
+    """Return the FTS5 query for the fuzzy tier, or ``None`` if nothing can match."""
+    counts = {}
+    for gram in grams:
+        row = db.execute(_DOC_COUNT_SQL, (gram,)).fetchone()
+        counts[gram] = row[0] if row else 0
+    rarest = sorted(grams, key=lambda gram: (counts[gram], gram))[: 3 * MAX_EDITS + 1]
+    # grams no row contains cannot be the surviving one
+    anchors = [gram for gram in rarest if counts[gram]]
+    if not anchors:
+        return None
+    # the second group matches every anchored row and only feeds bm25
+    return f"({' OR '.join(map(_phrase, anchors))}) AND ({' OR '.join(map(_phrase, sorted(grams)))})"
+
+
+def _fuzzy_hits(db: sqlite3.Connection, grams: set[str]) -> list[tuple[str, float]]:
+    """Return ``(code, score)`` for near misses, best first."""
+    match = _fuzzy_query(db, grams)
+    if match is None:
+        return []
+    scored = [
+        (round(similarity(grams, code, description), 3), code)
+        for code, description in db.execute(_RANKED_MATCH_SQL, (match, FUZZY_CANDIDATES))
+    ]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [(code, score) for score, code in scored if score >= MIN_SIMILARITY]
+
+
+def search_fittings(
+    store: FittingsStore, query: str, offset: int = 0, limit: int = 20, fuzzy: bool = True
+) -> tuple[list[SearchHit], bool]:
+    """Return one page of hits for ``query`` and whether more pages follow.
+
+    Substring matching needs at least three characters and fuzzy matching
+    more than ``3 * MAX_EDITS`` distinct trigrams (six characters for one
+    typo).
+    """
+    query = query.strip()
+    if not query:
+        return [], False
+    wanted = offset + limit + 1
+    hits: dict[str, tuple[str, float]] = {}
+    with store.connection() as db:
+        for (code,) in db.execute(_PREFIX_SQL, (query, query + _MAX_CHAR, wanted)):
+            hits[code] = ("prefix", 1.0)
+        if store.search_enabled:
+            if len(hits) < wanted and len(query) >= 3:
+                for code, _ in db.execute(_MATCH_SQL, (_phrase(query), wanted + len(hits))):
+                    hits.setdefault(code, ("substring", 1.0))
+            grams = trigrams(query)
+            if fuzzy and len(hits) < wanted and len(grams) > 3 * MAX_EDITS:
+                for code, score in _fuzzy_hits(db, grams):
+                    hits.setdefault(code, ("fuzzy", score))
+    page = list(hits.items())[offset : offset + limit]
+    results = []
+    for code, (match, score) in page:
+        fitting = store.get(code)
+        if fitting is not None:
+            results.append(SearchHit(fitting, match, score))
+    return results, len(hits) > offset + limit
@@ -1,13 +1,32 @@
-"""Simple in-memory store for instrumentation fittings."""
+"""Persistent store for instrumentation fittings.
+
+Fittings live in a SQLite database in WAL mode, so they survive restarts and
+every worker process sees the same catalog. A bounded in-memory LRU cache
+answers repeated reads; a version counter bumped by every write tells other
+processes when their cached entries are stale. Where sqlite supports it,
+triggers keep an FTS5 trigram index over codes and descriptions in step
+with the table for :mod:`app.services.fittings_search`.
+"""
 from __future__ import annotations
 
-from typing import Dict, Optional
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
 
 from app.schemas.fittings import Fitting
+from app.services.fitting_codes import PARSER_VERSION, numeric_attributes, size_mm
+from app.services.sizes import size_key
 
+FIELDS = tuple(Fitting.model_fields)
 
-_FITTINGS: Dict[str, Fitting] = {
-    "4A-C4L-25-SS": Fitting(
+DEFAULT_FITTINGS = [
+    Fitting(
         code="4A-C4L-25-SS",
         description="Check valve",
         series="4A",
@@ -15,14 +34,467 @@ _FITTINGS: Dict[str, Fitting] = {
         cracking_pressure="25 psi",
         material="stainless steel",
     )
-}
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fittings (
+    code TEXT PRIMARY KEY,
+    description TEXT NOT NULL,
+    series TEXT NOT NULL,
+    configuration TEXT NOT NULL,
+    cracking_pressure TEXT,
+    material TEXT,
+    brand TEXT,
+    fitting_type TEXT,
+    size TEXT,
+    part_brand TEXT,
+    part_type TEXT,
+    part_size TEXT,
+    part_material TEXT,
+    pressure_psi REAL,
+    size_mm REAL
+);
+CREATE INDEX IF NOT EXISTS fittings_part ON fittings (part_brand, part_type, part_size, part_material);
+CREATE INDEX IF NOT EXISTS fittings_code_nocase ON fittings (code COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS fittings_series ON fittings (series COLLATE NOCASE, code);
+CREATE INDEX IF NOT EXISTS fittings_configuration ON fittings (configuration COLLATE NOCASE, code);
+CREATE INDEX IF NOT EXISTS fittings_material ON fittings (material COLLATE NOCASE, code);
+CREATE INDEX IF NOT EXISTS fittings_pressure ON fittings (pressure_psi, code);
+CREATE INDEX IF NOT EXISTS fittings_size ON fittings (size_mm, code);
+CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('version', 0);
+"""
+
+# columns computed from the fields when a fitting is written
+PART_COLUMNS = ("part_brand", "part_type", "part_size", "part_material")
+NUMERIC_COLUMNS = ("pressure_psi", "size_mm")
+_COLUMNS = (*FIELDS, *PART_COLUMNS, *NUMERIC_COLUMNS)
+
+# FTS5's trigram tokenizer needs sqlite 3.34; without it search falls
+# back to code prefixes
+SEARCH_TOKENIZER = "trigram"
+_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS fittings_search USING fts5 (
+    code, description, content = 'fittings', tokenize = '{tokenizer}'
+);
+CREATE TRIGGER IF NOT EXISTS fittings_search_insert AFTER INSERT ON fittings BEGIN
+    INSERT INTO fittings_search (rowid, code, description) VALUES (new.rowid, new.code, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS fittings_search_delete AFTER DELETE ON fittings BEGIN
+    INSERT INTO fittings_search (fittings_search, rowid, code, description)
+    VALUES ('delete', old.rowid, old.code, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS fittings_search_update AFTER UPDATE OF code, description ON fittings BEGIN
+    INSERT INTO fittings_search (fittings_search, rowid, code, description)
+    VALUES ('delete', old.rowid, old.code, old.description);
+    INSERT INTO fittings_search (rowid, code, description) VALUES (new.rowid, new.code, new.description);
+END;
+CREATE VIRTUAL TABLE IF NOT EXISTS fittings_search_vocab USING fts5vocab (fittings_search, 'row');
+"""
+_DROP_SEARCH_TRIGGERS = """
+DROP TRIGGER IF EXISTS fittings_search_insert;
+DROP TRIGGER IF EXISTS fittings_search_delete;
+DROP TRIGGER IF EXISTS fittings_search_update;
+"""
+
+_SELECT_FIELDS = ", ".join(FIELDS)
+_GET_SQL = f"SELECT {_SELECT_FIELDS} FROM fittings WHERE code = ?"
+_UPSERT_SQL = (
+    f"INSERT INTO fittings ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+    "ON CONFLICT (code) DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS[1:])
+)
+_SET_NUMERIC_SQL = "UPDATE fittings SET pressure_psi = ?, size_mm = ? WHERE code = ?"
+_FIND_PART_SQL = (
+    "SELECT code FROM fittings WHERE part_brand = ? AND part_type = ? AND part_size = ? "
+    "ORDER BY rowid LIMIT 1"
+)
+_FIND_PART_MATERIAL_SQL = (
+    "SELECT code FROM fittings WHERE part_brand = ? AND part_type = ? AND part_size = ? AND part_material = ? "
+    "ORDER BY rowid LIMIT 1"
+)
+# attributes with a secondary index that ``FittingsStore.filter`` can match
+FILTERS = ("series", "configuration", "material")
+_VERSION_SQL = "SELECT value FROM catalog_meta WHERE key = 'version'"
+_BUMP_VERSION_SQL = "UPDATE catalog_meta SET value = value + 1 WHERE key = 'version'"
+_PARSER_VERSION_SQL = "SELECT value FROM catalog_meta WHERE key = 'numeric_parser'"
+_SET_PARSER_VERSION_SQL = "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('numeric_parser', ?)"
+
+PartKey = Tuple[str, str, str, str]
+_MISSING = object()
+# codes per ``IN (...)`` query, well below sqlite's parameter limit
+_IN_CHUNK = 500
+
+
+def part_key(brand: str, fitting_type: str, size: str, material: str | None = None) -> PartKey:
+    """Return the normalised index key for a part lookup.
+
+    Sizes are compared by :func:`size_key`, so ``1"`` finds a part stored
+    as ``1 in`` or ``25.4mm``.
+    """
+    return (
+        brand.strip().lower(),
+        fitting_type.strip().lower(),
+        size_key(size),
+        (material or "").strip().lower(),
+    )
+
+
+def _row(fitting: Fitting) -> tuple:
+    values = tuple(getattr(fitting, name) for name in FIELDS)
+    if fitting.brand and fitting.fitting_type and fitting.size:
+        values += part_key(fitting.brand, fitting.fitting_type, fitting.size, fitting.material)
+    else:
+        values += (None, None, None, None)
+    return values + numeric_attributes(fitting)
+
+
+class FittingsStore:
+    """SQLite-backed fitting catalog with a read-through LRU cache.
+
+    Connections are pooled (at most ``pool_size`` idle ones are kept) and
+    every statement is a module constant, so sqlite's per-connection
+    statement cache reuses the prepared statements. The cache is checked
+    against the database version at most every ``check_interval`` seconds;
+    writes made through this store take effect immediately.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path = "fittings.sqlite",
+        cache_size: int = 100_000,
+        pool_size: int = 4,
+        check_interval: float = 1.0,
+    ) -> None:
+        self.db_path = str(db_path)
+        self.cache_size = cache_size
+        self.pool_size = pool_size
+        self.check_interval = check_interval
+        self._idle: queue.SimpleQueue[sqlite3.Connection] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.search_enabled = False
+        self._entries: OrderedDict[str, object] = OrderedDict()
+        self._parts: OrderedDict[PartKey, Optional[str]] = OrderedDict()
+        self._version = -1
+        self._checked_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "FittingsStore":
+        """Create a store configured by ``FITTINGS_DB`` and ``FITTINGS_CACHE_SIZE``."""
+        cache_size = os.environ.get("FITTINGS_CACHE_SIZE")
+        return cls(
+            db_path=os.environ.get("FITTINGS_DB") or "fittings.sqlite",
+            cache_size=int(cache_size) if cache_size else 100_000,
+        )
+
+    # connections ------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, cached_statements=64)
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        db.execute("PRAGMA busy_timeout = 5000")
+        return db
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection (autocommit mode)."""
+        try:
+            db = self._idle.get_nowait()
+        except queue.Empty:
+            db = self._connect()
+            self._ensure_schema(db)
+        try:
+            yield db
+        finally:
+            if self._idle.qsize() < self.pool_size:
+                self._idle.put(db)
+            else:
+                db.close()
+
+    def _ensure_schema(self, db: sqlite3.Connection) -> None:
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            indexed = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'fittings_search_insert'").fetchone()
+            columns = {row[1] for row in db.execute("PRAGMA table_info(fittings)")}
+            # catalogs created before the numeric columns existed
+            missing = [column for column in NUMERIC_COLUMNS if columns and column not in columns]
+            for column in missing:
+                db.execute(f"ALTER TABLE fittings ADD COLUMN {column} REAL")
+            db.executescript(_SCHEMA)
+            self.search_enabled = self._ensure_search(db, rebuild=indexed is None)
+            parser = db.execute(_PARSER_VERSION_SQL).fetchone()
+            if missing or parser is None or parser[0] != PARSER_VERSION:
+                # new columns, or numbers derived by an older parser
+                self._backfill_numeric(db)
+            if db.execute("SELECT 1 FROM fittings LIMIT 1").fetchone() is None:
+                self._write(db, DEFAULT_FITTINGS)
+            self._initialized = True
+
+    @staticmethod
+    def _ensure_search(db: sqlite3.Connection, rebuild: bool) -> bool:
+        try:
+            db.executescript(_SEARCH_SCHEMA.format(tokenizer=SEARCH_TOKENIZER))
+            # an index created by a newer sqlite only fails once it is opened
+            db.execute("SELECT rowid FROM fittings_search LIMIT 1").fetchall()
+        except sqlite3.OperationalError:
+            # no FTS5 or no trigram tokenizer: keep the catalog writable
+            db.executescript(_DROP_SEARCH_TRIGGERS)
+            return False
+        if rebuild:
+            # a new index, or one that missed writes while it was unavailable
+            db.execute("INSERT INTO fittings_search (fittings_search) VALUES ('rebuild')")
+        return True
+
+    @staticmethod
+    def _backfill_numeric(db: sqlite3.Connection) -> None:
+        fittings = [Fitting(**dict(zip(FIELDS, row))) for row in db.execute(f"SELECT {_SELECT_FIELDS} FROM fittings")]
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(_SET_NUMERIC_SQL, [(*numeric_attributes(fitting), fitting.code) for fitting in fittings])
+            db.execute(_SET_PARSER_VERSION_SQL, (PARSER_VERSION,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run writes in one immediate transaction that bumps the catalog version."""
+        with self.connection() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute(_BUMP_VERSION_SQL)
+                version = db.execute(_VERSION_SQL).fetchone()[0]
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        with self._lock:
+            # another process may have written in between; then drop everything
+            if version != self._version + 1:
+                self._entries.clear()
+            self._parts.clear()
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _write(db: sqlite3.Connection, fittings: list[Fitting]) -> None:
+        db.executemany(_UPSERT_SQL, [_row(fitting) for fitting in fittings])
+
+    # cache ------------------------------------------------------------------
+
+    def _check_version(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self.connection() as db:
+            version = db.execute(_VERSION_SQL).fetchone()[0]
+        with self._lock:
+            self._checked_at = now
+            if version != self._version:
+                self._entries.clear()
+                self._parts.clear()
+                self._version = version
+
+    def _remember(self, cache: OrderedDict, key: object, value: object, version: int) -> None:
+        with self._lock:
+            # a write committed since the read began may have made ``value``
+            # stale, and it has already moved the version past the eviction
+            if version != self._version:
+                return
+            cache[key] = value
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+
+    # public API -------------------------------------------------------------
+
+    def get(self, code: str) -> Optional[Fitting]:
+        """Return the fitting with ``code``, reading through the cache."""
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(code, _MISSING)
+            if entry is not _MISSING:
+                self.hits += 1
+                self._entries.move_to_end(code)
+                return entry  # type: ignore[return-value]
+            self.misses += 1
+            version = self._version
+        with self.connection() as db:
+            row = db.execute(_GET_SQL, (code,)).fetchone()
+        fitting = Fitting(**dict(zip(FIELDS, row))) if row else None
+        self._remember(self._entries, code, fitting, version)
+        return fitting
+
+    def add(self, fitting: Fitting) -> None:
+        """Insert or update a fitting."""
+        self.add_many([fitting])
+
+    def add_many(self, fittings: list[Fitting]) -> int:
+        """Insert or update several fittings in one transaction.
+
+        Returns how many of the codes were new to the catalog.
+        """
+        codes = list(dict.fromkeys(fitting.code for fitting in fittings))
+        with self.transaction() as db:
+            existing = self._existing_codes(db, codes)
+            self._write(db, fittings)
+        with self._lock:
+            for fitting in fittings:
+                if fitting.code in self._entries:
+                    self._entries[fitting.code] = fitting
+        return len(codes) - len(existing)
+
+    @staticmethod
+    def _existing_codes(db: sqlite3.Connection, codes: list[str]) -> set[str]:
+        found: set[str] = set()
+        for start in range(0, len(codes), _IN_CHUNK):
+            chunk = codes[start : start + _IN_CHUNK]
+            sql = f"SELECT code FROM fittings WHERE code IN ({', '.join('?' * len(chunk))})"
+            found.update(row[0] for row in db.execute(sql, chunk))
+        return found
+
+    def find_part(self, brand: str, fitting_type: str, size: str, material: str | None = None) -> Optional[Fitting]:
+        """Return the first catalog part for a brand, fitting type, size and material."""
+        self._check_version()
+        key = part_key(brand, fitting_type, size, material)
+        code = self._parts.get(key, _MISSING)
+        if code is _MISSING:
+            version = self._version
+            with self.connection() as db:
+                if key[3]:
+                    row = db.execute(_FIND_PART_MATERIAL_SQL, key).fetchone()
+                else:
+                    row = db.execute(_FIND_PART_SQL, key[:3]).fetchone()
+            code = row[0] if row else None
+            self._remember(self._parts, key, code, version)
+        return self.get(code) if code is not None else None
+
+    def filter(
+        self,
+        after: str | None = None,
+        limit: int = 50,
+        min_pressure: float | None = None,
+        max_pressure: float | None = None,
+        size: str | None = None,
+        **attributes: str | None,
+    ) -> Tuple[list[Fitting], int]:
+        """Return fittings matching ``attributes`` ordered by code, and the total.
+
+        Attributes are any of :data:`FILTERS`, matched case-insensitively;
+        ``None`` values are ignored. Every attribute has a covering index on
+        ``(value, code)``, which acts as a posting list of codes sorted by
+        code: several filters are answered by a merge ``INTERSECT`` of those
+        lists, and ``after`` (the last code of the previous page) seeks into
+        each of them, so neither the page nor the count scans the table.
+
+        ``min_pressure`` and ``max_pressure`` bound the cracking pressure in
+        psi and ``size`` selects one tube size in any spelling; both use the
+        numeric columns parsed at insert time, through the same kind of
+        index, so a pressure range is a binary search plus a range scan.
+        """
+        unknown = set(attributes) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Cannot filter on {', '.join(sorted(unknown))}")
+        conditions: list[tuple[str, tuple[object, ...]]] = [
+            (f"{name} = ? COLLATE NOCASE", (attributes[name],))
+            for name in FILTERS
+            if attributes.get(name) is not None
+        ]
+        if size is not None:
+            mm = size_mm(size)
+            if mm is None:
+                raise ValueError(f"Cannot parse size {size!r}")
+            conditions.append(("size_mm = ?", (mm,)))
+        if min_pressure is not None or max_pressure is not None:
+            # an open bound still has to be a range, or sqlite walks the table by code instead
+            bounds = (
+                float("-inf") if min_pressure is None else min_pressure,
+                float("inf") if max_pressure is None else max_pressure,
+            )
+            conditions.append(("pressure_psi BETWEEN ? AND ?", bounds))
+
+        values = [value for _, args in conditions for value in args]
+        branches = [f"SELECT code FROM fittings WHERE {condition}" for condition, _ in conditions]
+        if not branches:
+            count_sql = "SELECT COUNT(*) FROM fittings"
+        elif len(branches) == 1:
+            count_sql = f"SELECT COUNT(*) FROM fittings WHERE {conditions[0][0]}"
+        else:
+            # ORDER BY makes sqlite merge the sorted lists instead of building a temp b-tree
+            count_sql = f"SELECT COUNT(*) FROM ({' INTERSECT '.join(branches)} ORDER BY 1)"
+        if branches:
+            page_sql = " INTERSECT ".join(f"{branch} AND code > ?" for branch in branches)
+            params = [value for _, args in conditions for value in (*args, after or "")]
+        else:
+            page_sql = "SELECT code FROM fittings WHERE code > ?"
+            params = [after or ""]
+        with self.connection() as db:
+            db.execute("BEGIN")
+            try:
+                # one read transaction, so the total and the page agree
+                codes = [row[0] for row in db.execute(f"{page_sql} ORDER BY 1 LIMIT ?", (*params, limit))]
+                total = db.execute(count_sql, values).fetchone()[0]
+                placeholders = ", ".join("?" * len(codes))
+                rows = db.execute(
+                    f"SELECT {_SELECT_FIELDS} FROM fittings WHERE code IN ({placeholders}) ORDER BY code", codes
+                ).fetchall()
+            finally:
+                db.execute("COMMIT")
+        return [Fitting(**dict(zip(FIELDS, row))) for row in rows], total
+
+    def version(self) -> int:
+        """Return the catalog version, which changes whenever the catalog does."""
+        self._check_version()
+        return self._version
+
+    def stats(self) -> dict[str, int]:
+        """Return cache counters and the catalog version."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "parts": len(self._parts),
+            "max_entries": self.cache_size,
+            "version": self._version,
+        }
+
+    def close(self) -> None:
+        """Close the idle pooled connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+fittings_db = FittingsStore.from_env()
 
 
 def get_fitting(code: str) -> Optional[Fitting]:
     """Return fitting information for the given code."""
-    return _FITTINGS.get(code)
+    return fittings_db.get(code)
 
 
 def add_fitting(fitting: Fitting) -> None:
     """Add or update a fitting in the store."""
-    _FITTINGS[fitting.code] = fitting
+    fittings_db.add(fitting)
+
+
+def find_part(brand: str, fitting_type: str, size: str, material: str | None = None) -> Optional[Fitting]:
+    """Return the catalog part for a brand, fitting type, size and material.
+
+    Lookups use the ``fittings_part`` index and are cached per key.
+    """
+    return fittings_db.find_part(brand, fitting_type, size, material)
+
+
+def catalog_version() -> int:
+    """Return a counter that changes whenever the catalog changes."""
+    return fittings_db.version()
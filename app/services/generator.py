@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from app.schemas.pid import Component, PipingSystem, HandlelisteResponse
+from typing import Any, Callable, Iterator
+
+from app.schemas.pid import Component, PipingSystem, HandlelisteResponse, BomResponse, BomRow, PartRow, PartsResponse
+from app.services.fittings_store import FittingsStore, find_part
+from app.services.sizes import SizeRegistry
+from app.services.columnar import SystemColumns
 
 
 CATALOG = {
@@ -24,69 +29,234 @@ FITTINGS_BASE = {
 
 BRANDS = {"parker", "butech", "swagelok"}
 
-# Allow any component transitions; fittings will be looked up when available
+FITTING_TYPES = {"Adapter", "Bulkhead", "Tee", *FITTINGS_BASE.values()}
 
+# Allow any component transitions; fittings will be looked up when available
 
-def generate_handleliste(system: PipingSystem, brand: str = "parker") -> HandlelisteResponse:
-    """Generate a handleliste for the given piping system.
-
-    Parameters
-    ----------
-    system:
-        The piping system description.
-    brand:
-        Brand name for fittings (``"parker"``, ``"butech"`` or ``"swagelok"``).
-    """
 
+def _check_inputs(system: PipingSystem | SystemColumns, brand: str) -> str:
+    """Validate brand and components, returning the lower-case brand."""
     brand_lc = brand.lower()
     if brand_lc not in BRANDS:
         raise ValueError(f"Unknown brand: {brand}")
 
-    items: list[str] = []
-
     for comp in system.components:
         if comp not in CATALOG:
             raise ValueError(f"Unknown component: {comp.value}")
+    return brand_lc
+
 
+def _line_rows(
+    system: PipingSystem | SystemColumns, sizes: SizeRegistry
+) -> Iterator[tuple[int, int, int, bool, bool]]:
+    """Yield ``(start, end, size code, tee, bulkhead)`` for every line."""
+    if isinstance(system, SystemColumns):
+        return zip(system.start, system.end, system.size_codes(sizes), system.tee, system.bulkhead)
+    code = sizes.code
+    return ((line.start, line.end, code(line.size), line.tee, line.bulkhead) for line in system.lines)
+
+
+def _iter_items(
+    system: PipingSystem | SystemColumns,
+    brand_lc: str,
+    sizes: SizeRegistry | None = None,
+    fitting: Callable[[str, int, int | None], Any] | None = None,
+) -> Iterator[Any]:
+    """Yield the handleliste items in order for an already validated system.
+
+    Sizes are interned in ``sizes``, so the size-change check compares
+    small integer codes and equivalent spellings such as ``1"`` and
+    ``25.4mm`` need no adapter. Fittings are produced by
+    ``fitting(fitting_type, size, from_size)``, where ``from_size`` is only
+    set for adapters; by default that is the generic ``"<Brand> <type>"``
+    string. Adapters are memoised per ``(from, to)`` size pair.
+    """
+    if sizes is None:
+        sizes = SizeRegistry()
+    if fitting is None:
+        names = {ftype: f"{brand_lc.capitalize()} {ftype}" for ftype in FITTING_TYPES}
+        fitting = lambda ftype, size, from_size=None: names[ftype]  # noqa: E731
+    components = system.components
+    count = len(components)
     seen: set[int] = set()
-    connection_sizes: dict[int, str] = {}
+    connection_sizes: dict[int, int] = {}
+    adapters: dict[tuple[int, int], Any] = {}
 
-    for idx, line in enumerate(system.lines):
+    for start, end, size, tee, bulkhead in _line_rows(system, sizes):
         try:
-            start_comp = system.components[line.start]
-            end_comp = system.components[line.end]
+            start_comp = components[start]
+            end_comp = components[end]
         except IndexError as exc:
             raise ValueError("Line references invalid component index") from exc
+        # negative indices count from the end; key components by position
+        if start < 0:
+            start += count
+        if end < 0:
+            end += count
 
         # add start component if not added yet
-        if line.start not in seen:
-            items.append(CATALOG[start_comp])
-            seen.add(line.start)
+        if start not in seen:
+            yield CATALOG[start_comp]
+            seen.add(start)
 
         # adapter if component already connected with different size
-        prev_size = connection_sizes.get(line.start)
-        if prev_size is not None and prev_size != line.size:
-            items.append(f"{brand_lc.capitalize()} Adapter")
+        prev_size = connection_sizes.get(start)
+        if prev_size is not None and prev_size != size:
+            adapter = adapters.get((prev_size, size))
+            if adapter is None:
+                adapter = adapters[(prev_size, size)] = fitting("Adapter", size, prev_size)
+            yield adapter
 
         fitting_base = FITTINGS_BASE.get((start_comp, end_comp))
         if fitting_base:
-            items.append(f"{brand_lc.capitalize()} {fitting_base}")
+            yield fitting(fitting_base, size)
 
-        if line.bulkhead:
-            items.append(f"{brand_lc.capitalize()} Bulkhead")
-        if line.tee:
-            items.append(f"{brand_lc.capitalize()} Tee")
+        if bulkhead:
+            yield fitting("Bulkhead", size)
+        if tee:
+            yield fitting("Tee", size)
 
-        connection_sizes[line.start] = line.size
-        connection_sizes[line.end] = line.size
+        connection_sizes[start] = size
+        connection_sizes[end] = size
 
-        if line.end not in seen:
-            items.append(CATALOG[end_comp])
-            seen.add(line.end)
+        if end not in seen:
+            yield CATALOG[end_comp]
+            seen.add(end)
 
     # include standalone components with no lines
-    for idx, comp in enumerate(system.components):
+    for idx, comp in enumerate(components):
         if idx not in seen:
-            items.append(CATALOG[comp])
+            yield CATALOG[comp]
+
+
+def iter_handleliste(system: PipingSystem | SystemColumns, brand: str = "parker") -> Iterator[str]:
+    """Return a generator yielding the handleliste items one at a time.
+
+    The brand, components and line indices are checked up front, so a
+    caller streaming the items never hits a validation error half way.
+    The full list is never built.
+    """
+
+    brand_lc = _check_inputs(system, brand)
+    count = len(system.components)
+    if isinstance(system, SystemColumns):
+        for column in (system.start, system.end):
+            # same rule as list indexing in ``_iter_items``
+            if len(column) and not (-count <= min(column) and max(column) < count):
+                raise ValueError("Line references invalid component index")
+    else:
+        for line in system.lines:
+            if not (-count <= line.start < count and -count <= line.end < count):
+                raise ValueError("Line references invalid component index")
+    return _iter_items(system, brand_lc)
+
+
+def generate_handleliste(system: PipingSystem | SystemColumns, brand: str = "parker") -> HandlelisteResponse:
+    """Generate a handleliste for the given piping system.
 
-    return HandlelisteResponse(items=items)
+    Parameters
+    ----------
+    system:
+        The piping system description, either as models or as columns.
+    brand:
+        Brand name for fittings (``"parker"``, ``"butech"`` or ``"swagelok"``).
+    """
+
+    brand_lc = _check_inputs(system, brand)
+    return HandlelisteResponse(items=list(_iter_items(system, brand_lc)))
+
+
+def generate_bom(
+    system: PipingSystem | SystemColumns, brand: str = "parker", include_items: bool = False
+) -> BomResponse:
+    """Generate the handleliste as quantities per item.
+
+    Items are counted in a single pass and returned as ``{item, qty}`` rows
+    in order of first appearance. The ordered item list is only built when
+    ``include_items`` is set.
+    """
+
+    brand_lc = _check_inputs(system, brand)
+    counts: dict[str, int] = {}
+    items: list[str] | None = [] if include_items else None
+    for item in _iter_items(system, brand_lc):
+        counts[item] = counts.get(item, 0) + 1
+        if items is not None:
+            items.append(item)
+    return BomResponse(rows=[BomRow(item=item, qty=qty) for item, qty in counts.items()], items=items)
+
+
+def generate_parts(
+    system: PipingSystem | SystemColumns,
+    brand: str = "parker",
+    material: str | None = None,
+    store: FittingsStore | None = None,
+) -> PartsResponse:
+    """Generate the handleliste as quantities of catalog part numbers.
+
+    Every fitting is resolved by brand, fitting type, line size and
+    ``material`` through the fittings store's part index; adapters are
+    looked up by their size pair (e.g. ``1" x 1/2"``) so they resolve to
+    the matching reducer. Each distinct ``(type, size)`` is looked up once
+    per call. Fittings without a catalog match keep their generic name and
+    count as ``unresolved``. ``store`` defaults to the shared catalog.
+    """
+
+    lookup = store.find_part if store is not None else find_part
+    brand_lc = _check_inputs(system, brand)
+    brand_name = brand_lc.capitalize()
+    sizes = SizeRegistry()
+    resolved: dict[tuple[str, int], tuple[str, str, str | None]] = {}
+
+    def fitting(ftype: str, size: int, from_size: int | None = None) -> tuple[str, str, str | None]:
+        if from_size is not None:
+            # adapters are memoised per size pair by ``_iter_items``
+            label = f"{sizes.label(from_size)} x {sizes.label(size)}"
+            part = lookup(brand_lc, ftype, label, material)
+            return (f"{brand_name} {ftype}", label, part.code if part else None)
+        row = resolved.get((ftype, size))
+        if row is None:
+            label = sizes.label(size)
+            part = lookup(brand_lc, ftype, label, material)
+            row = (f"{brand_name} {ftype}", label, part.code if part else None)
+            resolved[(ftype, size)] = row
+        return row
+
+    counts: dict[Any, int] = {}
+    for item in _iter_items(system, brand_lc, sizes, fitting):
+        counts[item] = counts.get(item, 0) + 1
+
+    rows: list[PartRow] = []
+    unresolved = 0
+    for item, qty in counts.items():
+        if isinstance(item, str):
+            rows.append(PartRow(item=item, qty=qty))
+            continue
+        name, size, part_number = item
+        if part_number is None:
+            unresolved += qty
+        rows.append(PartRow(item=name, size=size, part_number=part_number, qty=qty))
+    return PartsResponse(rows=rows, unresolved=unresolved)
+
+
+def run_handleliste_jobs(jobs: list[dict[str, Any]], mode: str = "list") -> list[dict[str, Any]]:
+    """Run a chunk of raw ``{system, brand}`` batch jobs.
+
+    Each job is validated and generated independently; failures are returned
+    as ``{"error": ...}`` records instead of aborting the chunk. Intended to
+    run in a worker process, so validation is spread across cores too.
+    """
+    results: list[dict[str, Any]] = []
+    for job in jobs:
+        try:
+            system = PipingSystem.model_validate(job["system"])
+            brand = job.get("brand", "parker")
+            if mode == "bom":
+                bom = generate_bom(system, brand=brand)
+                results.append({"rows": [row.model_dump() for row in bom.rows]})
+            else:
+                results.append({"items": generate_handleliste(system, brand=brand).items})
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            # pydantic's ValidationError is a ValueError
+            results.append({"error": str(exc)})
+    return results
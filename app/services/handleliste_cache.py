@@ -0,0 +1,113 @@
+"""Cache of serialized handleliste responses keyed by a canonical system hash."""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from app.schemas.pid import PipingSystem
+
+
+def payload_key(payload: bytes, brand: str, *variant: object) -> str:
+    """Return a hash identifying a request payload + ``brand`` (+ response variant)."""
+    digest = hashlib.sha256(payload)
+    for part in (brand.lower(), *variant):
+        digest.update(b"\0" + str(part).encode())
+    return digest.hexdigest()
+
+
+def system_key(system: PipingSystem, brand: str, *variant: object) -> str:
+    """Return a hash identifying ``system`` + ``brand`` (+ response variant).
+
+    Pydantic serializes fields in declaration order, so equal systems give
+    the same JSON and therefore the same key; the brand is case-folded like
+    the generator does.
+    """
+    return payload_key(system.model_dump_json().encode(), brand, *variant)
+
+
+def etag_for(key: str) -> str:
+    """Return the strong ``ETag`` header value for a cache key."""
+    return f'"{key[:40]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Return whether an ``If-None-Match`` header matches ``etag``."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """LRU cache of serialized response bodies bounded by total size."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Create a cache configured by ``HANDLELISTE_CACHE_BYTES``."""
+        max_bytes = os.environ.get("HANDLELISTE_CACHE_BYTES")
+        return cls(max_bytes=int(max_bytes) if max_bytes else 32 * 1024 * 1024)
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached body for ``key`` or ``None``."""
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: str, body: bytes) -> None:
+        """Store the serialized body for ``key``."""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict[str, float | int]:
+        """Return hit/miss counters, hit rate and memory usage."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+handleliste_cache = ResponseCache.from_env()
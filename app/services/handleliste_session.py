@@ -0,0 +1,313 @@
+"""Server-side piping systems whose handleliste is maintained incrementally.
+
+Sessions live in the memory of the process that created them, so the
+session routes need a single uvicorn worker (or sticky routing); on any
+other worker a session id is unknown. Sessions idle for longer than
+``SESSION_TTL`` seconds are dropped, and the least recently used ones are
+evicted while there are more than ``MAX_SESSIONS`` or together they hold
+more than ``MAX_SESSION_LINES`` lines.
+"""
+from __future__ import annotations
+
+import os
+import time
+import uuid
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+from typing import Iterable
+
+from app.schemas.pid import Component, Line, PipingSystem, SessionPatch
+from app.services.generator import BRANDS, CATALOG, FITTINGS_BASE
+from app.services.sizes import size_key
+
+
+MAX_SESSIONS = 1000
+SESSION_TTL = float(os.environ.get("HANDLELISTE_SESSION_TTL") or 3600)
+MAX_SESSION_LINES = int(os.environ.get("HANDLELISTE_SESSION_LINES") or 1_000_000)
+
+
+class HandlelisteSession:
+    """A piping system plus the quantities of its handleliste.
+
+    Every line contributes its own fittings (connection fitting, bulkhead,
+    tee and the adapter when the size changes from the previous line on its
+    start component) and every component its catalog item. These per-line
+    contributions are cached, so an edit only recomputes the lines whose
+    contribution can change and reports the difference as a delta. The
+    quantities always equal those of :func:`generate_bom` for
+    :meth:`to_system`.
+
+    Components are addressed by their index and lines by an id that stays
+    stable across edits; removed components keep their index as a gap.
+    """
+
+    def __init__(self, system: PipingSystem, brand: str = "parker") -> None:
+        brand_lc = brand.lower()
+        if brand_lc not in BRANDS:
+            raise ValueError(f"Unknown brand: {brand}")
+        self.brand = brand_lc
+        self._brand_name = brand_lc.capitalize()
+        self.version = 0
+        self.last_used = time.monotonic()
+        self.components: list[Component | None] = []
+        self.lines: dict[int, Line] = {}
+        self._next_line_id = 0
+        # component index -> ids of the lines touching it, in line order
+        self._touching: dict[int, list[int]] = {}
+        self._contributions: dict[int, Counter[str]] = {}
+        self.counts: Counter[str] = Counter()
+
+        delta: Counter[str] = Counter()
+        for comp in system.components:
+            self._add_component(comp, delta)
+        for line in system.lines:
+            self._check_line(line)
+            self._add_line(line, delta)
+        self.counts.update(delta)
+
+    def rows(self) -> list[tuple[str, int]]:
+        """Return the current ``(item, qty)`` quantities."""
+        return [(item, qty) for item, qty in self.counts.items() if qty]
+
+    def to_system(self) -> PipingSystem:
+        """Return the current system with removed components compacted away."""
+        mapping: dict[int, int] = {}
+        components: list[Component] = []
+        for idx, comp in enumerate(self.components):
+            if comp is not None:
+                mapping[idx] = len(components)
+                components.append(comp)
+        lines = [
+            line.model_copy(update={"start": mapping[line.start], "end": mapping[line.end]})
+            for line in self.lines.values()
+        ]
+        return PipingSystem(components=components, lines=lines)
+
+    def apply(self, patch: SessionPatch) -> tuple[dict[str, int], list[int]]:
+        """Apply ``patch`` and return the item delta and the ids of added lines.
+
+        The whole patch is validated before anything changes, so a rejected
+        patch leaves the session untouched.
+        """
+        self._validate(patch)
+        delta: Counter[str] = Counter()
+        for comp in patch.add_components:
+            self._add_component(comp, delta)
+        for idx, comp in patch.update_components.items():
+            self._update_component(idx, comp, delta)
+        for line_id, line in patch.update_lines.items():
+            self._replace_line(line_id, line, delta)
+        for line_id in patch.remove_lines:
+            self._remove_line(line_id, delta)
+        added = [self._add_line(line, delta) for line in patch.add_lines]
+        for idx in patch.remove_components:
+            delta[CATALOG[self.components[idx]]] -= 1
+            self.components[idx] = None
+            self._touching.pop(idx, None)
+
+        self.counts.update(delta)
+        self.version += 1
+        return {item: qty for item, qty in delta.items() if qty}, added
+
+    # validation -------------------------------------------------------------
+
+    def _validate(self, patch: SessionPatch) -> None:
+        count = len(self.components) + len(patch.add_components)
+        removed = set(patch.remove_components)
+
+        def alive(idx: int) -> bool:
+            if idx < len(self.components):
+                return self.components[idx] is not None
+            return idx < count
+
+        for idx in list(patch.update_components) + patch.remove_components:
+            if not (0 <= idx < len(self.components)) or self.components[idx] is None:
+                raise ValueError(f"Unknown component index: {idx}")
+        for line_id in list(patch.update_lines) + patch.remove_lines:
+            if line_id not in self.lines:
+                raise ValueError(f"Unknown line id: {line_id}")
+        if len(set(patch.remove_lines)) != len(patch.remove_lines) or set(patch.remove_lines) & set(patch.update_lines):
+            raise ValueError("A line may only be updated or removed once per patch")
+        for line in list(patch.update_lines.values()) + patch.add_lines:
+            for idx in (line.start, line.end):
+                if idx < 0 or not alive(idx) or idx in removed:
+                    raise ValueError("Line references invalid component index")
+
+        for idx in removed:
+            still_connected = set(self._touching.get(idx, ())) - set(patch.remove_lines) - set(patch.update_lines)
+            if still_connected:
+                raise ValueError(f"Component {idx} is still connected to lines {sorted(still_connected)}")
+
+    def _check_line(self, line: Line) -> None:
+        for idx in (line.start, line.end):
+            if not (0 <= idx < len(self.components)) or self.components[idx] is None:
+                raise ValueError("Line references invalid component index")
+
+    # incremental maintenance -----------------------------------------------
+
+    def _add_component(self, comp: Component, delta: Counter[str]) -> None:
+        self.components.append(comp)
+        delta[CATALOG[comp]] += 1
+
+    def _update_component(self, idx: int, comp: Component, delta: Counter[str]) -> None:
+        delta[CATALOG[self.components[idx]]] -= 1
+        self.components[idx] = comp
+        delta[CATALOG[comp]] += 1
+        # connection fittings depend on the component types at both ends
+        self._recompute(self._touching.get(idx, ()), delta)
+
+    def _add_line(self, line: Line, delta: Counter[str]) -> int:
+        line_id = self._next_line_id
+        self._next_line_id += 1
+        self.lines[line_id] = line
+        self._link(line_id, line)
+        self._recompute([line_id, *self._followers(line_id, line)], delta)
+        return line_id
+
+    def _remove_line(self, line_id: int, delta: Counter[str]) -> None:
+        line = self.lines.pop(line_id)
+        followers = self._followers(line_id, line)
+        self._unlink(line_id, line)
+        delta.subtract(self._contributions.pop(line_id))
+        self._recompute(followers, delta)
+
+    def _replace_line(self, line_id: int, line: Line, delta: Counter[str]) -> None:
+        old = self.lines[line_id]
+        affected = self._followers(line_id, old)
+        self._unlink(line_id, old)
+        # assigning to the existing key keeps the line's position
+        self.lines[line_id] = line
+        self._link(line_id, line)
+        affected += [line_id, *self._followers(line_id, line)]
+        self._recompute(affected, delta)
+
+    def _link(self, line_id: int, line: Line) -> None:
+        for idx in {line.start, line.end}:
+            insort(self._touching.setdefault(idx, []), line_id)
+
+    def _unlink(self, line_id: int, line: Line) -> None:
+        for idx in {line.start, line.end}:
+            touching = self._touching[idx]
+            touching.pop(bisect_left(touching, line_id))
+
+    def _followers(self, line_id: int, line: Line) -> list[int]:
+        """Lines whose adapter check may look back to ``line``."""
+        followers = []
+        for idx in {line.start, line.end}:
+            touching = self._touching.get(idx, [])
+            pos = bisect_left(touching, line_id)
+            if pos < len(touching) and touching[pos] == line_id:
+                pos += 1
+            if pos < len(touching):
+                followers.append(touching[pos])
+        return followers
+
+    def _recompute(self, line_ids: Iterable[int], delta: Counter[str]) -> None:
+        for line_id in set(line_ids):
+            if line_id not in self.lines:
+                continue
+            old = self._contributions.get(line_id)
+            if old is not None:
+                delta.subtract(old)
+            new = self._contribution(line_id)
+            self._contributions[line_id] = new
+            delta.update(new)
+
+    def _contribution(self, line_id: int) -> Counter[str]:
+        line = self.lines[line_id]
+        items: Counter[str] = Counter()
+        touching = self._touching[line.start]
+        pos = bisect_left(touching, line_id)
+        if pos > 0 and size_key(self.lines[touching[pos - 1]].size) != size_key(line.size):
+            items[f"{self._brand_name} Adapter"] += 1
+        fitting_base = FITTINGS_BASE.get((self.components[line.start], self.components[line.end]))
+        if fitting_base:
+            items[f"{self._brand_name} {fitting_base}"] += 1
+        if line.bulkhead:
+            items[f"{self._brand_name} Bulkhead"] += 1
+        if line.tee:
+            items[f"{self._brand_name} Tee"] += 1
+        return items
+
+
+_SESSIONS: "OrderedDict[str, HandlelisteSession]" = OrderedDict()
+# lines held by all stored sessions together, kept in step with _SESSIONS
+_line_total = 0
+
+
+def _drop(session_id: str) -> HandlelisteSession | None:
+    global _line_total
+    session = _SESSIONS.pop(session_id, None)
+    if session is not None:
+        _line_total -= len(session.lines)
+    return session
+
+
+def _prune(keep: str | None = None) -> None:
+    now = time.monotonic()
+    # least recently used first, so expired sessions sit at the front
+    while _SESSIONS:
+        session_id, session = next(iter(_SESSIONS.items()))
+        if now - session.last_used <= SESSION_TTL:
+            break
+        _drop(session_id)
+    while len(_SESSIONS) > MAX_SESSIONS or _line_total > MAX_SESSION_LINES:
+        session_id = next(iter(_SESSIONS))
+        if session_id == keep:
+            break
+        _drop(session_id)
+
+
+def _check_lines(count: int) -> None:
+    if count > MAX_SESSION_LINES:
+        raise ValueError(f"Sessions hold at most {MAX_SESSION_LINES} lines")
+
+
+def create_session(system: PipingSystem, brand: str = "parker") -> tuple[str, HandlelisteSession]:
+    """Create and store a session, evicting idle and least recently used ones."""
+    global _line_total
+    _check_lines(len(system.lines))
+    session = HandlelisteSession(system, brand)
+    session_id = uuid.uuid4().hex
+    _SESSIONS[session_id] = session
+    _line_total += len(session.lines)
+    _prune(keep=session_id)
+    return session_id, session
+
+
+def patch_session(
+    session_id: str, session: HandlelisteSession, patch: SessionPatch
+) -> tuple[dict[str, int], list[int]]:
+    """Apply ``patch`` to a stored session, as :meth:`HandlelisteSession.apply`.
+
+    A patch that would leave the session with more than
+    ``MAX_SESSION_LINES`` lines is rejected with ``ValueError``; otherwise
+    least recently used sessions make room for the lines it adds.
+    """
+    global _line_total
+    _check_lines(len(session.lines) + len(patch.add_lines) - len(patch.remove_lines))
+    before = len(session.lines)
+    result = session.apply(patch)
+    if _SESSIONS.get(session_id) is session:
+        _line_total += len(session.lines) - before
+        _prune(keep=session_id)
+    return result
+
+
+def get_session(session_id: str) -> HandlelisteSession | None:
+    """Return the session with the given id, unless it expired."""
+    session = _SESSIONS.get(session_id)
+    now = time.monotonic()
+    if session is not None and now - session.last_used > SESSION_TTL:
+        _drop(session_id)
+        session = None
+    if session is not None:
+        session.last_used = now
+        _SESSIONS.move_to_end(session_id)
+    _prune(keep=session_id if session is not None else None)
+    return session
+
+
+def delete_session(session_id: str) -> bool:
+    """Remove a session, returning whether it existed."""
+    return _drop(session_id) is not None
@@ -0,0 +1,172 @@
+"""Content-addressed cache for extracted PDF text."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+
+def bytes_key(data: bytes) -> str:
+    """Return the cache key for uploaded PDF bytes."""
+    return "sha256:" + hashlib.sha256(data).hexdigest()
+
+
+def path_key(path: str | Path) -> str:
+    """Return the cache key for a PDF file, changing whenever the file does."""
+    pdf_path = Path(path).resolve()
+    stat = pdf_path.stat()
+    return f"path:{pdf_path}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class ExtractionCache:
+    """LRU cache of extracted text bounded by total text size.
+
+    An optional SQLite database acts as a second tier that survives
+    restarts; entries found there are promoted back into memory. The
+    database is opened on first use, so processes that never touch the
+    cache (such as extraction workers) never connect. ``get_async`` and
+    ``put_async`` answer memory hits on the event loop and run the SQLite
+    reads and writes in a thread.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, db_path: str | Path | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._size = 0
+        # memory and disk have separate locks, so memory hits never wait on sqlite
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db: sqlite3.Connection | None = None
+
+    @classmethod
+    def from_env(cls) -> "ExtractionCache":
+        """Create a cache configured by ``PDF_CACHE_BYTES`` and ``PDF_CACHE_DB``."""
+        max_bytes = os.environ.get("PDF_CACHE_BYTES")
+        return cls(
+            max_bytes=int(max_bytes) if max_bytes else 64 * 1024 * 1024,
+            db_path=os.environ.get("PDF_CACHE_DB") or None,
+        )
+
+    def get(self, key: str) -> str | None:
+        """Return cached text for ``key`` or ``None``."""
+        text = self._memory_get(key)
+        if text is None:
+            text = self._disk_get(key)
+        return text
+
+    async def get_async(self, key: str) -> str | None:
+        """Like :meth:`get`, reading the disk tier in a worker thread."""
+        text = self._memory_get(key)
+        if text is None:
+            if self.db_path is None:
+                return self._disk_get(key)
+            text = await asyncio.to_thread(self._disk_get, key)
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """Store extracted text for ``key``."""
+        with self._lock:
+            self._remember(key, text)
+        self._disk_put(key, text)
+
+    async def put_async(self, key: str, text: str) -> None:
+        """Like :meth:`put`, writing the disk tier in a worker thread."""
+        with self._lock:
+            self._remember(key, text)
+        if self.db_path is not None:
+            await asyncio.to_thread(self._disk_put, key, text)
+
+    def fetch(self, key: str, extract: Callable[[], str]) -> str:
+        """Return cached text for ``key``, calling ``extract`` and storing its result on a miss."""
+        text = self.get(key)
+        if text is None:
+            text = extract()
+            self.put(key, text)
+        return text
+
+    def _memory_get(self, key: str) -> str | None:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return text
+
+    def _disk_get(self, key: str) -> str | None:
+        """Look ``key`` up on disk, promoting a hit; counts the miss otherwise."""
+        row = None
+        if self.db_path is not None:
+            with self._db_lock:
+                row = self._connection().execute("SELECT text FROM extractions WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def _disk_put(self, key: str, text: str) -> None:
+        if self.db_path is None:
+            return
+        with self._db_lock:
+            db = self._connection()
+            db.execute("INSERT OR REPLACE INTO extractions (key, text) VALUES (?, ?)", (key, text))
+            db.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # callers hold ``_db_lock``
+        if self._db is None:
+            db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS extractions (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _remember(self, key: str, text: str) -> None:
+        size = sys.getsizeof(text)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= sys.getsizeof(old)
+        self._entries[key] = text
+        self._size += size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= sys.getsizeof(evicted)
+
+    def clear(self) -> None:
+        """Drop all entries from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.db_path is not None:
+            with self._db_lock:
+                db = self._connection()
+                db.execute("DELETE FROM extractions")
+                db.commit()
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and memory usage."""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+extraction_cache = ExtractionCache.from_env()
@@ -1,37 +1,948 @@
+import mmap
 import re
 import zlib
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator, NamedTuple
 
+from app.services.pdf_cache import ExtractionCache, bytes_key, extraction_cache, path_key
 
-def _extract_text(data: bytes) -> str:
-    """Extract text from raw PDF bytes."""
-    text_parts: list[str] = []
 
-    for match in re.finditer(rb"stream\r?\n(.*?)endstream", data, re.S):
-        stream_data = match.group(1)
-        # remove possible leading newlines
-        stream_data = stream_data.strip(b"\r\n")
-        # attempt to decompress
+_STREAM_START_RE = re.compile(rb"stream\r?\n")
+_TEXT_RE = re.compile(rb"\(([^)]*)\)")
+_ENDSTREAM = b"endstream"
+
+# Unterminated ``(`` strings longer than this are treated as binary noise so
+# the streaming extractor never buffers an unbounded amount of data.
+_MAX_PENDING_TEXT = 64 * 1024
+
+# Stream dictionaries that mark data which cannot contain page text: images,
+# embedded font programs, ICC profiles and structural/metadata streams.
+_NON_TEXT_STREAM_RE = re.compile(
+    rb"/Subtype\s*/(?:Image|Type1C|CIDFontType0C|OpenType)\b"
+    rb"|/Length[123]\b"
+    rb"|/Alternate\b"
+    rb"|/Type\s*/(?:XRef|ObjStm|Metadata|EmbeddedFile)\b"
+)
+# How far back from a ``stream`` keyword to look for its dictionary.
+_DICT_LOOKBACK = 4096
+
+# Output budgets for inflating streams. A stream that inflates past
+# MAX_STREAM_OUTPUT bytes is cut off, and once a document has produced
+# MAX_DOCUMENT_OUTPUT bytes in total extraction stops. Both cases append
+# TRUNCATION_MARKER to the text.
+MAX_STREAM_OUTPUT = 64 * 1024 * 1024
+MAX_DOCUMENT_OUTPUT = 256 * 1024 * 1024
+TRUNCATION_MARKER = "[truncated]"
+_INFLATE_CHUNK = 256 * 1024
+
+# Files at least this large are scanned through a read-only memory map
+# instead of being copied into memory first.
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# Page selections may name at most this many ranges. Ranges stay
+# ``(first, last)`` pairs until the document's page count clips them.
+MAX_PAGE_RANGES = 100
+# Page trees are a few levels deep; deeper ones are cyclic or hostile.
+_MAX_PAGE_TREE_DEPTH = 64
+
+
+def _decode_section(section: bytes) -> str:
+    try:
+        return section.decode("utf-8")
+    except UnicodeDecodeError:
+        return section.decode("latin1", errors="ignore")
+
+
+class TextFragment(NamedTuple):
+    """Text found in one stream of a PDF."""
+
+    offset: int
+    """Byte offset of the stream data within the document."""
+    stream: int
+    """Index of the stream in document order."""
+    text: str
+
+
+@dataclass
+class ExtractionStats:
+    """Counters filled in while extracting text."""
+
+    streams: int = 0
+    skipped_streams: int = 0
+    skipped_bytes: int = 0
+    inflated_bytes: int = 0
+    truncated_streams: int = 0
+    truncated: bool = False
+    """``True`` once the document output budget is used up."""
+
+
+class _BoundedInflater:
+    """Incremental zlib inflater that stops at the output budgets."""
+
+    def __init__(self, stats: ExtractionStats) -> None:
+        self._inflater = zlib.decompressobj()
+        self._stats = stats
+        self._produced = 0
+        self.truncated = False
+
+    @property
+    def eof(self) -> bool:
+        return self._inflater.eof
+
+    def inflate(self, data: bytes) -> Iterator[bytes]:
+        """Yield the output for ``data`` in bounded chunks.
+
+        Raises ``zlib.error`` for data that is not a valid zlib stream.
+        """
+        while not self.truncated and not self._inflater.eof:
+            allowed = min(
+                _INFLATE_CHUNK,
+                MAX_STREAM_OUTPUT - self._produced,
+                MAX_DOCUMENT_OUTPUT - self._stats.inflated_bytes,
+            )
+            if allowed <= 0:
+                self.truncated = True
+                self._stats.truncated_streams += 1
+                self._stats.truncated = self._stats.inflated_bytes >= MAX_DOCUMENT_OUTPUT
+                return
+            chunk = self._inflater.decompress(data, allowed)
+            data = self._inflater.unconsumed_tail
+            self._produced += len(chunk)
+            self._stats.inflated_bytes += len(chunk)
+            if chunk:
+                yield chunk
+            # a full chunk may leave output buffered inside zlib
+            if not data and len(chunk) < allowed:
+                return
+
+
+def _inflate_structure(data: bytes, stats: ExtractionStats) -> bytes:
+    """Inflate an xref or object stream within the output budgets.
+
+    Unlike page text these cannot be used in part, so running out of budget
+    raises ``ValueError``; data that is not a complete zlib stream raises
+    ``zlib.error`` as ``zlib.decompress`` would.
+    """
+    inflater = _BoundedInflater(stats)
+    body = b"".join(inflater.inflate(data))
+    if inflater.truncated:
+        raise ValueError("Stream inflates past the output budget")
+    if not inflater.eof:
+        raise zlib.error("Incomplete or truncated stream")
+    return body
+
+
+def _stream_dict(data: bytes | mmap.mmap, keyword_start: int) -> bytes:
+    """Return the dictionary of the stream whose keyword starts at ``keyword_start``."""
+    window_start = max(keyword_start - _DICT_LOOKBACK, 0)
+    obj_pos = data.rfind(b"obj", window_start, keyword_start)
+    return bytes(data[obj_pos + 3 if obj_pos != -1 else window_start : keyword_start])
+
+
+def _is_text_stream(stream_dict: bytes) -> bool:
+    return _NON_TEXT_STREAM_RE.search(stream_dict) is None
+
+
+def _iter_fragments(data: bytes | mmap.mmap, stats: ExtractionStats | None = None) -> Iterator[TextFragment]:
+    """Yield the text of each stream in raw PDF bytes or a memory map."""
+    if stats is None:
+        stats = ExtractionStats()
+    pos = 0
+    index = 0
+    while not stats.truncated:
+        # ``search``/``find`` instead of ``finditer`` so no scanner keeps the
+        # buffer exported while the generator is suspended; a memory map
+        # could not be closed otherwise
+        match = _STREAM_START_RE.search(data, pos)
+        if match is None:
+            return
+        start = match.end()
+        stream_dict = _stream_dict(data, match.start())
+        if _is_text_stream(stream_dict):
+            end = data.find(_ENDSTREAM, start)
+            if end == -1:
+                return
+            text = "".join(_stream_text_parts(data[start:end], stats))
+            if text:
+                yield TextFragment(start, index, text)
+        else:
+            # jump over the data using /Length so it is never scanned or copied
+            length = _dict_int(stream_dict, b"Length")
+            if length is not None and data[start + length : start + length + 20].lstrip().startswith(_ENDSTREAM):
+                end = data.find(_ENDSTREAM, start + length)
+            else:
+                end = data.find(_ENDSTREAM, start)
+            if end == -1:
+                return
+            stats.skipped_streams += 1
+            stats.skipped_bytes += end - start
+        stats.streams += 1
+        pos = end + len(_ENDSTREAM)
+        index += 1
+
+
+def _extract_text(data: bytes | mmap.mmap) -> str:
+    """Extract text from raw PDF bytes or a memory-mapped PDF file."""
+    return "".join(fragment.text for fragment in _iter_fragments(data))
+
+
+def _stream_text_parts(stream_data: bytes, stats: ExtractionStats | None = None) -> list[str]:
+    """Return the text sections of a single raw stream.
+
+    Compressed streams are inflated chunk by chunk and scanned as they go,
+    so at most one chunk of inflated data is held at a time.
+    """
+    if stats is None:
+        stats = ExtractionStats()
+    # remove possible leading newlines; trailing bytes after the end of the
+    # zlib data are ignored by the inflater
+    stream_data = stream_data.lstrip(b"\r\n")
+    inflater = _BoundedInflater(stats)
+    scanner = _TextScanner()
+    parts: list[str] = []
+    try:
+        for chunk in inflater.inflate(stream_data):
+            parts.extend(scanner.feed(chunk))
+    except zlib.error:
+        inflater = None
+    if inflater is not None and inflater.truncated:
+        parts.append(TRUNCATION_MARKER)
+        return parts
+    if inflater is None or not inflater.eof:
+        # not (complete) zlib data; scan the raw bytes instead
+        return [_decode_section(section) for section in _TEXT_RE.findall(stream_data)]
+    return parts
+
+
+def iter_pdf_text(
+    source: str | Path | bytes,
+    use_mmap: bool | None = None,
+    stats: ExtractionStats | None = None,
+) -> Iterator[TextFragment]:
+    """Lazily yield the text of a PDF one stream at a time.
+
+    ``source`` is either a path or the raw PDF bytes. Only the stream being
+    decoded is held in memory, so callers can stop as soon as they have
+    found what they need. ``use_mmap`` behaves as in :func:`read_pdf_text`.
+    Streams that cannot hold page text (images, fonts, ICC profiles) are
+    skipped without being decompressed and counted in ``stats``.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        yield from _iter_fragments(bytes(source), stats)
+        return
+
+    pdf_path = Path(source)
+    size = pdf_path.stat().st_size
+    if use_mmap is None:
+        use_mmap = size >= MMAP_THRESHOLD
+    # empty files cannot be mapped
+    if use_mmap and size:
+        with pdf_path.open("rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield from _iter_fragments(view, stats)
+    else:
+        yield from _iter_fragments(pdf_path.read_bytes(), stats)
+
+
+def read_pdf_text(
+    path: str | Path,
+    use_mmap: bool | None = None,
+    stats: ExtractionStats | None = None,
+    cache: ExtractionCache | None = extraction_cache,
+) -> str:
+    """Extract text from a PDF file given a path.
+
+    Parameters
+    ----------
+    path:
+        Location of the PDF file.
+    use_mmap:
+        Scan the file in place through a memory map so only the stream
+        slices are copied. Defaults to ``True`` for files of at least
+        :data:`MMAP_THRESHOLD` bytes.
+    stats:
+        Optional counters for processed and skipped streams.
+    cache:
+        Extraction cache to consult and fill, keyed by path, modification
+        time and size; ``None`` always extracts. It is skipped when
+        ``stats`` is given, since a cached result fills in no counters.
+    """
+    if cache is not None and stats is None:
+        return cache.fetch(path_key(path), lambda: read_pdf_text(path, use_mmap, cache=None))
+    return "".join(fragment.text for fragment in iter_pdf_text(path, use_mmap, stats))
+
+
+def read_pdf_bytes(
+    data: bytes,
+    stats: ExtractionStats | None = None,
+    cache: ExtractionCache | None = extraction_cache,
+) -> str:
+    """Extract text from an uploaded PDF file.
+
+    ``cache`` is used as in :func:`read_pdf_text`, keyed by a hash of ``data``.
+    """
+    if cache is not None and stats is None:
+        return cache.fetch(bytes_key(data), lambda: read_pdf_bytes(data, cache=None))
+    return "".join(fragment.text for fragment in _iter_fragments(data, stats))
+
+
+class _TextScanner:
+    """Find ``(...)`` text sections in data that arrives in pieces."""
+
+    def __init__(self) -> None:
+        self._pending = b""
+
+    def feed(self, data: bytes) -> list[str]:
+        if self._pending:
+            data = self._pending + data
+        parts: list[str] = []
+        pos = 0
+        for match in _TEXT_RE.finditer(data):
+            parts.append(_decode_section(match.group(1)))
+            pos = match.end()
+        open_idx = data.find(b"(", pos)
+        if open_idx == -1 or len(data) - open_idx > _MAX_PENDING_TEXT:
+            self._pending = b""
+        else:
+            self._pending = data[open_idx:]
+        return parts
+
+    def reset(self) -> None:
+        self._pending = b""
+
+
+class StreamingTextExtractor:
+    """Extract text from PDF bytes that arrive in chunks.
+
+    Each call to :meth:`feed` returns ``(stream_index, text)`` pairs for the
+    text found so far, so the caller can forward results while the rest of
+    the document is still arriving. Only the unprocessed tail of the input
+    is buffered and streams are inflated incrementally, which keeps memory
+    use roughly constant regardless of document size. Streams that cannot
+    hold page text are dropped unread and counted in :attr:`stats`.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._in_stream = False
+        self._stream_index = -1
+        self._scanner = _TextScanner()
+        self.stats = ExtractionStats()
+        self._mode = "probe"
+        self._inflater = _BoundedInflater(self.stats)
+        self._raw_head = bytearray()
+
+    def feed(self, chunk: bytes) -> list[tuple[int, str]]:
+        """Process the next chunk of PDF bytes."""
+        self._buffer += chunk
+        results: list[tuple[int, str]] = []
+        while True:
+            if self._in_stream:
+                end = self._buffer.find(_ENDSTREAM)
+                if end == -1:
+                    # keep enough bytes to recognise a split ``endstream``
+                    keep = len(_ENDSTREAM) - 1
+                    if len(self._buffer) > keep:
+                        self._consume(bytes(self._buffer[:-keep]), results)
+                        del self._buffer[:-keep]
+                    return results
+                self._consume(bytes(self._buffer[:end]), results)
+                del self._buffer[: end + len(_ENDSTREAM)]
+                self._finish_stream(results)
+            else:
+                match = _STREAM_START_RE.search(self._buffer)
+                if match is None:
+                    # keep the tail: ``stream\r\n`` may be split across chunks
+                    # and the stream dictionary is needed once it arrives
+                    del self._buffer[: max(len(self._buffer) - _DICT_LOOKBACK, 0)]
+                    return results
+                stream_dict = _stream_dict(self._buffer, match.start())
+                del self._buffer[: match.end()]
+                self._start_stream(_is_text_stream(stream_dict))
+
+    def close(self) -> None:
+        """Discard any unterminated stream left at the end of the input."""
+        self._buffer.clear()
+        self._in_stream = False
+        self._raw_head.clear()
+        self._scanner.reset()
+
+    def _start_stream(self, has_text: bool) -> None:
+        self._in_stream = True
+        self._stream_index += 1
+        self.stats.streams += 1
+        if not has_text:
+            self.stats.skipped_streams += 1
+        if self.stats.truncated:
+            self._mode = "skip"
+        else:
+            self._mode = "probe" if has_text else "nontext"
+        self._inflater = _BoundedInflater(self.stats)
+        self._raw_head.clear()
+        self._scanner.reset()
+
+    def _consume(self, data: bytes, results: list[tuple[int, str]]) -> None:
+        if self._mode == "probe":
+            # leading newlines are not part of the stream data
+            if not self._raw_head:
+                data = data.lstrip(b"\r\n")
+                if not data:
+                    return
+            # hold on to the raw bytes until the data is known to be zlib
+            self._raw_head += data
+            self._inflate(data, results)
+        elif self._mode == "zlib":
+            self._inflate(data, results)
+        elif self._mode == "raw":
+            self._emit(data, results)
+        elif self._mode == "nontext":
+            self.stats.skipped_bytes += len(data)
+
+    def _inflate(self, data: bytes, results: list[tuple[int, str]]) -> None:
         try:
-            stream_data = zlib.decompress(stream_data)
+            for inflated in self._inflater.inflate(data):
+                if self._mode == "probe":
+                    self._mode = "zlib"
+                    self._raw_head.clear()
+                self._emit(inflated, results)
         except zlib.error:
+            if self._mode == "probe":
+                # not zlib data; scan the raw bytes like the original reader
+                self._mode = "raw"
+                raw = bytes(self._raw_head)
+                self._raw_head.clear()
+                self._emit(raw, results)
+            else:
+                # corrupt data after a valid start; drop the rest of the stream
+                self._mode = "skip"
+            return
+        if self._inflater.truncated:
+            results.append((self._stream_index, TRUNCATION_MARKER))
+            self._mode = "skip"
+
+    def _finish_stream(self, results: list[tuple[int, str]]) -> None:
+        if self._mode in ("probe", "zlib"):
+            # collect any output still buffered inside zlib
+            self._inflate(b"", results)
+        if self._mode == "probe" and self._raw_head and not self._inflater.eof:
+            # incomplete zlib data is treated as raw text, as before
+            self._emit(bytes(self._raw_head), results)
+        self._raw_head.clear()
+        self._in_stream = False
+        self._scanner.reset()
+
+    def _emit(self, data: bytes, results: list[tuple[int, str]]) -> None:
+        text = "".join(self._scanner.feed(data))
+        if text:
+            results.append((self._stream_index, text))
+
+
+_OBJ_RE = re.compile(rb"(\d+)\s+(\d+)\s+obj\b")
+_REF_RE = re.compile(rb"(\d+)\s+\d+\s+R\b")
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+_XREF_ENTRY_RE = re.compile(rb"(\d{10})\s(\d{5})\s([nf])")
+_XREF_SUBSECTION_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s*\r?\n")
+
+
+def _dict_ref(obj: bytes, key: bytes) -> int | None:
+    match = re.search(rb"/" + key + rb"\s+(\d+)\s+\d+\s+R\b", obj)
+    return int(match.group(1)) if match else None
+
+
+def _dict_int(obj: bytes, key: bytes) -> int | None:
+    match = re.search(rb"/" + key + rb"\s+(\d+)(?!\s+\d+\s+R)\b", obj)
+    return int(match.group(1)) if match else None
+
+
+def _dict_array(obj: bytes, key: bytes) -> list[int] | None:
+    match = re.search(rb"/" + key + rb"\s*\[([^\]]*)\]", obj)
+    if match is None:
+        return None
+    return [int(num) for num in re.findall(rb"-?\d+", match.group(1))]
+
+
+def _ref_array(body: bytes) -> list[int]:
+    """Return the object numbers in the body of an array of references."""
+    tokens = body.split()
+    # the usual ``N 0 R N 0 R ...`` layout splits much faster than a regex scan
+    if len(tokens) % 3 == 0 and tokens[2::3].count(b"R") == len(tokens) // 3:
+        try:
+            return list(map(int, tokens[::3]))
+        except ValueError:
             pass
-        for section in re.findall(rb"\(([^)]*)\)", stream_data):
-            try:
-                text_parts.append(section.decode("utf-8"))
-            except UnicodeDecodeError:
-                text_parts.append(section.decode("latin1", errors="ignore"))
+    return [int(num) for num in _REF_RE.findall(body)]
+
+
+class _XrefTable(NamedTuple):
+    """One ``xref`` table; rows are located by arithmetic, not parsed up front."""
+
+    # (first object number, count, offset of the first row, row size)
+    subsections: list[tuple[int, int, int, int]]
+
+    def lookup(self, data: bytes | mmap.mmap, num: int) -> int | None:
+        for first, count, pos, row_size in self.subsections:
+            if first <= num < first + count:
+                entry = _XREF_ENTRY_RE.match(data, pos + (num - first) * row_size)
+                if entry is None:
+                    raise ValueError("Malformed xref entry")
+                return int(entry.group(1)) if entry.group(3) == b"n" else None
+        return None
+
+
+class _XrefStream(NamedTuple):
+    """The decoded rows of one xref stream, decoded field by field on lookup."""
+
+    rows: bytes
+    widths: list[int]
+    # (first object number, count, index of its first row)
+    subsections: list[tuple[int, int, int]]
+
+    def lookup(self, num: int) -> int | tuple[int, int] | None:
+        row_size = sum(self.widths)
+        for first, count, row_index in self.subsections:
+            if first <= num < first + count:
+                pos = (row_index + num - first) * row_size
+                row = self.rows[pos : pos + row_size]
+                if len(row) < row_size:
+                    raise ValueError("xref stream is truncated")
+                fields = []
+                for width in self.widths:
+                    fields.append(int.from_bytes(row[:width], "big"))
+                    row = row[width:]
+                # a zero-width type field defaults to 1
+                kind = fields[0] if self.widths[0] else 1
+                if kind == 1:
+                    return fields[1]
+                if kind == 2:
+                    return (fields[1], fields[2])
+                return None
+        return None
+
+
+class PdfObjectIndex:
+    """Byte offsets of the indirect objects in a PDF and its page tree.
+
+    The index is built from the cross-reference tables or streams reached
+    through ``startxref``. Rows are only decoded when an object is looked
+    up and an offset is only checked when its object is read, so opening a
+    document costs the same whatever its size. Pages are found by walking
+    the page tree with ``/Count``, descending only into the subtrees that
+    hold the requested pages. Documents with a missing or damaged xref fall
+    back to a single scan for ``N G obj`` markers. Text for a page is
+    extracted by decoding only the content streams that the page references.
+    """
+
+    def __init__(self, data: bytes | mmap.mmap, stats: ExtractionStats | None = None) -> None:
+        self._data = data
+        # one budget for everything inflated from this document
+        self.stats = stats if stats is not None else ExtractionStats()
+        # object number -> byte offset, or (object stream number, index);
+        # filled on lookup, or all at once by the fallback scan
+        self._offsets: dict[int, int | tuple[int, int]] = {}
+        # newest revision first
+        self._xref: list[_XrefTable | _XrefStream] = []
+        self._object_streams: dict[int, dict[int, bytes]] = {}
+        # page tree node -> (kids, or None for a page; number of pages)
+        self._page_nodes: dict[int, tuple[list[int] | None, int]] = {}
+        self._trailer = b""
+        self._scanned = False
+        try:
+            self._read_xref()
+        except (ValueError, zlib.error):
+            self._scan_objects()
+        try:
+            self._pages_root = self._find_pages_root()
+            self.page_count
+        except (ValueError, zlib.error):
+            if self._scanned:
+                raise
+            # the xref looked valid but led nowhere useful
+            self._scan_objects()
+            self._pages_root = self._find_pages_root()
+
+    @property
+    def page_count(self) -> int:
+        return self._page_node(self._pages_root)[1]
+
+    def page_objects(self, first: int, last: int) -> Iterator[int]:
+        """Yield the object numbers of pages ``first`` to ``last`` (1-based, inclusive)."""
+        if first <= last:
+            yield from self._walk_pages(self._pages_root, first, last, 0)
+
+    def page_text(self, page: int) -> str:
+        """Return the text of ``page`` (1-based)."""
+        count = self.page_count
+        if not 1 <= page <= count:
+            raise ValueError(f"Page {page} out of range (1-{count})")
+        return "".join(self.page_object_text(num) for num in self.page_objects(page, page))
+
+    def page_object_text(self, num: int) -> str:
+        """Return the text of the page dictionary stored as object ``num``."""
+        page_obj = self.object(num)
+        contents = re.search(rb"/Contents\s*(\[[^\]]*\]|\d+\s+\d+\s+R)", page_obj)
+        if contents is None:
+            return ""
+        refs = [int(num) for num in _REF_RE.findall(contents.group(1))]
+        if not contents.group(1).startswith(b"[") and refs:
+            # the content array itself may be an indirect object
+            target = self.object(refs[0])
+            if target.lstrip().startswith(b"["):
+                refs = [int(num) for num in _REF_RE.findall(target)]
+        text_parts: list[str] = []
+        for ref in refs:
+            if self.stats.truncated:
+                break
+            stream_data = self.stream_data(ref)
+            if stream_data is not None:
+                text_parts.extend(_stream_text_parts(stream_data, self.stats))
+                self.stats.streams += 1
+        return "".join(text_parts)
+
+    def object(self, num: int) -> bytes:
+        """Return the body of object ``num`` up to its stream or ``endobj``."""
+        location = self._location(num)
+        if isinstance(location, tuple):
+            return self._object_stream_member(*location, num)
+        data = self._data
+        match = _OBJ_RE.match(data, location) if location is not None else None
+        if match is None or int(match.group(1)) != num:
+            if self._xref and not self._scanned:
+                # a wrong xref offset: trust the object markers instead
+                self._scan_objects()
+                return self.object(num)
+            if location is None:
+                raise ValueError(f"Object {num} not found")
+            raise ValueError(f"Object {num} not found at offset {location}")
+        start = match.end()
+        end = data.find(b"endobj", start)
+        if end == -1:
+            end = len(data)
+        stream_pos = data.find(b"stream", start, end)
+        if stream_pos != -1:
+            end = stream_pos
+        return bytes(data[start:end])
+
+    def stream_data(self, num: int) -> bytes | None:
+        """Return the raw (still encoded) data of stream object ``num``."""
+        header = self.object(num)
+        location = self._location(num)
+        if not isinstance(location, int):
+            return None
+        data = self._data
+        match = _OBJ_RE.match(data, location)
+        assert match is not None  # validated by object()
+        keyword = _STREAM_START_RE.match(data, match.end() + len(header))
+        if keyword is None:
+            return None
+        start = keyword.end()
+        length = _dict_int(header, b"Length")
+        if length is None:
+            length_ref = _dict_ref(header, b"Length")
+            if length_ref is not None:
+                value = self.object(length_ref).split()
+                length = int(value[0]) if value and value[0].isdigit() else None
+        if length is not None and data[start + length : start + length + 20].lstrip().startswith(b"endstream"):
+            return bytes(data[start : start + length])
+        end = data.find(b"endstream", start)
+        if end == -1:
+            return None
+        return bytes(data[start:end])
+
+    def _location(self, num: int) -> int | tuple[int, int] | None:
+        location = self._offsets.get(num)
+        if location is None and not self._scanned:
+            for section in self._xref:
+                if isinstance(section, _XrefTable):
+                    location = section.lookup(self._data, num)
+                else:
+                    location = section.lookup(num)
+                # free or missing entries fall through to older revisions
+                if location is not None:
+                    self._offsets[num] = location
+                    break
+        return location
+
+    def _read_xref(self) -> None:
+        data = self._data
+        tail_start = max(len(data) - 2048, 0)
+        matches = list(_STARTXREF_RE.finditer(data, tail_start))
+        if not matches:
+            raise ValueError("startxref not found")
+        offset: int | None = int(matches[-1].group(1))
+        visited: set[int] = set()
+        sections: list[_XrefTable | _XrefStream] = []
+        trailers: list[bytes] = []
+        while offset is not None and offset not in visited:
+            visited.add(offset)
+            if data[offset : offset + 4] == b"xref":
+                section, trailer = self._read_xref_table(offset)
+            else:
+                section, trailer = self._read_xref_stream(offset)
+            sections.append(section)
+            trailers.append(trailer)
+            offset = _dict_int(trailer, b"Prev")
+        self._trailer = trailers[0]
+        self._xref = sections
+
+    def _read_xref_table(self, offset: int) -> tuple[_XrefTable, bytes]:
+        data = self._data
+        pos = offset + 4
+        subsections = []
+        while True:
+            header = _XREF_SUBSECTION_RE.match(data, pos)
+            if header is None:
+                break
+            first, count = int(header.group(1)), int(header.group(2))
+            pos = header.end()
+            if not count:
+                continue
+            # rows have a fixed width (20 bytes in conforming files); take
+            # it from the first row and check the last one lines up
+            entry = _XREF_ENTRY_RE.match(data, pos)
+            if entry is None:
+                raise ValueError("Malformed xref entry")
+            row_end = entry.end()
+            while data[row_end : row_end + 1] in (b" ", b"\r", b"\n"):
+                row_end += 1
+            row_size = row_end - pos
+            if _XREF_ENTRY_RE.match(data, pos + (count - 1) * row_size) is None:
+                raise ValueError("Malformed xref entry")
+            subsections.append((first, count, pos, row_size))
+            pos += count * row_size
+        trailer_pos = data.find(b"trailer", pos)
+        if trailer_pos == -1:
+            raise ValueError("trailer not found")
+        end = data.find(b"startxref", trailer_pos)
+        return _XrefTable(subsections), bytes(data[trailer_pos : end if end != -1 else len(data)])
+
+    def _read_xref_stream(self, offset: int) -> tuple[_XrefStream, bytes]:
+        match = _OBJ_RE.match(self._data, offset)
+        if match is None:
+            raise ValueError("xref stream not found")
+        num = int(match.group(1))
+        self._offsets.setdefault(num, offset)
+        header = self.object(num)
+        if not re.search(rb"/Type\s*/XRef\b", header):
+            raise ValueError("Object at startxref is not an xref stream")
+        raw = self.stream_data(num)
+        if raw is None:
+            raise ValueError("xref stream has no data")
+        widths = _dict_array(header, b"W")
+        if not widths or len(widths) != 3:
+            raise ValueError("xref stream has no /W")
+        row_size = sum(widths)
+        rows = _inflate_structure(raw.strip(b"\r\n"), self.stats)
+        predictor = _dict_int(header, b"Predictor")
+        if predictor is not None and predictor >= 10:
+            rows = _undo_png_predictor(rows, row_size)
+        index = _dict_array(header, b"Index") or [0, _dict_int(header, b"Size") or 0]
+        subsections = []
+        row_index = 0
+        for first, count in zip(index[::2], index[1::2]):
+            subsections.append((first, count, row_index))
+            row_index += count
+        return _XrefStream(rows, widths, subsections), header
+
+    def _object_stream_member(self, stream_num: int, index: int, num: int) -> bytes:
+        members = self._object_streams.get(stream_num)
+        if members is None:
+            header = self.object(stream_num)
+            raw = self.stream_data(stream_num)
+            first = _dict_int(header, b"First")
+            count = _dict_int(header, b"N")
+            if raw is None or first is None or count is None:
+                raise ValueError(f"Object stream {stream_num} is malformed")
+            body = _inflate_structure(raw.strip(b"\r\n"), self.stats)
+            pairs = [int(value) for value in body[:first].split()][: count * 2]
+            members = {}
+            for pos, (member, member_offset) in enumerate(zip(pairs[::2], pairs[1::2])):
+                next_offset = pairs[pos * 2 + 3] if pos * 2 + 3 < len(pairs) else len(body) - first
+                members[member] = body[first + member_offset : first + next_offset]
+            self._object_streams[stream_num] = members
+        if num not in members:
+            raise ValueError(f"Object {num} not found in object stream {stream_num}")
+        return members[num]
+
+    def _scan_objects(self) -> None:
+        self._offsets = {}
+        self._object_streams = {}
+        self._page_nodes = {}
+        self._scanned = True
+        for match in _OBJ_RE.finditer(self._data):
+            # later definitions are incremental updates and win
+            self._offsets[int(match.group(1))] = match.start()
+        trailer_pos = self._data.rfind(b"trailer")
+        if trailer_pos != -1:
+            self._trailer = bytes(self._data[trailer_pos:])
+
+    def _find_pages_root(self) -> int:
+        root = _dict_ref(self._trailer, b"Root")
+        if root is None:
+            root = self._find_catalog()
+        pages_root = _dict_ref(self.object(root), b"Pages")
+        if pages_root is None:
+            raise ValueError("Catalog has no page tree")
+        return pages_root
+
+    def _page_node(self, num: int, depth: int = 0) -> tuple[list[int] | None, int]:
+        node = self._page_nodes.get(num)
+        if node is None:
+            if depth > _MAX_PAGE_TREE_DEPTH:
+                raise ValueError("Page tree is too deep")
+            obj = self.object(num)
+            kids_match = re.search(rb"/Kids\s*\[([^\]]*)\]", obj)
+            if kids_match is None:
+                node = (None, 1)
+            else:
+                kids = _ref_array(kids_match.group(1))
+                count = _dict_int(obj, b"Count")
+                if count is None:
+                    count = sum(self._page_node(kid, depth + 1)[1] for kid in kids)
+                node = (kids, max(count, 0))
+            self._page_nodes[num] = node
+        return node
+
+    def _walk_pages(self, num: int, first: int, last: int, depth: int) -> Iterator[int]:
+        # ``first`` and ``last`` count from the start of this subtree
+        if depth > _MAX_PAGE_TREE_DEPTH:
+            raise ValueError("Page tree is too deep")
+        kids, count = self._page_node(num, depth)
+        if kids is None:
+            yield num
+            return
+        skip = 0
+        if count == len(kids) and 1 < first <= count:
+            # every kid is a single page, unless /Count is inconsistent;
+            # checking the first wanted kid catches that
+            if self._page_node(kids[first - 1], depth + 1)[0] is None:
+                skip = first - 1
+        before = skip
+        for kid in kids[skip:]:
+            if before >= last:
+                return
+            kid_count = self._page_node(kid, depth + 1)[1]
+            if before + kid_count >= first:
+                yield from self._walk_pages(kid, max(first - before, 1), last - before, depth + 1)
+            before += kid_count
+
+    def _find_catalog(self) -> int:
+        if not self._scanned:
+            self._scan_objects()
+        for num, location in self._offsets.items():
+            if isinstance(location, int) and re.search(rb"/Type\s*/Catalog\b", self.object(num)):
+                return num
+        raise ValueError("Document catalog not found")
+
+
+def _undo_png_predictor(data: bytes, columns: int) -> bytes:
+    """Reverse the PNG row predictors used by xref streams."""
+    out = bytearray()
+    previous = bytearray(columns)
+    stride = columns + 1
+    for pos in range(0, len(data) - columns, stride):
+        kind = data[pos]
+        row = bytearray(data[pos + 1 : pos + stride])
+        if kind == 1:
+            for i in range(1, columns):
+                row[i] = (row[i] + row[i - 1]) & 0xFF
+        elif kind == 2:
+            for i in range(columns):
+                row[i] = (row[i] + previous[i]) & 0xFF
+        elif kind != 0:
+            raise ValueError(f"Unsupported PNG predictor {kind}")
+        out += row
+        previous = row
+    return bytes(out)
+
+
+def parse_page_ranges(spec: str) -> list[tuple[int, int]]:
+    """Parse a page selection such as ``"3-5,8"`` into 1-based ``(first, last)`` ranges.
+
+    Ranges are not expanded, so ``"1-20000000"`` costs no more than ``"1"``;
+    :func:`read_pdf_pages` clips them to the document.
+    """
+    ranges: list[tuple[int, int]] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        try:
+            start = int(first)
+            end = int(last) if sep else start
+        except ValueError as exc:
+            raise ValueError(f"Invalid page range: {part}") from exc
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range: {part}")
+        ranges.append((start, end))
+        if len(ranges) > MAX_PAGE_RANGES:
+            raise ValueError(f"At most {MAX_PAGE_RANGES} page ranges are allowed")
+    if not ranges:
+        raise ValueError("No pages selected")
+    return ranges
+
+
+def format_page_ranges(ranges: list[tuple[int, int]]) -> str:
+    """Return the canonical spelling of parsed ranges, e.g. for cache keys."""
+    return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+def extraction_key(source: str | Path | bytes, pages: list[int] | list[tuple[int, int]] | None = None) -> str:
+    """Return the extraction cache key for a whole document or a page selection."""
+    key = bytes_key(bytes(source)) if isinstance(source, (bytes, bytearray)) else path_key(source)
+    if pages is None:
+        return key
+    ranges = [page if isinstance(page, tuple) else (page, page) for page in pages]
+    return f"{key}:pages={format_page_ranges(ranges)}"
+
+
+def _selected_ranges(pages: list[int] | list[tuple[int, int]], count: int) -> Iterator[tuple[int, int]]:
+    for page in pages:
+        if isinstance(page, tuple):
+            start, end = page
+            if start > count:
+                raise ValueError(f"Page {start} out of range (1-{count})")
+            yield start, min(end, count)
+        else:
+            if not 1 <= page <= count:
+                raise ValueError(f"Page {page} out of range (1-{count})")
+            yield page, page
+
 
-    return "".join(text_parts)
+def _pages_text(index: PdfObjectIndex, pages: list[int] | list[tuple[int, int]]) -> str:
+    parts: list[str] = []
+    for first, last in _selected_ranges(pages, index.page_count):
+        for num in index.page_objects(first, last):
+            # the stream that used up the budget already added the marker
+            if index.stats.truncated:
+                return "".join(parts)
+            parts.append(index.page_object_text(num))
+    return "".join(parts)
 
 
-def read_pdf_text(path: str | Path) -> str:
-    """Extract text from a PDF file given a path."""
-    pdf_path = Path(path)
-    data = pdf_path.read_bytes()
-    return _extract_text(data)
+def read_pdf_pages(
+    source: str | Path | bytes,
+    pages: list[int] | list[tuple[int, int]],
+    stats: ExtractionStats | None = None,
+    cache: ExtractionCache | None = extraction_cache,
+) -> str:
+    """Extract text from selected pages (1-based) of a PDF.
 
+    ``pages`` holds page numbers or ``(first, last)`` ranges from
+    :func:`parse_page_ranges`; ranges running past the last page are cut
+    there. Only the xref rows, page tree nodes and content streams of the
+    requested pages are read. Paths are opened through a memory map so
+    untouched parts of the file are not read. Everything inflated for the
+    document shares one set of budgets, counted in ``stats``. ``cache`` is
+    used as in :func:`read_pdf_text`.
+    """
+    if cache is not None and stats is None:
+        return cache.fetch(extraction_key(source, pages), lambda: read_pdf_pages(source, pages, cache=None))
+    if isinstance(source, (bytes, bytearray)):
+        return _pages_text(PdfObjectIndex(bytes(source), stats), pages)
 
-def read_pdf_bytes(data: bytes) -> str:
-    """Extract text from an uploaded PDF file."""
-    return _extract_text(data)
+    pdf_path = Path(source)
+    if not pdf_path.stat().st_size:
+        raise ValueError("Empty PDF file")
+    with pdf_path.open("rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        return _pages_text(PdfObjectIndex(view, stats), pages)
@@ -0,0 +1,93 @@
+"""Tube size parsing and interning.
+
+Sizes arrive as free-form strings such as ``1"``, ``1 in``, ``1-1/2"`` or
+``25.4mm``. :func:`size_key` reduces them to a canonical key (the outside
+diameter in millimetres when the size can be parsed), so equivalent
+spellings compare equal, and :class:`SizeRegistry` interns those keys as
+small integer codes for the generator's hot loop.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+MM_PER_UNIT = {'"': 25.4, "''": 25.4, "in": 25.4, "inch": 25.4, "inches": 25.4, "mm": 1.0}
+
+_SIZE_RE = re.compile(
+    r"""^(?:
+        (?P<whole>\d+(?:\.\d+)?)(?:[\s-]+(?P<num>\d+)/(?P<den>\d+))?
+        | (?P<fnum>\d+)/(?P<fden>\d+)
+    )\s*(?P<unit>"|''|inches|inch|in|mm)$""",
+    re.VERBOSE,
+)
+_PAIR_RE = re.compile(r"\s*[x×]\s*")
+
+
+def parse_size(label: str) -> float | None:
+    """Return the size in millimetres, or ``None`` when it cannot be parsed."""
+    match = _SIZE_RE.match(label.strip().lower())
+    if match is None:
+        return None
+    if match["fnum"] is not None:
+        if int(match["fden"]) == 0:
+            return None
+        value = int(match["fnum"]) / int(match["fden"])
+    else:
+        value = float(match["whole"])
+        if match["num"] is not None:
+            if int(match["den"]) == 0:
+                return None
+            value += int(match["num"]) / int(match["den"])
+    return value * MM_PER_UNIT[match["unit"]]
+
+
+@lru_cache(maxsize=4096)
+def size_key(label: str) -> str:
+    """Return the canonical key of a size or a reducing size pair.
+
+    Parsed sizes become ``"<mm>mm"`` with three decimals; a pair such as
+    ``1" x 1/2"`` becomes both keys joined by ``x``, larger first, so the
+    direction does not matter. Anything else is compared by its
+    whitespace-normalised, lower-case text.
+    """
+    mm = parse_size(label)
+    if mm is not None:
+        return f"{mm:.3f}mm"
+    parts = _PAIR_RE.split(label.strip().lower())
+    if len(parts) == 2:
+        sizes = [parse_size(part) for part in parts]
+        if None not in sizes:
+            return "x".join(f"{mm:.3f}mm" for mm in sorted(sizes, reverse=True))
+    return " ".join(label.split()).lower()
+
+
+class SizeRegistry:
+    """Interns size labels as small integer codes.
+
+    Equivalent spellings share a code. Each code remembers the first
+    label seen for it.
+    """
+
+    def __init__(self) -> None:
+        self._by_label: dict[str, int] = {}
+        self._by_key: dict[str, int] = {}
+        self.labels: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def code(self, label: str) -> int:
+        """Return the code of ``label``, interning it if new."""
+        code = self._by_label.get(label)
+        if code is None:
+            key = size_key(label)
+            code = self._by_key.get(key)
+            if code is None:
+                code = self._by_key[key] = len(self.labels)
+                self.labels.append(label)
+            self._by_label[label] = code
+        return code
+
+    def label(self, code: int) -> str:
+        """Return the first label interned under ``code``."""
+        return self.labels[code]
@@ -0,0 +1 @@
+"""Benchmark suites and synthetic data generators for the Jobb services."""
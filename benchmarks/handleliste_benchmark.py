@@ -0,0 +1,214 @@
+"""Benchmark handleliste generation and the fittings store at scale.
+
+Run with::
+
+    python -m benchmarks.handleliste_benchmark --output bench_handleliste.json
+
+Each system shape is generated at every requested line count and measured
+through the service functions and the ``/pid`` HTTP routes in-process.
+The fittings store is measured separately by loading a synthetic catalog
+into a scratch database and timing cached and uncached code lookups, part
+lookups and prefix and fuzzy searches. The report is JSON so runs can be
+compared across commits.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+from typing import Any, Callable
+
+from app.schemas.pid import PipingSystem
+from app.services.columnar import columns_from_system, encode_binary
+from app.services.fittings_search import search_fittings
+from app.services.fittings_store import FittingsStore
+from app.services.generator import (
+    BRANDS,
+    FITTING_TYPES,
+    generate_bom,
+    generate_handleliste,
+    generate_parts,
+    iter_handleliste,
+)
+from app.services.piping_graph import PipingGraph
+
+from .runner import build_report, measure, write_report
+from .synthetic_piping import MATERIALS, SHAPES, SIZES, CatalogSpec, PipingSpec, make_catalog, make_system_payload
+
+DEFAULT_LINES = (10_000, 100_000, 1_000_000)
+DEFAULT_CATALOG_ROWS = 1_000_000
+LOOKUPS = 10_000
+LOAD_BATCH = 10_000
+# enough rows for every brand, fitting type, size and material once
+PARTS_CATALOG_ROWS = len(BRANDS) * len(FITTING_TYPES) * len(SIZES) * len(MATERIALS)
+SEARCHES = 1_000
+
+
+def bench_generator(spec: PipingSpec, iterations: int) -> list[dict[str, Any]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        # parts mode resolves against a scratch catalog, never the real one
+        store = FittingsStore(Path(tmp) / "fittings.sqlite")
+        store.add_many(list(make_catalog(CatalogSpec(rows=PARTS_CATALOG_ROWS))))
+        try:
+            return _bench_generator(spec, iterations, store)
+        finally:
+            store.close()
+
+
+def _bench_generator(spec: PipingSpec, iterations: int, store: FittingsStore) -> list[dict[str, Any]]:
+    payload = make_system_payload(spec)
+    system = PipingSystem.model_validate(payload)
+    columns = columns_from_system(system)
+    info = {"shape": spec.shape, "lines": spec.lines, "sizes": spec.sizes}
+
+    def consume() -> None:
+        for _ in iter_handleliste(system):
+            pass
+
+    def analyze() -> None:
+        graph = PipingGraph.from_system(system)
+        graph.size_change_lines()
+        graph.connectivity()
+
+    cases = {
+        "validate_system": lambda: PipingSystem.model_validate(payload),
+        "generate_handleliste": lambda: generate_handleliste(system),
+        "generate_bom": lambda: generate_bom(system),
+        "generate_parts": lambda: generate_parts(system, store=store),
+        "iter_handleliste": consume,
+        "generate_handleliste_columnar": lambda: generate_handleliste(columns),
+        "piping_graph": analyze,
+    }
+    return [measure(case, fn, iterations, ops=spec.lines, **info) for case, fn in cases.items()]
+
+
+def bench_http(spec: PipingSpec, iterations: int) -> list[dict[str, Any]]:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services.handleliste_cache import handleliste_cache
+
+    payload = make_system_payload(spec)
+    body = json.dumps(payload).encode()
+    binary = encode_binary(columns_from_system(PipingSystem.model_validate(payload)))
+    info = {"shape": spec.shape, "lines": spec.lines, "sizes": spec.sizes}
+    json_headers = {"Content-Type": "application/json"}
+    binary_headers = {"Content-Type": "application/octet-stream"}
+
+    with TestClient(app) as client:
+
+        def post(path: str, content: bytes, headers: dict[str, str], cached: bool = False):
+            def run() -> None:
+                if not cached:
+                    handleliste_cache.clear()
+                response = client.post(path, content=content, headers=headers)
+                # raise_for_status() would also reject the 304 case
+                if response.status_code >= 400:
+                    response.raise_for_status()
+
+            return run
+
+        etag = client.post("/pid/handleliste", content=body, headers=json_headers).headers["etag"]
+        cases = {
+            "http_handleliste": post("/pid/handleliste", body, json_headers),
+            "http_handleliste_bom": post("/pid/handleliste?mode=bom", body, json_headers),
+            "http_handleliste_cached": post("/pid/handleliste", body, json_headers, cached=True),
+            "http_handleliste_not_modified": post(
+                "/pid/handleliste", body, {**json_headers, "If-None-Match": etag}, cached=True
+            ),
+            "http_handleliste_columnar_binary": post("/pid/handleliste/columnar", binary, binary_headers),
+            "http_handleliste_stream": post("/pid/handleliste/stream", body, json_headers),
+        }
+        return [
+            measure(case, fn, iterations, size_bytes=len(body), ops=spec.lines, **info)
+            for case, fn in cases.items()
+        ]
+
+
+def bench_fittings(spec: CatalogSpec, iterations: int) -> list[dict[str, Any]]:
+    rng = random.Random(spec.seed)
+    fittings = list(make_catalog(spec))
+    info = {"catalog_rows": spec.rows}
+    codes = [rng.choice(fittings).code for _ in range(LOOKUPS)]
+    sampled = [rng.choice(fittings) for _ in range(LOOKUPS)]
+    parts = [(fit.brand, fit.fitting_type, fit.size, fit.material) for fit in sampled]
+    prefixes = [code[:8] for code in codes[:SEARCHES]]
+    # one substituted character per query, so only the fuzzy tier finds them
+    typos = [code[:5] + "#" + code[6:] for code in codes[:SEARCHES]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # a scratch database, so the benchmark never touches the real catalog
+        store = FittingsStore(Path(tmp) / "fittings.sqlite", cache_size=LOOKUPS)
+        uncached = FittingsStore(store.db_path, cache_size=0)
+
+        def load() -> None:
+            for start in range(0, len(fittings), LOAD_BATCH):
+                store.add_many(fittings[start : start + LOAD_BATCH])
+
+        def lookup_codes(target: FittingsStore) -> Callable[[], None]:
+            def run() -> None:
+                for code in codes:
+                    target.get(code)
+
+            return run
+
+        def lookup_parts() -> None:
+            for brand, ftype, size, material in parts:
+                store.find_part(brand, ftype, size, material)
+
+        def searches(queries: list[str]) -> Callable[[], None]:
+            def run() -> None:
+                for query in queries:
+                    search_fittings(store, query)
+
+            return run
+
+        results = [measure("fittings_load", load, max(1, iterations // 5), ops=spec.rows, **info)]
+        results.append(measure("get_fitting", lookup_codes(store), iterations, ops=LOOKUPS, **info))
+        results.append(measure("get_fitting_uncached", lookup_codes(uncached), iterations, ops=LOOKUPS, **info))
+        results.append(measure("find_part", lookup_parts, iterations, ops=LOOKUPS, **info))
+        results.append(measure("search_prefix", searches(prefixes), iterations, ops=SEARCHES, **info))
+        results.append(measure("search_fuzzy", searches(typos), iterations, ops=SEARCHES, **info))
+        store.close()
+        uncached.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark handleliste generation and the fittings store.")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed runs per case.")
+    parser.add_argument("--shapes", nargs="*", choices=SHAPES, help="System shapes to run.")
+    parser.add_argument("--lines", nargs="*", type=int, help="Line counts to run (default 10k, 100k, 1M).")
+    parser.add_argument("--sizes", type=int, default=3, help=f"Distinct line sizes (1-{len(SIZES)}).")
+    parser.add_argument("--catalog-rows", type=int, default=DEFAULT_CATALOG_ROWS, help="Fitting catalog size.")
+    parser.add_argument("--no-http", action="store_true", help="Skip the in-process HTTP benchmarks.")
+    parser.add_argument("--no-fittings", action="store_true", help="Skip the fittings store benchmarks.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    shapes = args.shapes or list(SHAPES)
+    line_counts = args.lines or list(DEFAULT_LINES)
+    results: list[dict[str, Any]] = []
+    for lines in line_counts:
+        for shape in shapes:
+            spec = PipingSpec(shape=shape, lines=lines, sizes=args.sizes)
+            results.extend(bench_generator(spec, args.iterations))
+            if not args.no_http:
+                results.extend(bench_http(spec, args.iterations))
+    if not args.no_fittings:
+        results.extend(bench_fittings(CatalogSpec(rows=args.catalog_rows), args.iterations))
+
+    config = {
+        "iterations": args.iterations,
+        "shapes": shapes,
+        "lines": line_counts,
+        "sizes": args.sizes,
+        "catalog_rows": None if args.no_fittings else args.catalog_rows,
+    }
+    write_report(build_report("handleliste", config, results), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark PDF text extraction on synthetic documents.
+
+Run with::
+
+    python -m benchmarks.pdf_benchmark --output bench_pdf.json
+
+Each document shape is measured through the service functions (buffered,
+memory-mapped, lazy, streaming, cached and single-page modes) and through
+the HTTP routes in-process. The report is JSON so runs can be compared
+across commits.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from app.services.pdf_cache import ExtractionCache
+from app.services.pdf_reader import (
+    StreamingTextExtractor,
+    iter_pdf_text,
+    read_pdf_bytes,
+    read_pdf_pages,
+    read_pdf_text,
+)
+
+from .runner import build_report, measure, write_report
+from .synthetic_pdf import PdfSpec, make_pdf
+
+DEFAULT_SPECS = {
+    "small": PdfSpec(pages=5),
+    "many-pages": PdfSpec(pages=500, lines_per_stream=20),
+    "many-streams": PdfSpec(pages=50, streams_per_page=20, lines_per_stream=5),
+    "uncompressed": PdfSpec(pages=200, compress=False),
+    "scanned": PdfSpec(pages=50, lines_per_stream=2, image_bytes=256 * 1024),
+}
+
+STREAM_CHUNK = 64 * 1024
+
+
+def _streaming(data: bytes) -> str:
+    extractor = StreamingTextExtractor()
+    parts: list[str] = []
+    view = memoryview(data)
+    for pos in range(0, len(data), STREAM_CHUNK):
+        parts.extend(text for _, text in extractor.feed(bytes(view[pos : pos + STREAM_CHUNK])))
+    extractor.close()
+    return "".join(parts)
+
+
+def bench_services(name: str, data: bytes, path: Path, iterations: int) -> list[dict[str, Any]]:
+    info = {"document": name, "size_bytes": len(data)}
+    cache = ExtractionCache()
+
+    cases = {
+        "read_pdf_bytes": lambda: read_pdf_bytes(data, cache=None),
+        "read_pdf_text": lambda: read_pdf_text(path, use_mmap=False, cache=None),
+        "read_pdf_text_mmap": lambda: read_pdf_text(path, use_mmap=True, cache=None),
+        "iter_pdf_text_first": lambda: next(iter_pdf_text(path), None),
+        "streaming": lambda: _streaming(data),
+        "cached": lambda: read_pdf_bytes(data, cache=cache),
+        "read_pdf_pages_one": lambda: read_pdf_pages(path, [1], cache=None),
+    }
+    return [measure(case, fn, iterations, **info) for case, fn in cases.items()]
+
+
+def bench_http(name: str, data: bytes, path: Path, iterations: int) -> list[dict[str, Any]]:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services.pdf_cache import extraction_cache
+
+    info = {"document": name, "size_bytes": len(data)}
+    with TestClient(app) as client:
+
+        def uncached(call):
+            def run():
+                extraction_cache.clear()
+                response = call()
+                response.raise_for_status()
+
+            return run
+
+        cases = {
+            "http_extract": uncached(lambda: client.post("/pdf/extract", content=data)),
+            "http_extract_stream": uncached(lambda: client.post("/pdf/extract/stream", content=data)),
+            "http_read": uncached(lambda: client.get("/pdf/read", params={"path": str(path)})),
+            "http_read_cached": lambda: client.get("/pdf/read", params={"path": str(path)}).raise_for_status(),
+        }
+        return [measure(case, fn, iterations, **info) for case, fn in cases.items()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction.")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed runs per case.")
+    parser.add_argument("--documents", nargs="*", choices=sorted(DEFAULT_SPECS), help="Document shapes to run.")
+    parser.add_argument("--no-http", action="store_true", help="Skip the in-process HTTP benchmarks.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    names = args.documents or list(DEFAULT_SPECS)
+    results: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            data = make_pdf(DEFAULT_SPECS[name])
+            path = Path(tmp) / f"{name}.pdf"
+            path.write_bytes(data)
+            results.extend(bench_services(name, data, path, args.iterations))
+            if not args.no_http:
+                results.extend(bench_http(name, data, path, args.iterations))
+
+    config = {
+        "iterations": args.iterations,
+        "documents": {name: vars(DEFAULT_SPECS[name]) for name in names},
+    }
+    write_report(build_report("pdf", config, results), args.output)
+
+
+if __name__ == "__main__":
+    main()
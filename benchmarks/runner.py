@@ -0,0 +1,91 @@
+"""Shared timing and reporting helpers for the benchmark suites."""
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(
+    name: str,
+    fn: Callable[[], Any],
+    iterations: int = 5,
+    size_bytes: int | None = None,
+    ops: int | None = None,
+    **info: Any,
+) -> dict[str, Any]:
+    """Time ``fn`` and return a result record.
+
+    ``size_bytes`` adds throughput in MB/s and ``ops`` adds operations per
+    second (for example lines processed per call). Peak Python allocations
+    are measured in a separate traced run so tracing does not distort the
+    timings; they cover this process only, not pool worker processes.
+    """
+    fn()  # warm up caches and imports
+    timings: list[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    ordered = sorted(timings)
+    mean = statistics.fmean(timings)
+    record: dict[str, Any] = {
+        "name": name,
+        **info,
+        "iterations": iterations,
+        "latency_ms": {
+            "mean": mean * 1000,
+            "p50": _percentile(ordered, 0.50) * 1000,
+            "p90": _percentile(ordered, 0.90) * 1000,
+            "p99": _percentile(ordered, 0.99) * 1000,
+            "max": ordered[-1] * 1000,
+        },
+        "peak_alloc_bytes": peak,
+    }
+    if size_bytes is not None:
+        record["size_bytes"] = size_bytes
+        record["throughput_mb_s"] = size_bytes / mean / 1e6 if mean else None
+    if ops is not None:
+        record["ops"] = ops
+        record["ops_per_s"] = ops / mean if mean else None
+    return record
+
+
+def build_report(suite: str, config: dict[str, Any], results: list[dict[str, Any]]) -> dict[str, Any]:
+    """Wrap results with enough metadata to compare runs across commits."""
+    return {
+        "suite": suite,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+
+
+def write_report(report: dict[str, Any], output: str | None) -> None:
+    """Write ``report`` as JSON to ``output`` or stdout."""
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
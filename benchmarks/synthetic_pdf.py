@@ -0,0 +1,81 @@
+"""Generate synthetic PDF documents for benchmarking ``pdf_reader``."""
+from __future__ import annotations
+
+import random
+import zlib
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class PdfSpec:
+    """Shape of a synthetic PDF document."""
+
+    pages: int = 10
+    streams_per_page: int = 1
+    lines_per_stream: int = 40
+    compress: bool = True
+    image_bytes: int = 0
+    """Size of an incompressible image XObject placed on every page."""
+    seed: int = 0
+
+
+def make_pdf(spec: PdfSpec) -> bytes:
+    """Build a PDF with a valid xref table according to ``spec``."""
+    rng = random.Random(spec.seed)
+    objects: dict[int, bytes] = {1: b"<< /Type /Catalog /Pages 2 0 R >>"}
+    kids: list[int] = []
+    num = 3
+
+    for page in range(spec.pages):
+        page_num = num
+        num += 1
+        content_refs = []
+        for stream in range(spec.streams_per_page):
+            lines = [
+                b"BT /F1 10 Tf 72 %d Td (Page %d stream %d line %d %s) Tj ET"
+                % (700 - line * 12, page + 1, stream, line, rng.randbytes(6).hex().encode())
+                for line in range(spec.lines_per_stream)
+            ]
+            objects[num] = _stream(b"\n".join(lines), spec.compress)
+            content_refs.append(num)
+            num += 1
+        resources = b"<< >>"
+        if spec.image_bytes:
+            objects[num] = _stream(
+                rng.randbytes(spec.image_bytes),
+                False,
+                b"/Type /XObject /Subtype /Image /Width 1 /Height 1 /BitsPerComponent 8",
+            )
+            resources = b"<< /XObject << /Im1 %d 0 R >> >>" % num
+            num += 1
+        contents = b"[%s]" % b" ".join(b"%d 0 R" % ref for ref in content_refs)
+        objects[page_num] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources %s /Contents %s >>"
+            % (resources, contents)
+        )
+        kids.append(page_num)
+
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids),
+        len(kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets: dict[int, int] = {}
+    for obj_num in sorted(objects):
+        offsets[obj_num] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (obj_num, objects[obj_num])
+    xref = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for obj_num in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[obj_num]
+    out += b"trailer\n<< /Root 1 0 R /Size %d >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    return bytes(out)
+
+
+def _stream(data: bytes, compress: bool, extra: bytes = b"") -> bytes:
+    if compress:
+        data = zlib.compress(data)
+        extra += b" /Filter /FlateDecode"
+    return b"<< %s /Length %d >>\nstream\n%s\nendstream" % (extra.strip(), len(data), data)
@@ -0,0 +1,116 @@
+"""Generate synthetic piping systems and fitting catalogs for benchmarking."""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from app.schemas.fittings import Fitting
+from app.schemas.pid import Component, PipingSystem
+from app.services.generator import BRANDS, FITTING_TYPES
+
+SHAPES = ("chain", "tree", "dense", "mixed")
+SIZES = ('1/4"', '3/8"', '1/2"', '3/4"', '1"', "6mm", "12mm", "25mm")
+MATERIALS = ("stainless steel", "carbon steel", "brass", "monel")
+
+
+@dataclass(frozen=True)
+class PipingSpec:
+    """Shape of a synthetic piping system.
+
+    ``chain`` links every component to the next, ``tree`` attaches each new
+    component to a random earlier one (``branching`` children on average),
+    ``dense`` draws lines between random pairs of a small component set and
+    ``mixed`` combines a chain backbone with dense branches.
+    """
+
+    shape: str = "chain"
+    lines: int = 10_000
+    sizes: int = 1
+    """Number of distinct line sizes; more sizes mean more adapters."""
+    branching: int = 3
+    tee_rate: float = 0.1
+    bulkhead_rate: float = 0.05
+    seed: int = 0
+
+
+def _edges(spec: PipingSpec, rng: random.Random) -> tuple[int, list[tuple[int, int]]]:
+    count = spec.lines
+    if spec.shape == "chain":
+        return count + 1, [(idx, idx + 1) for idx in range(count)]
+    if spec.shape == "tree":
+        return count + 1, [(rng.randrange(max(1, (idx + 1) // spec.branching)), idx + 1) for idx in range(count)]
+    if spec.shape == "dense":
+        components = max(2, count // 10)
+        return components, [(rng.randrange(components), rng.randrange(components)) for _ in range(count)]
+    if spec.shape == "mixed":
+        backbone = count // 2
+        components = backbone + 1
+        edges = [(idx, idx + 1) for idx in range(backbone)]
+        edges += [(rng.randrange(components), rng.randrange(components)) for _ in range(count - backbone)]
+        return components, edges
+    raise ValueError(f"Unknown shape: {spec.shape}")
+
+
+def make_system_payload(spec: PipingSpec) -> dict[str, Any]:
+    """Return the JSON body of a ``PipingSystem`` matching ``spec``."""
+    rng = random.Random(spec.seed)
+    components, edges = _edges(spec, rng)
+    kinds = [comp.value for comp in Component]
+    sizes = SIZES[: max(1, min(spec.sizes, len(SIZES)))]
+    return {
+        "components": [rng.choice(kinds) for _ in range(components)],
+        "lines": [
+            {
+                "start": start,
+                "end": end,
+                "size": rng.choice(sizes),
+                "tee": rng.random() < spec.tee_rate,
+                "bulkhead": rng.random() < spec.bulkhead_rate,
+            }
+            for start, end in edges
+        ],
+    }
+
+
+def make_system(spec: PipingSpec) -> PipingSystem:
+    """Build a validated ``PipingSystem`` matching ``spec``."""
+    return PipingSystem.model_validate(make_system_payload(spec))
+
+
+@dataclass(frozen=True)
+class CatalogSpec:
+    """Size of a synthetic fitting catalog."""
+
+    rows: int = 100_000
+    seed: int = 0
+
+
+def make_catalog(spec: CatalogSpec) -> Iterator[Fitting]:
+    """Yield ``spec.rows`` fittings with unique codes.
+
+    Every brand, fitting type, size and material combination is covered
+    before any repeats, so part lookups for generated systems resolve.
+    """
+    rng = random.Random(spec.seed)
+    brands = sorted(BRANDS)
+    types = sorted(FITTING_TYPES)
+    for idx in range(spec.rows):
+        brand = brands[idx % len(brands)]
+        ftype = types[(idx // len(brands)) % len(types)]
+        size = SIZES[(idx // (len(brands) * len(types))) % len(SIZES)]
+        material = MATERIALS[(idx // (len(brands) * len(types) * len(SIZES))) % len(MATERIALS)]
+        series = f"{brand[:2].upper()}{rng.randrange(100):02d}"
+        configuration = ftype[:3].upper()
+        yield Fitting(
+            code=f"{series}-{configuration}-{idx:07d}",
+            description=f"{brand.capitalize()} {ftype} {size}",
+            series=series,
+            configuration=configuration,
+            # a quarter of the rows carry a cracking pressure, like check valves
+            cracking_pressure=f"{rng.choice((1, 5, 10, 25, 50))} psi" if idx % 4 == 0 else None,
+            material=material,
+            brand=brand,
+            fitting_type=ftype,
+            size=size,
+        )
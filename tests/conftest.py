@@ -0,0 +1,6 @@
+import os
+import tempfile
+from pathlib import Path
+
+# keep the fittings catalog written by the tests out of the working tree
+os.environ.setdefault("FITTINGS_DB", str(Path(tempfile.mkdtemp()) / "fittings.sqlite"))
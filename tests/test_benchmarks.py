@@ -0,0 +1,43 @@
+from app.services.pdf_reader import read_pdf_bytes, read_pdf_pages
+from benchmarks.pdf_benchmark import bench_services
+from benchmarks.synthetic_pdf import PdfSpec, make_pdf
+
+
+def test_synthetic_pdf_is_readable():
+    data = make_pdf(PdfSpec(pages=3, streams_per_page=2, lines_per_stream=2, image_bytes=1024))
+    assert "Page 3 stream 1 line 1" in read_pdf_bytes(data)
+    assert read_pdf_pages(data, [2]).startswith("Page 2 stream 0 line 0")
+
+
+def test_pdf_benchmark_reports_metrics(tmp_path):
+    data = make_pdf(PdfSpec(pages=2))
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(data)
+    results = bench_services("tiny", data, path, iterations=1)
+    assert {"read_pdf_bytes", "streaming", "read_pdf_text_mmap"} <= {result["name"] for result in results}
+    for result in results:
+        assert result["latency_ms"]["p50"] >= 0
+        assert result["throughput_mb_s"] > 0
+
+
+def test_synthetic_piping_shapes_are_valid():
+    from app.services.generator import iter_handleliste
+    from benchmarks.synthetic_piping import SHAPES, PipingSpec, make_system
+
+    for shape in SHAPES:
+        system = make_system(PipingSpec(shape=shape, lines=200, sizes=3))
+        assert len(system.lines) == 200
+        assert sum(1 for _ in iter_handleliste(system)) > 200
+
+
+def test_handleliste_benchmark_reports_metrics():
+    from benchmarks.handleliste_benchmark import bench_fittings, bench_generator
+    from benchmarks.synthetic_piping import CatalogSpec, PipingSpec
+
+    results = bench_generator(PipingSpec(shape="tree", lines=100), iterations=1)
+    results += bench_fittings(CatalogSpec(rows=200), iterations=1)
+    names = {result["name"] for result in results}
+    assert {"generate_handleliste", "generate_parts", "piping_graph", "find_part", "search_fuzzy"} <= names
+    for result in results:
+        assert result["ops_per_s"] > 0
+        assert result["peak_alloc_bytes"] >= 0
@@ -0,0 +1,93 @@
+import os, sys; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import base64
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.pid import Line, PipingSystem
+from app.services.columnar import columns_from_system, decode_binary, encode_binary, pack_bits, unpack_bits
+from app.services.generator import generate_bom, generate_handleliste, iter_handleliste
+
+
+def _random_system(seed: int) -> PipingSystem:
+    rng = random.Random(seed)
+    kinds = ["pipe", "valve", "pump", "flange", "filter", "analyzer"]
+    count = rng.randint(1, 10)
+    return PipingSystem(
+        components=[rng.choice(kinds) for _ in range(count)],
+        lines=[
+            Line(
+                start=rng.randrange(count),
+                end=rng.randrange(count),
+                size=rng.choice(['1"', '2"', "12mm"]),
+                tee=rng.random() < 0.3,
+                bulkhead=rng.random() < 0.2,
+            )
+            for _ in range(rng.randint(0, 25))
+        ],
+    )
+
+
+def test_bitset_round_trip():
+    flags = [True, False, False, True, False, False, False, False, True]
+    assert pack_bits(flags) == bytes([0b00001001, 0b00000001])
+    assert unpack_bits(pack_bits(flags), len(flags)) == flags
+    assert unpack_bits(b"", 3) == [False, False, False]
+    with pytest.raises(ValueError):
+        unpack_bits(b"\x00\x00", 3)
+
+
+def test_columns_generate_same_items():
+    for seed in range(20):
+        system = _random_system(seed)
+        columns = decode_binary(encode_binary(columns_from_system(system)))
+        assert generate_handleliste(columns).items == generate_handleliste(system).items
+        assert generate_bom(columns, brand="butech") == generate_bom(system, brand="butech")
+        assert columns.to_system() == system
+
+
+def test_decode_binary_rejects_bad_payloads():
+    data = encode_binary(columns_from_system(_random_system(3)))
+    for bad in (b"", b"XXXX" + data[4:], data[:-1], data + b"\0"):
+        with pytest.raises(ValueError):
+            decode_binary(bad)
+    columns = decode_binary(data)
+    columns.start[0] = 99
+    with pytest.raises(ValueError):
+        iter_handleliste(columns)
+
+
+def test_columnar_endpoint_json_and_binary():
+    client = TestClient(app)
+    system = PipingSystem(
+        components=["pipe", "valve", "pump"],
+        lines=[
+            {"start": 0, "end": 1, "size": "1\"", "tee": True},
+            {"start": 1, "end": 2, "size": "3/8\"", "bulkhead": True},
+        ],
+    )
+    expected = client.post("/pid/handleliste?mode=bom", json=system.model_dump(mode="json")).json()
+
+    payload = {
+        "components": ["pipe", "valve", "pump"],
+        "start": [0, 1],
+        "end": [1, 2],
+        "size": ["1\"", "3/8\""],
+        "tee": base64.b64encode(pack_bits([True, False])).decode(),
+        "bulkhead": base64.b64encode(pack_bits([False, True])).decode(),
+    }
+    response = client.post("/pid/handleliste/columnar?mode=bom", json=payload)
+    assert response.json() == expected
+    assert response.headers["etag"]
+
+    binary = client.post(
+        "/pid/handleliste/columnar?mode=bom",
+        content=encode_binary(columns_from_system(system)),
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert binary.json() == expected
+
+    assert client.post("/pid/handleliste/columnar", json={"components": ["pipe"], "start": [0]}).status_code == 400
+    assert client.post("/pid/handleliste/columnar", json={"components": ["nope"]}).status_code == 422
@@ -1,5 +1,6 @@
 import os, sys; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import asyncio
+import json
 import pytest
 from pydantic import ValidationError
 
@@ -9,6 +10,10 @@ from app.schemas.pid import PipingSystem
 from fastapi import HTTPException
 
 
+def _body(response):
+    return json.loads(response.body)
+
+
 def test_frontend_returns_message():
     response = asyncio.run(frontend())
     assert response == {"message": "Welcome to the Jobb API"}
@@ -28,8 +33,8 @@ def test_handleliste_endpoint_valid():
             {"start": 2, "end": 3, "size": "1\""},
         ],
     )
-    response = asyncio.run(handleliste(system))
-    assert response.items == [
+    response = _body(asyncio.run(handleliste(system)))
+    assert response["items"] == [
         "Pipe Item",
         "Parker Coupling",
         "Valve Item",
@@ -45,9 +50,9 @@ def test_handleliste_endpoint_allows_any_transition():
         components=["pump", "filter"],
         lines=[{"start": 0, "end": 1, "size": "1\""}],
     )
-    response = asyncio.run(handleliste(system))
-    assert response.items[0] == "Pump Item"
-    assert response.items[-1] == "Filter Item"
+    response = _body(asyncio.run(handleliste(system)))
+    assert response["items"][0] == "Pump Item"
+    assert response["items"][-1] == "Filter Item"
 
 
 def test_handleliste_endpoint_brand_param():
@@ -55,8 +60,8 @@ def test_handleliste_endpoint_brand_param():
         components=["pipe", "valve"],
         lines=[{"start": 0, "end": 1, "size": "1\""}],
     )
-    response = asyncio.run(handleliste(system, brand="swagelok"))
-    assert response.items[1] == "Swagelok Coupling"
+    response = _body(asyncio.run(handleliste(system, brand="swagelok")))
+    assert response["items"][1] == "Swagelok Coupling"
 
 
 def test_handleliste_endpoint_invalid_transition():
@@ -64,8 +69,38 @@ def test_handleliste_endpoint_invalid_transition():
         components=["pump", "pipe"],
         lines=[{"start": 0, "end": 1, "size": "1\""}],
     )
-    response = asyncio.run(handleliste(system))
-    assert response.items[0] == "Pump Item"
+    response = _body(asyncio.run(handleliste(system)))
+    assert response["items"][0] == "Pump Item"
+
+
+def test_handleliste_endpoint_reports_every_bad_line():
+    system = PipingSystem(
+        components=["pipe", "valve"],
+        lines=[
+            {"start": 0, "end": 2, "size": "1\""},
+            {"start": 0, "end": 1, "size": "1\""},
+            {"start": -3, "end": 1, "size": "1\""},
+        ],
+    )
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(handleliste(system))
+    assert exc.value.status_code == 400
+    assert "0, 2" in exc.value.detail
+
+
+def test_handleliste_endpoint_builds_the_graph_only_for_errors(monkeypatch):
+    from app.routers import pid as pid_router
+
+    built = []
+    original = pid_router.PipingGraph.from_system
+    monkeypatch.setattr(pid_router.PipingGraph, "from_system", lambda system: built.append(1) or original(system))
+    system = PipingSystem(components=["pipe", "valve"], lines=[{"start": 0, "end": 1, "size": "3\""}])
+    asyncio.run(handleliste(system))
+    assert built == []
+    system.lines[0].end = 4
+    with pytest.raises(HTTPException):
+        asyncio.run(handleliste(system))
+    assert built == [1]
 
 
 def test_handleliste_endpoint_with_line_features():
@@ -76,6 +111,129 @@ def test_handleliste_endpoint_with_line_features():
             {"start": 1, "end": 2, "size": "3/8\""},
         ],
     )
-    response = asyncio.run(handleliste(system))
-    assert "Parker Tee" in response.items
-    assert "Parker Adapter" in response.items
+    response = _body(asyncio.run(handleliste(system)))
+    assert "Parker Tee" in response["items"]
+    assert "Parker Adapter" in response["items"]
+
+
+def test_handleliste_endpoint_bom_mode():
+    system = PipingSystem(
+        components=["pipe", "valve"],
+        lines=[{"start": 0, "end": 1, "size": "1\"", "tee": True}],
+    )
+    response = _body(asyncio.run(handleliste(system, mode="bom")))
+    assert {row["item"]: row["qty"] for row in response["rows"]}["Parker Tee"] == 1
+    with pytest.raises(HTTPException):
+        asyncio.run(handleliste(system, mode="unknown"))
+
+
+def test_handleliste_batch_endpoint():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    jobs = [
+        {"system": {"components": ["pipe", "valve"], "lines": [{"start": 0, "end": 1, "size": "1\""}]}},
+        {"system": {"components": ["pipe"], "lines": [{"start": 0, "end": 5, "size": "1\""}]}},
+        {"system": {"components": ["pipe", "valve"], "lines": [{"start": 0, "end": 1, "size": "1\""}]}, "brand": "butech"},
+    ]
+    response = client.post("/pid/handleliste/batch", json={"jobs": jobs})
+    records = {record["index"]: record for record in map(json.loads, response.text.splitlines())}
+    assert records[0]["items"][1] == "Parker Coupling"
+    assert "error" in records[1]
+    assert records[2]["items"][1] == "Butech Coupling"
+
+    merged = client.post("/pid/handleliste/batch", params={"merge": True}, json={"jobs": jobs}).json()
+    totals = {row["item"]: row["qty"] for row in merged["rows"]}
+    assert totals["Pipe Item"] == 2
+    assert [error["index"] for error in merged["errors"]] == [1]
+
+
+def test_handleliste_stream_endpoint():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    body = {"components": ["pipe", "valve"], "lines": [{"start": 0, "end": 1, "size": "1\""}]}
+    response = client.post("/pid/handleliste/stream", json=body)
+    assert [json.loads(line)["item"] for line in response.text.splitlines()] == [
+        "Pipe Item",
+        "Parker Coupling",
+        "Valve Item",
+    ]
+    response = client.post("/pid/handleliste/stream", params={"format": "csv"}, json=body)
+    assert response.text.splitlines() == ["item", "Pipe Item", "Parker Coupling", "Valve Item"]
+
+
+def test_handleliste_cache_and_etag():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.handleliste_cache import handleliste_cache
+
+    handleliste_cache.clear()
+    client = TestClient(app)
+    system = {"components": ["pipe", "valve"], "lines": [{"start": 0, "end": 1, "size": "1\""}]}
+
+    first = client.post("/pid/handleliste", json=system)
+    etag = first.headers["etag"]
+    hits = handleliste_cache.hits
+    second = client.post("/pid/handleliste?brand=PARKER", json=system)
+    assert second.content == first.content
+    assert second.headers["etag"] == etag
+    assert handleliste_cache.hits == hits + 1
+
+    assert client.post("/pid/handleliste?mode=bom", json=system).headers["etag"] != etag
+    not_modified = client.post("/pid/handleliste", json=system, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    cache = client.get("/pid/metrics").json()["cache"]
+    assert cache["not_modified"] >= 1 and 0 < cache["hit_rate"] <= 1
+
+
+def test_handleliste_parts_mode_follows_catalog():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.schemas.fittings import Fitting
+    from app.services.fittings_store import add_fitting
+
+    client = TestClient(app)
+    system = {"components": ["pipe", "valve"], "lines": [{"start": 0, "end": 1, "size": "3/4\""}]}
+    first = client.post("/pid/handleliste?mode=parts&brand=butech", json=system)
+    assert first.json()["unresolved"] == 1
+
+    add_fitting(
+        Fitting(
+            code="BT-CPL-075",
+            description="Coupling",
+            series="BT",
+            configuration="CPL",
+            brand="butech",
+            fitting_type="Coupling",
+            size="3/4\"",
+        )
+    )
+    second = client.post("/pid/handleliste?mode=parts&brand=butech", json=system)
+    assert second.headers["etag"] != first.headers["etag"]
+    assert second.json()["unresolved"] == 0
+    assert {"item": "Butech Coupling", "size": "3/4\"", "part_number": "BT-CPL-075", "qty": 1} in second.json()["rows"]
+
+
+def test_handleliste_batch_does_not_overflow_its_pool(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.routers import pid
+    from app.services.extraction_pool import ExtractionPool
+
+    pool = ExtractionPool(max_workers=2, max_queue=0, name="Handleliste batch")
+    monkeypatch.setattr(pid, "batch_pool", pool)
+    job = {"system": {"components": ["pipe", "valve"], "lines": [{"start": 0, "end": 1, "size": "1\""}]}}
+    try:
+        # 40 jobs become 8 chunks, four times what the pool accepts at once
+        response = TestClient(app).post("/pid/handleliste/batch", json={"jobs": [job] * 40})
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert len(records) == 40
+        assert not [record for record in records if "error" in record]
+        assert pool.metrics()["rejected"] == 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.extraction_pool import ExtractionPool, PoolBusyError
+
+
+def test_pool_runs_job_and_records_metrics():
+    pool = ExtractionPool(max_workers=1, max_queue=1)
+    try:
+        assert asyncio.run(pool.run(pow, 2, 10)) == 1024
+        metrics = pool.metrics()
+        assert metrics["completed"] == 1
+        assert metrics["in_flight"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_pool_rejects_when_queue_is_full():
+    pool = ExtractionPool(max_workers=1, max_queue=0)
+
+    async def submit_two() -> None:
+        slow = asyncio.ensure_future(pool.run(time.sleep, 0.3))
+        await asyncio.sleep(0)
+        with pytest.raises(PoolBusyError):
+            await pool.run(time.sleep, 0)
+        await slow
+
+    try:
+        asyncio.run(submit_two())
+        assert pool.metrics()["rejected"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_pool_recovers_after_worker_crash():
+    import os
+
+    from app.services.extraction_pool import WorkerCrashedError
+
+    pool = ExtractionPool(max_workers=1, max_queue=1)
+    try:
+        with pytest.raises(WorkerCrashedError):
+            asyncio.run(pool.run(os._exit, 1))
+        assert asyncio.run(pool.run(pow, 2, 3)) == 8
+        assert pool.metrics()["crashed"] == 1
+    finally:
+        pool.shutdown()
@@ -38,3 +38,420 @@ def test_fitting_endpoints():
     assert created.code == new_fit.code
     fetched = asyncio.run(read_fitting("1A-TEST-5-SS"))
     assert fetched.configuration == "TEST"
+
+
+def test_fitting_endpoints_keep_sqlite_off_the_event_loop(monkeypatch):
+    import threading
+    from app.routers import fittings as fittings_router
+
+    threads = []
+
+    def record(*args):
+        threads.append(threading.current_thread())
+        return Fitting(code="T-1", description="x", series="T", configuration="x")
+
+    monkeypatch.setattr(fittings_router, "get_fitting", record)
+    monkeypatch.setattr(fittings_router, "add_fitting", record)
+    fit = record()
+    threads.clear()
+    asyncio.run(create_fitting(fit))
+    asyncio.run(read_fitting("T-1"))
+    assert threading.main_thread() not in threads and len(threads) == 2
+
+
+def test_find_part_by_brand_type_size_and_material():
+    from app.services.fittings_store import find_part
+
+    for code, material in (("PK-CPL-1-SS", "stainless steel"), ("PK-CPL-1-BR", "brass")):
+        add_fitting(
+            Fitting(
+                code=code,
+                description="Coupling",
+                series="PK",
+                configuration="CPL",
+                material=material,
+                brand="Parker",
+                fitting_type="Coupling",
+                size="1 in",
+            )
+        )
+    assert find_part("parker", "coupling", "1in").code == "PK-CPL-1-SS"
+    assert find_part("parker", "Coupling", "1 in", "Brass").code == "PK-CPL-1-BR"
+    assert find_part("swagelok", "Coupling", "1 in") is None
+
+    add_fitting(get_fitting("PK-CPL-1-SS").model_copy(update={"size": "2 in"}))
+    assert find_part("parker", "coupling", "1 in").code == "PK-CPL-1-BR"
+    assert find_part("parker", "coupling", "2 in", "stainless steel").code == "PK-CPL-1-SS"
+
+
+def _fit(code, **extra):
+    return Fitting(code=code, description="Test", series=code[:2], configuration="X", **extra)
+
+
+def test_store_persists_and_uses_wal(tmp_path):
+    from app.services.fittings_store import FittingsStore
+
+    path = tmp_path / "fittings.sqlite"
+    store = FittingsStore(path)
+    store.add(_fit("P1-X", material="brass"))
+    store.close()
+
+    reopened = FittingsStore(path)
+    assert reopened.get("P1-X").material == "brass"
+    assert reopened.get("4A-C4L-25-SS").description == "Check valve"
+    with reopened.connection() as db:
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_store_read_through_cache_and_invalidation(tmp_path):
+    from app.services.fittings_store import FittingsStore
+
+    path = tmp_path / "fittings.sqlite"
+    reader = FittingsStore(path, check_interval=0.0)
+    writer = FittingsStore(path)
+    writer.add(_fit("P2-X", material="brass"))
+
+    assert reader.get("P2-X").material == "brass"
+    assert reader.get("P2-X").material == "brass"
+    assert reader.stats()["hits"] == 1
+    assert reader.get("P3-X") is None
+
+    version = reader.version()
+    writer.add_many([_fit("P2-X", material="monel"), _fit("P3-X")])
+    # the reader notices the other store's write through the version counter
+    assert reader.version() == version + 1
+    assert reader.get("P2-X").material == "monel"
+    assert reader.get("P3-X") is not None
+
+
+def test_store_does_not_cache_a_row_read_before_a_write(tmp_path, monkeypatch):
+    from app.services import fittings_store
+    from app.services.fittings_store import FittingsStore
+
+    store = FittingsStore(tmp_path / "fittings.sqlite")
+    store.add(_fit("R-1", material="brass"))
+    newer = _fit("R-1", material="monel")
+    real = fittings_store.Fitting
+
+    def build(**fields):
+        # another thread commits between the read and the cache update
+        monkeypatch.setattr(fittings_store, "Fitting", real)
+        store.add(newer)
+        return real(**fields)
+
+    monkeypatch.setattr(fittings_store, "Fitting", build)
+    assert store.get("R-1").material == "brass"
+    assert store.get("R-1").material == "monel"
+
+
+def test_store_cache_is_bounded(tmp_path):
+    from app.services.fittings_store import FittingsStore
+
+    store = FittingsStore(tmp_path / "fittings.sqlite", cache_size=2)
+    store.add_many([_fit(f"P{idx}-X") for idx in range(5)])
+    for idx in range(5):
+        assert store.get(f"P{idx}-X").code == f"P{idx}-X"
+    assert store.stats()["entries"] == 2
+
+
+def test_bulk_import_csv():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    body = (
+        "code,description,series,configuration,cracking_pressure,material,brand,fitting_type,size\r\n"
+        'CSV-1,"Union, 1/4""",CS,UN,,stainless steel,parker,Coupling,1/4"\r\n'
+        'CSV-2,"Two line\ndescription",CS,UN,10 psi,,parker,Tee,1/4"\r\n'
+        "CSV-3,missing columns\r\n"
+    )
+    client = TestClient(app)
+    summary = client.post("/fittings/bulk", content=body.encode(), headers={"Content-Type": "text/csv"}).json()
+    assert summary["received"] == 3
+    assert summary["created"] + summary["updated"] == 2
+    assert summary["rejected"] == 1
+    # the quoted newline makes CSV-2 span lines 3-4
+    assert summary["errors"] == [{"line": 5, "error": "Expected 9 columns, got 2"}]
+    assert get_fitting("CSV-1").description == 'Union, 1/4"'
+    assert get_fitting("CSV-1").cracking_pressure is None
+    assert get_fitting("CSV-2").description == "Two line\ndescription"
+
+
+def test_bulk_import_ndjson_reports_bad_rows():
+    import json
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    rows = [
+        json.dumps({"code": "ND-1", "description": "A", "series": "ND", "configuration": "A"}),
+        "{not json",
+        json.dumps({"code": "ND-2", "description": "B", "series": "ND"}),
+        "",
+        json.dumps({"code": "ND-1", "description": "A2", "series": "ND", "configuration": "A"}),
+    ]
+    client = TestClient(app)
+    summary = client.post("/fittings/bulk", content="\n".join(rows).encode()).json()
+    assert summary["received"] == 4
+    assert summary["rejected"] == 2
+    assert [error["line"] for error in summary["errors"]] == [2, 3]
+    assert "configuration" in summary["errors"][1]["error"]
+    assert get_fitting("ND-1").description == "A2"
+
+
+def test_bulk_import_rejects_lines_that_are_not_utf8():
+    import json
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    body = (
+        b"code,description,series,configuration\n"
+        b"L1-1,Caf\xe9 union,L1,UN\n"
+        + "L1-2,Café union,L1,UN\n".encode()
+    )
+    response = client.post("/fittings/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    summary = response.json()
+    assert (summary["received"], summary["rejected"]) == (2, 1)
+    assert summary["errors"][0]["line"] == 2 and "UTF-8" in summary["errors"][0]["error"]
+    assert get_fitting("L1-2").description == "Café union"
+
+    rows = [json.dumps({"code": "U8-1", "description": "A", "series": "U8", "configuration": "A"}).encode(), b"\xff"]
+    summary = client.post("/fittings/bulk", content=b"\n".join(rows)).json()
+    assert (summary["received"], summary["rejected"]) == (2, 1)
+    assert summary["errors"][0]["line"] == 2
+    assert get_fitting("U8-1") is not None
+
+
+def test_catalog_import_batches_and_counts(tmp_path):
+    from app.services.fittings_import import CatalogImport
+    from app.services.fittings_store import FittingsStore
+
+    store = FittingsStore(tmp_path / "fittings.sqlite")
+    catalog = CatalogImport(store, batch_size=2)
+    for idx in range(5):
+        catalog.add(idx + 1, {"code": f"B-{idx % 4}", "description": "x", "series": "B", "configuration": "x"})
+        if catalog.ready:
+            catalog.flush()
+    catalog.flush()
+    assert catalog.summary() == {"received": 5, "created": 4, "updated": 1, "rejected": 0, "errors": []}
+    assert store.version() == 3  # one bump per batch
+
+
+def test_search_prefix_substring_and_fuzzy(tmp_path):
+    from app.services.fittings_search import search_fittings
+    from app.services.fittings_store import FittingsStore
+
+    store = FittingsStore(tmp_path / "fittings.sqlite")
+    store.add_many(
+        [
+            _fit("4A-C4L-10-SS"),
+            _fit("4A-C4L-50-BR"),
+            Fitting(code="6M-TEE-SS", description="Union tee 4A-C4L style", series="6M", configuration="TEE"),
+        ]
+    )
+
+    hits, more = search_fittings(store, "4a-c4l")
+    assert [(hit.fitting.code, hit.match) for hit in hits] == [
+        ("4A-C4L-10-SS", "prefix"),
+        ("4A-C4L-25-SS", "prefix"),
+        ("4A-C4L-50-BR", "prefix"),
+        ("6M-TEE-SS", "substring"),
+    ]
+    assert not more
+
+    page, more = search_fittings(store, "4A-C4L", offset=1, limit=2)
+    assert [hit.fitting.code for hit in page] == ["4A-C4L-25-SS", "4A-C4L-50-BR"]
+    assert more
+
+    hits, _ = search_fittings(store, "4A-C4K-25-SS")
+    assert hits[0].fitting.code == "4A-C4L-25-SS" and hits[0].match == "fuzzy"
+    assert search_fittings(store, "4A-C4K-25-SS", fuzzy=False) == ([], False)
+
+    # updated descriptions leave the trigram index through the triggers
+    store.add(Fitting(code="6M-TEE-SS", description="Plain tee", series="6M", configuration="TEE"))
+    assert search_fittings(store, "c4l style") == ([], False)
+
+
+def test_search_endpoint_pages():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    add_fitting(_fit("SRCH-0001"))
+    add_fitting(_fit("SRCH-0002"))
+    client = TestClient(app)
+    first = client.get("/fittings/search", params={"q": "srch-", "limit": 1}).json()
+    assert [item["fitting"]["code"] for item in first["items"]] == ["SRCH-0001"]
+    assert first["next_offset"] == 1
+    second = client.get("/fittings/search", params={"q": "srch-", "offset": 1, "limit": 1}).json()
+    assert [item["fitting"]["code"] for item in second["items"]] == ["SRCH-0002"]
+    assert second["next_offset"] is None
+    assert client.get("/fittings/search").status_code == 422
+
+
+def test_store_filter_intersects_attributes(tmp_path):
+    from app.services.fittings_store import FittingsStore
+
+    store = FittingsStore(tmp_path / "fittings.sqlite")
+    store.add_many(
+        [
+            Fitting(code=f"F-{idx:02d}", description="x", series=series, configuration=config, material=material)
+            for idx, (series, config, material) in enumerate(
+                [(s, c, m) for s in ("4A", "6A") for c in ("C4L", "TEE") for m in ("Brass", "316 SS", None)]
+            )
+        ]
+    )
+
+    items, total = store.filter(series="4a", configuration="c4l", material="brass")
+    assert [item.code for item in items] == ["F-00"] and total == 1
+
+    first, total = store.filter(limit=2, series="4A")
+    assert [item.code for item in first] == ["4A-C4L-25-SS", "F-00"]
+    assert total == 7  # the seeded check valve is in series 4A too
+    rest, _ = store.filter(after=first[-1].code, limit=10, series="4A")
+    assert [item.code for item in rest] == ["F-01", "F-02", "F-03", "F-04", "F-05"]
+
+    assert store.filter(material="316 ss", configuration="TEE")[1] == 2
+    assert store.filter()[1] == 13
+
+
+def test_list_fittings_endpoint_pages_with_cursor():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    for idx in range(3):
+        add_fitting(Fitting(code=f"LST-{idx}", description="x", series="LST", configuration="Q", material="monel"))
+    client = TestClient(app)
+    params = {"series": "lst", "material": "Monel", "limit": 2}
+    first = client.get("/fittings/", params=params).json()
+    assert first["total"] == 3
+    assert [item["code"] for item in first["items"]] == ["LST-0", "LST-1"]
+    second = client.get("/fittings/", params={**params, "cursor": first["next_cursor"]}).json()
+    assert [item["code"] for item in second["items"]] == ["LST-2"]
+    assert second["next_cursor"] is None
+
+
+def test_numeric_attributes_from_fields_and_code():
+    from app.services.fitting_codes import numeric_attributes, parse_code, parse_pressure
+
+    assert parse_pressure("25 psi") == 25
+    assert round(parse_pressure("1 bar"), 2) == 14.5
+    assert parse_pressure("1/3") == 1 / 3
+    assert parse_pressure("about 25 psi") is None
+    assert parse_code("4A-C4L-25-SS").size_mm == 6.35
+    assert parse_code("PA42-TEE-0001234") is None
+    # only check valve codes carry a cracking pressure
+    union = parse_code("4A-UN-10-SS")
+    assert union.size_mm == 6.35 and union.pressure_psi is None
+    assert numeric_attributes(_fit("8A-UN-10-BR")) == (None, 12.7)
+
+    assert numeric_attributes(_fit("8A-C8L-10-BR")) == (10, 12.7)
+    # the fields win over the code
+    assert numeric_attributes(_fit("8A-C8L-10-BR", cracking_pressure="0.5 bar", size="12mm")) == (
+        parse_pressure("0.5 bar"),
+        12.0,
+    )
+    assert numeric_attributes(_fit("X-1", cracking_pressure="n/a")) == (None, None)
+
+
+def test_store_filters_pressure_range_and_size(tmp_path):
+    from app.services.fittings_store import FittingsStore
+
+    store = FittingsStore(tmp_path / "fittings.sqlite")
+    store.add_many(
+        [
+            _fit("4A-C4L-1-SS"),
+            _fit("4A-C4L-10-SS"),
+            _fit("8A-C8L-50-SS"),
+            _fit("CV-BAR", cracking_pressure="2 bar", size="1/4 in"),
+            _fit("CV-NONE", size="6.35mm"),
+        ]
+    )
+    items, total = store.filter(min_pressure=10, max_pressure=50)
+    assert [item.code for item in items] == ["4A-C4L-10-SS", "4A-C4L-25-SS", "8A-C8L-50-SS", "CV-BAR"]
+    assert total == 4
+    assert [item.code for item in store.filter(max_pressure=5)[0]] == ["4A-C4L-1-SS"]
+
+    items, total = store.filter(size='1/4"', min_pressure=20)
+    assert [item.code for item in items] == ["4A-C4L-25-SS", "CV-BAR"] and total == 2
+    assert store.filter(size="6.35 mm")[1] == 5
+
+
+def test_store_adds_numeric_columns_to_old_catalogs(tmp_path):
+    import sqlite3
+
+    from app.services.fittings_store import FittingsStore
+
+    path = tmp_path / "fittings.sqlite"
+    store = FittingsStore(path)
+    store.add(_fit("8A-C8L-10-BR"))
+    store.close()
+    with sqlite3.connect(path) as db:
+        db.execute("DROP INDEX fittings_pressure")
+        db.execute("DROP INDEX fittings_size")
+        db.execute("ALTER TABLE fittings DROP COLUMN pressure_psi")
+        db.execute("ALTER TABLE fittings DROP COLUMN size_mm")
+
+    reopened = FittingsStore(path)
+    assert [item.code for item in reopened.filter(size='1/2"', max_pressure=10)[0]] == ["8A-C8L-10-BR"]
+
+
+def test_store_recomputes_numbers_from_an_older_parser(tmp_path):
+    import sqlite3
+
+    from app.services.fittings_store import FittingsStore
+
+    path = tmp_path / "fittings.sqlite"
+    store = FittingsStore(path)
+    store.add_many([_fit("4A-UN-10-SS"), _fit("4A-C4L-10-SS")])
+    store.close()
+    # what the first parser stored: a pressure read from a union's code
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE fittings SET pressure_psi = 10 WHERE code = '4A-UN-10-SS'")
+        db.execute("DELETE FROM catalog_meta WHERE key = 'numeric_parser'")
+
+    reopened = FittingsStore(path)
+    assert [item.code for item in reopened.filter(min_pressure=10, max_pressure=10)[0]] == ["4A-C4L-10-SS"]
+
+
+def test_list_fittings_endpoint_pressure_and_size():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    add_fitting(Fitting(code="RNG-1", description="x", series="RNG", configuration="CV", cracking_pressure="3 psi"))
+    add_fitting(Fitting(code="RNG-2", description="x", series="RNG", configuration="CV", cracking_pressure="30 psi"))
+    client = TestClient(app)
+    page = client.get("/fittings/", params={"series": "RNG", "min_pressure": 2, "max_pressure": 5}).json()
+    assert [item["code"] for item in page["items"]] == ["RNG-1"] and page["total"] == 1
+    assert client.get("/fittings/", params={"size": "huge"}).status_code == 400
+
+
+def test_fuzzy_search_ranks_candidates_before_the_cut(tmp_path, monkeypatch):
+    from app.services import fittings_search
+    from app.services.fittings_store import FittingsStore
+
+    store = FittingsStore(tmp_path / "fittings.sqlite")
+    # thousands of codes share the intact half "-25-SS" and come first by rowid
+    store.add_many([_fit(f"{idx}A-C{idx % 9}L-25-SS") for idx in range(2600)])
+    store.add(_fit("8Z-QQ4L-25-SS"))
+    monkeypatch.setattr(fittings_search, "FUZZY_CANDIDATES", 50)
+    hits, _ = fittings_search.search_fittings(store, "8Z-QX4L-25-SS")
+    assert hits[0].fitting.code == "8Z-QQ4L-25-SS"
+
+
+def test_search_falls_back_to_prefixes_without_trigram_tokenizer(tmp_path, monkeypatch):
+    from app.services import fittings_store
+    from app.services.fittings_search import search_fittings
+    from app.services.fittings_store import FittingsStore
+
+    monkeypatch.setattr(fittings_store, "SEARCH_TOKENIZER", "no_such_tokenizer")
+    store = FittingsStore(tmp_path / "fittings.sqlite")
+    store.add(_fit("4A-C4L-10-SS"))
+    assert not store.search_enabled
+    assert [hit.fitting.code for hit in search_fittings(store, "4a-c4l")[0]] == ["4A-C4L-10-SS", "4A-C4L-25-SS"]
+    assert search_fittings(store, "4A-C4K-25-SS") == ([], False)
+    store.close()
+
+    # once the tokenizer is available the index is rebuilt with the rows it missed
+    monkeypatch.setattr(fittings_store, "SEARCH_TOKENIZER", "trigram")
+    reopened = FittingsStore(tmp_path / "fittings.sqlite")
+    assert search_fittings(reopened, "C4L-10")[0][0].fitting.code == "4A-C4L-10-SS"
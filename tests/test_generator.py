@@ -3,7 +3,7 @@ import pytest
 from pydantic import ValidationError
 
 from app.schemas.pid import PipingSystem, HandlelisteResponse
-from app.services.generator import generate_handleliste
+from app.services.generator import generate_handleliste, generate_bom, iter_handleliste
 
 
 def test_generate_handleliste_valid():
@@ -65,3 +65,107 @@ def test_generate_handleliste_other_brand():
     )
     response = generate_handleliste(system, brand="butech")
     assert response.items[1] == "Butech Coupling"
+
+
+def test_generate_bom_counts_items():
+    system = PipingSystem(
+        components=["pipe", "valve", "pipe", "valve"],
+        lines=[
+            {"start": 0, "end": 1, "size": "1\""},
+            {"start": 2, "end": 3, "size": "1\""},
+        ],
+    )
+    response = generate_bom(system)
+    assert [(row.item, row.qty) for row in response.rows] == [
+        ("Pipe Item", 2),
+        ("Parker Coupling", 2),
+        ("Valve Item", 2),
+    ]
+    assert response.items is None
+    with_items = generate_bom(system, include_items=True)
+    assert with_items.items == generate_handleliste(system).items
+
+
+def test_iter_handleliste_matches_list_and_validates_up_front():
+    system = PipingSystem(
+        components=["pipe", "valve", "pump"],
+        lines=[
+            {"start": 0, "end": 1, "size": "1\"", "tee": True},
+            {"start": 1, "end": 2, "size": "3/8\""},
+        ],
+    )
+    assert list(iter_handleliste(system)) == generate_handleliste(system).items
+    bad = PipingSystem(components=["pipe"], lines=[{"start": 0, "end": 3, "size": "1\""}])
+    with pytest.raises(ValueError):
+        iter_handleliste(bad)
+
+
+def test_generate_parts_resolves_catalog_codes():
+    from app.schemas.fittings import Fitting
+    from app.services.fittings_store import add_fitting
+    from app.services.generator import generate_parts
+
+    add_fitting(
+        Fitting(
+            code="SW-TEE-2",
+            description="Tee",
+            series="SW",
+            configuration="TEE",
+            material="stainless steel",
+            brand="swagelok",
+            fitting_type="Tee",
+            size="2\"",
+        )
+    )
+    system = PipingSystem(
+        components=["pipe", "valve", "pump"],
+        lines=[
+            {"start": 0, "end": 1, "size": "2\"", "tee": True},
+            {"start": 1, "end": 2, "size": "2\"", "tee": True},
+        ],
+    )
+    response = generate_parts(system, brand="swagelok", material="Stainless Steel")
+    rows = {(row.item, row.size): row for row in response.rows}
+    assert rows[("Swagelok Tee", "2\"")].part_number == "SW-TEE-2"
+    assert rows[("Swagelok Tee", "2\"")].qty == 2
+    assert rows[("Pipe Item", None)].part_number is None
+    assert response.unresolved == 2  # coupling and adapter are not in the catalog
+
+
+def test_equivalent_sizes_need_no_adapter():
+    system = PipingSystem(
+        components=["pipe", "filter", "analyzer"],
+        lines=[
+            {"start": 0, "end": 1, "size": "1\""},
+            {"start": 1, "end": 2, "size": "25.4mm"},
+        ],
+    )
+    assert "Parker Adapter" not in generate_handleliste(system).items
+
+
+def test_generate_parts_resolves_reducers():
+    from app.schemas.fittings import Fitting
+    from app.services.fittings_store import add_fitting
+    from app.services.generator import generate_parts
+
+    add_fitting(
+        Fitting(
+            code="PK-RED-1-05",
+            description="Reducer",
+            series="PK",
+            configuration="RED",
+            brand="parker",
+            fitting_type="Adapter",
+            size="1 in x 1/2 in",
+        )
+    )
+    system = PipingSystem(
+        components=["pipe", "filter", "analyzer"],
+        lines=[
+            {"start": 0, "end": 1, "size": "1/2\""},
+            {"start": 1, "end": 2, "size": "1\""},
+        ],
+    )
+    rows = generate_parts(system).rows
+    assert [row.part_number for row in rows if row.item == "Parker Adapter"] == ["PK-RED-1-05"]
+    assert [row.size for row in rows if row.item == "Parker Adapter"] == ["1/2\" x 1\""]
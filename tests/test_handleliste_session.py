@@ -0,0 +1,113 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers.pid import (
+    create_handleliste_session,
+    patch_handleliste_session,
+    read_handleliste_session,
+)
+from app.schemas.pid import PipingSystem, SessionCreate, SessionPatch
+from app.services.generator import generate_handleliste
+from app.services.handleliste_session import HandlelisteSession
+
+
+def _system() -> PipingSystem:
+    return PipingSystem(
+        components=["pipe", "valve", "pump"],
+        lines=[
+            {"start": 0, "end": 1, "size": "1\""},
+            {"start": 1, "end": 2, "size": "1\""},
+        ],
+    )
+
+
+def _full_counts(session: HandlelisteSession) -> Counter:
+    return Counter(generate_handleliste(session.to_system()).items)
+
+
+def test_session_delta_for_size_change():
+    session = HandlelisteSession(_system())
+    assert Counter(dict(session.rows())) == _full_counts(session)
+
+    delta, _ = session.apply(SessionPatch(update_lines={1: {"start": 1, "end": 2, "size": "3/8\""}}))
+    # changing the size after the valve requires an adapter
+    assert delta == {"Parker Adapter": 1}
+    assert Counter(dict(session.rows())) == _full_counts(session)
+
+
+def test_session_add_and_remove_lines_and_components():
+    session = HandlelisteSession(_system())
+    delta, added = session.apply(
+        SessionPatch(add_components=["filter"], add_lines=[{"start": 0, "end": 3, "size": "1\"", "tee": True}])
+    )
+    assert added == [2]
+    assert delta == {"Filter Item": 1, "Parker Coupling": 1, "Parker Tee": 1}
+
+    delta, _ = session.apply(SessionPatch(remove_lines=[2], remove_components=[3]))
+    assert delta == {"Filter Item": -1, "Parker Coupling": -1, "Parker Tee": -1}
+    assert Counter(dict(session.rows())) == _full_counts(session)
+
+
+def test_session_rejects_invalid_patch_without_changes():
+    session = HandlelisteSession(_system())
+    with pytest.raises(ValueError):
+        session.apply(SessionPatch(remove_components=[1]))
+    with pytest.raises(ValueError):
+        session.apply(SessionPatch(add_lines=[{"start": 0, "end": 9, "size": "1\""}]))
+    assert session.version == 0
+    assert Counter(dict(session.rows())) == _full_counts(session)
+
+
+def test_session_endpoints():
+    created = asyncio.run(create_handleliste_session(SessionCreate(system=_system(), brand="swagelok")))
+    assert created.line_ids == [0, 1]
+    patched = asyncio.run(
+        patch_handleliste_session(created.session_id, SessionPatch(update_lines={0: {"start": 0, "end": 1, "size": "1\"", "bulkhead": True}}))
+    )
+    assert [(row.item, row.qty) for row in patched.delta] == [("Swagelok Bulkhead", 1)]
+    current = asyncio.run(read_handleliste_session(created.session_id))
+    assert current.version == 1
+    with pytest.raises(HTTPException):
+        asyncio.run(read_handleliste_session("missing"))
+
+
+def test_sessions_expire_and_are_bounded_by_lines(monkeypatch):
+    from app.services import handleliste_session
+    from app.services.handleliste_session import create_session, get_session
+
+    first_id, first = create_session(_system())
+    first.last_used -= handleliste_session.SESSION_TTL + 1
+    assert get_session(first_id) is None
+
+    monkeypatch.setattr(handleliste_session, "MAX_SESSION_LINES", 3)
+    old_id, _ = create_session(_system())
+    new_id, _ = create_session(_system())
+    # two sessions of two lines each exceed the limit, so the older one goes
+    assert get_session(old_id) is None
+    assert get_session(new_id) is not None
+    with pytest.raises(ValueError):
+        create_session(PipingSystem(components=["pipe", "valve"], lines=[{"start": 0, "end": 1, "size": "1\""}] * 4))
+
+
+def test_patches_respect_the_line_limit(monkeypatch):
+    from app.services import handleliste_session
+    from app.services.handleliste_session import get_session
+
+    monkeypatch.setattr(handleliste_session, "MAX_SESSION_LINES", 4)
+    other = asyncio.run(create_handleliste_session(SessionCreate(system=_system())))
+    created = asyncio.run(create_handleliste_session(SessionCreate(system=_system())))
+    line = {"start": 0, "end": 2, "size": "1\""}
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(patch_handleliste_session(created.session_id, SessionPatch(add_lines=[line] * 3)))
+    assert exc.value.status_code == 400
+    assert len(get_session(created.session_id).lines) == 2
+
+    # the session itself fits, so the least recently used one makes room
+    asyncio.run(patch_handleliste_session(created.session_id, SessionPatch(add_lines=[line])))
+    assert get_session(created.session_id) is not None
+    assert get_session(other.session_id) is None
+    stored = handleliste_session._SESSIONS.values()
+    assert handleliste_session._line_total == sum(len(session.lines) for session in stored)
@@ -0,0 +1,75 @@
+from app.services.pdf_cache import ExtractionCache, bytes_key, path_key
+
+
+def test_cache_hits_and_evicts_by_size():
+    cache = ExtractionCache(max_bytes=200)
+    cache.put("a", "x" * 100)
+    assert cache.get("a") == "x" * 100
+    cache.put("b", "y" * 100)
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 100
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["bytes"] <= 200
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    ExtractionCache(db_path=db).put(bytes_key(b"%PDF"), "Hello")
+    cache = ExtractionCache(db_path=db)
+    assert cache.get(bytes_key(b"%PDF")) == "Hello"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_path_key_changes_with_file(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"one")
+    first = path_key(pdf)
+    pdf.write_bytes(b"three")
+    assert path_key(pdf) != first
+
+
+def test_service_functions_use_the_cache(tmp_path):
+    from pathlib import Path
+    from app.services.pdf_reader import read_pdf_bytes, read_pdf_pages, read_pdf_text
+
+    cache = ExtractionCache()
+    data = Path("tests/data/sample.pdf").read_bytes()
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(data)
+    assert read_pdf_text(pdf, cache=cache) == read_pdf_text(pdf, cache=cache) == "Hello World"
+    assert read_pdf_bytes(data, cache=cache) == "Hello World"
+    assert read_pdf_pages(pdf, [(1, 5)], cache=cache) == read_pdf_pages(pdf, [(1, 5)], cache=cache) == "Hello World"
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 3
+
+    pdf.write_bytes(b"%PDF-1.4\n1 0 obj\n<< /Length 17 >>\nstream\r\nBT (Changed) Tj\r\nendstream\nendobj\n")
+    assert read_pdf_text(pdf, cache=cache) == "Changed"
+
+
+def test_async_access_keeps_sqlite_off_the_event_loop(tmp_path):
+    import asyncio
+
+    cache = ExtractionCache(db_path=tmp_path / "cache.sqlite")
+    on_loop = []
+    connect = cache._connection
+
+    def connection():
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return connect()
+
+    cache._connection = connection
+
+    async def run():
+        await cache.put_async("k", "text")
+        cache._entries.clear()
+        assert await cache.get_async("k") == "text"
+        # promoted back into memory, so no disk access this time
+        assert await cache.get_async("k") == "text"
+
+    asyncio.run(run())
+    assert on_loop == [False, False]
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["hits"] == 1
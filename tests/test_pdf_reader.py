@@ -1,8 +1,294 @@
+import asyncio
+import json
+import zlib
 from pathlib import Path
-from app.services.pdf_reader import read_pdf_text
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers.pdf import read_pdf
+from app.services.pdf_reader import (
+    read_pdf_text,
+    read_pdf_bytes,
+    read_pdf_pages,
+    iter_pdf_text,
+    parse_page_ranges,
+    format_page_ranges,
+    MAX_PAGE_RANGES,
+    ExtractionStats,
+    PdfObjectIndex,
+    StreamingTextExtractor,
+)
+
+
+def _make_pdf(*bodies: bytes) -> bytes:
+    parts = [b"%PDF-1.4\n"]
+    for num, body in enumerate(bodies, start=1):
+        parts.append(
+            b"%d 0 obj\n<< /Length %d >>\nstream\r\n%s\r\nendstream\nendobj\n" % (num, len(body), body)
+        )
+    return b"".join(parts)
+
+
+def _make_paged_pdf(texts: list[bytes], fanout: int | None = None) -> bytes:
+    """Build a PDF with one compressed content stream per page and a valid xref.
+
+    With ``fanout`` the page tree is nested, at most ``fanout`` kids per node.
+    """
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>"}
+    kids = []
+    for page, text in enumerate(texts):
+        num = 3 + page * 2
+        body = zlib.compress(b"BT (" + text + b") Tj ET")
+        objects[num] = b"<< /Type /Page /Parent 2 0 R /Contents %d 0 R >>" % (num + 1)
+        objects[num + 1] = b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(body), body)
+        kids.append((num, 1))
+    while fanout and len(kids) > fanout:
+        groups = [kids[pos : pos + fanout] for pos in range(0, len(kids), fanout)]
+        kids = []
+        for group in groups:
+            num = max(objects) + 1
+            objects[num] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+                b" ".join(b"%d 0 R" % kid for kid, _ in group),
+                sum(count for _, count in group),
+            )
+            kids.append((num, sum(count for _, count in group)))
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid, _ in kids),
+        sum(count for _, count in kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, objects[num])
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for num in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[num]
+    out += b"trailer\n<< /Root 1 0 R /Size %d >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
 
 
 def test_read_pdf_text():
     sample = Path("tests/data/sample.pdf")
     text = read_pdf_text(sample)
     assert "Hello World" in text
+
+
+def test_read_pdf_text_mmap(tmp_path):
+    pdf = tmp_path / "large.pdf"
+    data = _make_pdf(b"BT (Mapped) Tj ET", zlib.compress(b"BT (Inflated) Tj ET"))
+    pdf.write_bytes(data)
+    assert read_pdf_text(pdf, use_mmap=True) == read_pdf_bytes(data) == "MappedInflated"
+
+
+def test_iter_pdf_text_yields_fragments_lazily(tmp_path):
+    data = _make_pdf(b"BT (One) Tj ET", b"no text here", zlib.compress(b"BT (Two) Tj ET"))
+    fragments = list(iter_pdf_text(data))
+    assert [(fragment.stream, fragment.text) for fragment in fragments] == [(0, "One"), (2, "Two")]
+    assert data[fragments[0].offset :].startswith(b"BT (One)")
+
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(data)
+    fragments = iter_pdf_text(pdf, use_mmap=True)
+    assert next(fragments).text == "One"
+    # stopping early must release the memory map cleanly
+    fragments.close()
+
+
+def test_non_text_streams_are_skipped():
+    image = zlib.compress(b"(not text)" * 100)
+    data = (
+        b"%%PDF-1.4\n1 0 obj\n<< /Type /XObject /Subtype /Image /Length %d >>\nstream\n%s\nendstream\nendobj\n"
+        % (len(image), image)
+        + _make_pdf(b"BT (Page) Tj ET")
+    )
+    stats = ExtractionStats()
+    assert read_pdf_bytes(data, stats=stats) == "Page"
+    assert stats.skipped_streams == 1
+    assert stats.skipped_bytes == len(image) + 1
+
+    extractor = StreamingTextExtractor()
+    parts = extractor.feed(data[:50]) + extractor.feed(data[50:])
+    assert "".join(text for _, text in parts) == "Page"
+    assert extractor.stats.skipped_streams == 1
+
+
+def test_inflation_budgets_truncate_output(monkeypatch):
+    from app.services import pdf_reader
+
+    data = _make_pdf(zlib.compress(b"(a)" * 1000), zlib.compress(b"(b)" * 1000))
+    monkeypatch.setattr(pdf_reader, "MAX_STREAM_OUTPUT", 30)
+    stats = ExtractionStats()
+    text = read_pdf_bytes(data, stats=stats)
+    assert text == "a" * 10 + pdf_reader.TRUNCATION_MARKER + "b" * 10 + pdf_reader.TRUNCATION_MARKER
+    assert stats.truncated_streams == 2 and not stats.truncated
+
+    monkeypatch.setattr(pdf_reader, "MAX_STREAM_OUTPUT", 10**6)
+    monkeypatch.setattr(pdf_reader, "MAX_DOCUMENT_OUTPUT", 3000)
+    stats = ExtractionStats()
+    assert read_pdf_bytes(data, stats=stats) == "a" * 1000 + pdf_reader.TRUNCATION_MARKER
+    assert stats.truncated
+
+
+def test_page_reads_share_the_document_budget(monkeypatch):
+    from app.services import pdf_reader
+
+    data = _make_paged_pdf([b"a" * 1000, b"b" * 1000, b"c" * 1000])
+    monkeypatch.setattr(pdf_reader, "MAX_DOCUMENT_OUTPUT", 1500)
+    stats = ExtractionStats()
+    text = read_pdf_pages(data, parse_page_ranges("1-3"), stats=stats)
+    assert text.startswith("a" * 1000) and text.endswith(pdf_reader.TRUNCATION_MARKER)
+    assert "ccc" not in text and text.count(pdf_reader.TRUNCATION_MARKER) == 1
+    assert stats.truncated
+
+
+def test_streaming_extractor_matches_buffered_reader():
+    data = _make_pdf(
+        b"BT (First) Tj ET",
+        zlib.compress(b"BT (Second page) Tj (more) Tj ET" * 50),
+        b"BT (Third) Tj ET",
+    )
+    for chunk_size in (1, 5, 64, len(data)):
+        extractor = StreamingTextExtractor()
+        parts = []
+        for pos in range(0, len(data), chunk_size):
+            parts.extend(extractor.feed(data[pos : pos + chunk_size]))
+        extractor.close()
+        assert "".join(text for _, text in parts) == read_pdf_bytes(data)
+        assert {stream for stream, _ in parts} == {0, 1, 2}
+
+
+def test_extract_stream_endpoint():
+    data = Path("tests/data/sample.pdf").read_bytes()
+    client = TestClient(app)
+    response = client.post("/pdf/extract/stream", content=iter([data[:100], data[100:]]))
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert "".join(record["text"] for record in records) == "Hello World"
+
+
+def test_extract_stream_inflates_off_the_event_loop(monkeypatch):
+    on_loop = []
+    original = StreamingTextExtractor.feed
+
+    def feed(self, chunk):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return original(self, chunk)
+
+    monkeypatch.setattr(StreamingTextExtractor, "feed", feed)
+    data = Path("tests/data/sample.pdf").read_bytes()
+    response = TestClient(app).post("/pdf/extract/stream", content=iter([data[:100], data[100:]]))
+    assert "Hello World" in response.text
+    assert on_loop and not any(on_loop)
+
+
+def test_parse_page_ranges():
+    assert parse_page_ranges("3-5,8") == [(3, 5), (8, 8)]
+    assert format_page_ranges(parse_page_ranges(" 3-5, 8-8,")) == "3-5,8"
+    with pytest.raises(ValueError):
+        parse_page_ranges("5-3")
+    with pytest.raises(ValueError):
+        parse_page_ranges(",".join(["1"] * (MAX_PAGE_RANGES + 1)))
+
+
+def test_read_pdf_pages_decodes_selected_pages(tmp_path):
+    data = _make_paged_pdf([b"Page %d" % page for page in range(1, 21)])
+    assert read_pdf_pages(data, [3, 4, 5]) == "Page 3Page 4Page 5"
+    pdf = tmp_path / "paged.pdf"
+    pdf.write_bytes(data)
+    assert read_pdf_pages(pdf, [20]) == "Page 20"
+    # ranges are clipped to the document instead of being expanded up front
+    assert read_pdf_pages(pdf, parse_page_ranges("19-20000000")) == "Page 19Page 20"
+    # the sample has a broken xref table and is indexed by scanning instead
+    assert read_pdf_pages(Path("tests/data/sample.pdf"), [1]) == "Hello World"
+
+
+def test_read_pdf_pages_reads_only_the_needed_objects(monkeypatch):
+    data = _make_paged_pdf([b"Page %d" % page for page in range(1, 1001)], fanout=10)
+    reads = []
+    original = PdfObjectIndex.object
+
+    def counting_object(self, num):
+        reads.append(num)
+        return original(self, num)
+
+    monkeypatch.setattr(PdfObjectIndex, "object", counting_object)
+    assert read_pdf_pages(data, parse_page_ranges("537-538")) == "Page 537Page 538"
+    # catalog, a few nodes per tree level and the two pages with their streams
+    assert len(reads) < 60
+
+    # a wrong xref offset is only noticed when that object is read
+    entry = b"%010d 00000 n" % (data.index(b"\n5 0 obj") + 1)
+    broken = data.replace(entry, b"%010d 00000 n" % 9)
+    assert broken != data
+    assert read_pdf_pages(broken, [2]) == "Page 2"
+
+
+def test_read_endpoint_pages(tmp_path):
+    pdf = tmp_path / "paged.pdf"
+    pdf.write_bytes(_make_paged_pdf([b"One", b"Two", b"Three"]))
+    response = asyncio.run(read_pdf(str(pdf), pages="2-3"))
+    assert response == {"text": "TwoThree"}
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(read_pdf(str(pdf), pages="4"))
+    assert exc.value.status_code == 400
+
+
+def test_extract_batch_endpoint(tmp_path):
+    pdf = tmp_path / "paged.pdf"
+    pdf.write_bytes(_make_paged_pdf([b"Batch"]))
+    client = TestClient(app)
+
+    response = client.post("/pdf/extract/batch", json={"paths": [str(pdf), str(tmp_path / "missing.pdf")]})
+    records = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda r: r["index"])
+    assert records[0]["text"] == "Batch"
+    assert "error" in records[1]
+
+    sample = Path("tests/data/sample.pdf").read_bytes()
+    response = client.post("/pdf/extract/batch", files=[("files", ("a.pdf", sample)), ("files", ("b.pdf", sample))])
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(record["name"] for record in records) == ["a.pdf", "b.pdf"]
+    assert all(record["text"] == "Hello World" for record in records)
+
+
+def test_extract_batch_reports_crashed_worker_inline(tmp_path, monkeypatch):
+    from app.services import extraction_pool as pool_module
+    from app.services.extraction_pool import WorkerCrashedError
+
+    async def crash(fn, *args):
+        raise WorkerCrashedError("Extraction worker crashed")
+
+    monkeypatch.setattr(pool_module.extraction_pool, "run", crash)
+    pdf = tmp_path / "crash.pdf"
+    pdf.write_bytes(_make_paged_pdf([b"Never read"]))
+    response = TestClient(app).post("/pdf/extract/batch", json={"paths": [str(pdf), str(pdf) + ".b"]})
+    records = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda r: r["index"])
+    assert records[0]["error"] == "Extraction worker crashed"
+    assert "error" in records[1]
+
+
+def test_extract_batch_reports_unexpected_worker_errors_inline(tmp_path, monkeypatch):
+    from app.services import extraction_pool as pool_module
+
+    async def extract(fn, path):
+        if path.name == "bad.pdf":
+            raise zlib.error("Error -3 while decompressing data")
+        raise KeyError(7)
+
+    monkeypatch.setattr(pool_module.extraction_pool, "run", extract)
+    paths = []
+    for name in ("bad.pdf", "worse.pdf"):
+        paths.append(tmp_path / name)
+        paths[-1].write_bytes(b"%PDF-1.4\n")
+    response = TestClient(app).post("/pdf/extract/batch", json={"paths": [str(path) for path in paths]})
+    records = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda r: r["index"])
+    assert [record["error"] for record in records] == ["Error -3 while decompressing data", "7"]
@@ -0,0 +1,121 @@
+import os, sys; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from app.routers.pid import analyze
+from app.schemas.pid import Line, PipingSystem
+from app.services.generator import generate_handleliste
+from app.services.piping_graph import PipingGraph
+
+
+def _random_system(rng: random.Random, components: int, lines: int) -> PipingSystem:
+    kinds = ["pipe", "valve", "pump", "flange", "filter", "analyzer"]
+    return PipingSystem(
+        components=[rng.choice(kinds) for _ in range(components)],
+        lines=[
+            Line(
+                start=rng.randrange(-components, components),
+                end=rng.randrange(-components, components),
+                size=rng.choice(['1"', '2"', "3/4\""]),
+            )
+            for _ in range(lines)
+        ],
+    )
+
+
+def test_validate_reports_every_bad_line():
+    system = PipingSystem(
+        components=["pipe", "valve"],
+        lines=[
+            {"start": 0, "end": 1, "size": "1\""},
+            {"start": 0, "end": 5, "size": "1\""},
+            {"start": -3, "end": 1, "size": "1\""},
+            {"start": -1, "end": 0, "size": "1\""},
+        ],
+    )
+    graph = PipingGraph.from_system(system)
+    assert graph.invalid_lines().tolist() == [1, 2]
+    with pytest.raises(ValueError, match="1, 2"):
+        graph.validate()
+
+
+def test_size_changes_match_generator_adapters():
+    rng = random.Random(7)
+    for _ in range(20):
+        system = _random_system(rng, rng.randint(1, 12), rng.randint(0, 30))
+        adapters = generate_handleliste(system).items.count("Parker Adapter")
+        expected_fittings = sum(
+            1 for line in system.lines
+            if (system.components[line.start], system.components[line.end]) in {("valve", "pump"), ("analyzer", "flange")}
+        )
+        assert len(PipingGraph.from_system(system).size_change_lines()) == adapters - expected_fittings
+
+
+def test_negative_indices_name_the_same_component():
+    system = PipingSystem(
+        components=["pipe", "valve"],
+        lines=[
+            {"start": 0, "end": 1, "size": "1\""},
+            {"start": -1, "end": 0, "size": "2\""},
+        ],
+    )
+    items = generate_handleliste(system).items
+    assert items.count("Valve Item") == 1
+    assert items.count("Parker Adapter") == 1
+    assert PipingGraph.from_system(system).size_change_lines().tolist() == [1]
+
+
+def test_connectivity_and_adjacency():
+    system = PipingSystem(
+        components=["pipe", "valve", "pump", "flange", "filter", "analyzer"],
+        lines=[
+            {"start": 0, "end": 1, "size": "1\""},
+            {"start": 1, "end": 2, "size": "1\""},
+            {"start": 2, "end": 0, "size": "1\""},
+            {"start": 3, "end": 4, "size": "1\""},
+        ],
+    )
+    graph = PipingGraph.from_system(system)
+    indptr, neighbours = graph.adjacency()
+    assert sorted(neighbours[indptr[0] : indptr[1]].tolist()) == [1, 2]
+    assert graph.degrees().tolist() == [2, 2, 2, 1, 1, 0]
+    assert graph.connectivity() == {
+        "isolated_components": [5],
+        "subsystems": 3,
+        "subsystem_sizes": [3, 2, 1],
+        "cyclic_subsystems": 1,
+        "independent_cycles": 1,
+    }
+
+
+def test_subsystem_labels_on_long_chain():
+    count = 100_000
+    order = np.random.default_rng(0).permutation(count)
+    graph = PipingGraph(
+        components=np.zeros(count, dtype=np.int8),
+        starts=order[:-1],
+        ends=order[1:],
+        size_codes=np.zeros(count - 1, dtype=np.int32),
+        sizes=['1"'],
+    )
+    assert (graph.subsystem_labels() == 0).all()
+    assert graph.connectivity()["independent_cycles"] == 0
+
+
+def test_analyze_endpoint():
+    system = PipingSystem(
+        components=["pipe", "valve", "pump"],
+        lines=[
+            {"start": 0, "end": 1, "size": "1\""},
+            {"start": 1, "end": 2, "size": "2\""},
+            {"start": 1, "end": 9, "size": "2\""},
+        ],
+    )
+    report = asyncio.run(analyze(system))
+    assert report.invalid_lines == [2]
+    assert report.size_change_lines == [1]
+    assert report.subsystems == 1
+    assert report.isolated_components == []
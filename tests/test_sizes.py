@@ -0,0 +1,41 @@
+import os, sys; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+
+from app.services.sizes import SizeRegistry, parse_size, size_key
+
+
+@pytest.mark.parametrize(
+    "label, mm",
+    [
+        ('1"', 25.4),
+        ("1 in", 25.4),
+        ("1 inch", 25.4),
+        ("25.4mm", 25.4),
+        ("12 MM", 12.0),
+        ('3/4"', 19.05),
+        ('1-1/2"', 38.1),
+        ("1 1/2 in", 38.1),
+        ("0.5''", 12.7),
+    ],
+)
+def test_parse_size(label, mm):
+    assert parse_size(label) == pytest.approx(mm)
+
+
+@pytest.mark.parametrize("label", ["DN25", "", "1/0\"", "11/2 ft", "large"])
+def test_parse_size_rejects_unknown(label):
+    assert parse_size(label) is None
+
+
+def test_size_key_pairs_and_free_text():
+    assert size_key('1" x 1/2"') == size_key("12.7mm x 25.4mm")
+    assert size_key("  Large  Bore ") == size_key("large bore")
+    assert size_key('1"') != size_key("25mm")
+
+
+def test_registry_interns_equivalent_spellings():
+    sizes = SizeRegistry()
+    assert sizes.code('1"') == sizes.code("25.4 mm") == sizes.code("1 in") == 0
+    assert sizes.code('1/2"') == 1
+    assert sizes.label(0) == '1"'
+    assert len(sizes) == 2